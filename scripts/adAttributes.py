@@ -0,0 +1,87 @@
+import re
+import json
+from normalize import parse_number
+
+# Typed ads columns filled from the scraped label/value dicts: column -> SQL type
+PROMOTED_COLUMNS = {
+    "rooms": "REAL",
+    "floor": "INTEGER",
+    "balcony": "INTEGER",
+    "operating_costs": "REAL",
+    "hwb": "REAL",
+    "hwb_class": "TEXT",
+}
+
+GROUND_FLOOR = ("erdgeschoss", "eg", "hochparterre", "parterre")
+BALCONY = ("balkon", "loggia")
+# Labels willhaben lists the kinds of outdoor space under, e.g. "Freifläche: Balkon, Loggia"
+OUTDOOR_SPACE = ("freifläche", "außenfläche", "aussenfläche")
+
+def parse_floor(text):
+    """'2. Stock' -> 2, 'Erdgeschoss' -> 0."""
+    if not text:
+        return None
+    if text.strip().lower().split(",")[0] in GROUND_FLOOR:
+        return 0
+    match = re.search(r"-?\d+", text)
+    return int(match.group(0)) if match else None
+
+def find_value(data, *prefixes, exclude=()):
+    """First value whose label starts with one of the prefixes (case-insensitive)."""
+    for label, value in (data or {}).items():
+        lowered = label.lower()
+        if any(lowered.startswith(p) for p in prefixes) and not any(e in lowered for e in exclude):
+            return value
+    return None
+
+def has_balcony(attributes):
+    """A balcony or loggia label, or one listed in the value of an outdoor-space label."""
+    for label, value in attributes.items():
+        lowered = label.lower()
+        if lowered.startswith(BALCONY):
+            return True
+        if lowered.startswith(OUTDOOR_SPACE) and any(kind in str(value).lower() for kind in BALCONY):
+            return True
+    return False
+
+def decode(value):
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return {}
+    return value or {}
+
+def typed_attributes(price_info, energy_certificate, attributes):
+    """Values for PROMOTED_COLUMNS, in order, from the dicts (or their JSON) an ad was scraped with."""
+    price_info, energy_certificate, attributes = decode(price_info), decode(energy_certificate), decode(attributes)
+
+    balcony = None
+    if attributes:
+        balcony = int(has_balcony(attributes))
+
+    return (
+        parse_number(find_value(attributes, "zimmer")),
+        parse_floor(find_value(attributes, "stockwerk")),
+        balcony,
+        parse_number(find_value(price_info, "betriebskosten")),
+        parse_number(find_value(energy_certificate, "hwb", "heizwärmebedarf", exclude=("klasse",))),
+        find_value(energy_certificate, "hwb-klasse", "hwb klasse", "klasse hwb"),
+    )
+
+def backfill_typed_attributes(cursor, batch_size=1000):
+    """Fill the promoted columns for ads stored before they existed, in chunks."""
+    assignments = ", ".join(f"{column} = ?" for column in PROMOTED_COLUMNS)
+    last_id = 0
+    while True:
+        rows = cursor.execute('''
+            SELECT id, price_info, energy_certificate, attributes FROM ads
+            WHERE id > ? ORDER BY id LIMIT ?
+        ''', (last_id, batch_size)).fetchall()
+        if not rows:
+            return
+        cursor.executemany(
+            f"UPDATE ads SET {assignments} WHERE id = ?",
+            [typed_attributes(price_info, energy, attributes) + (ad_id,) for ad_id, price_info, energy, attributes in rows]
+        )
+        last_id = rows[-1][0]
@@ -1,14 +1,13 @@
-import time
-import sqlite3
-import googlemaps
-from config import GOOGLE_API_KEY
-
-API_KEY = GOOGLE_API_KEY
-gmaps = googlemaps.Client(key=API_KEY)
+import os
+from config import GEOCODE_WORKERS
+from storage import transaction
+from migrations import migrate, STATION_GEO_MIGRATIONS
+from geocodeService import geocode_many, has_no_result
+from jobQueue import enqueue, start_worker
 
 # New SQLite DB file
-DB_FILE = "../data/oebb_stations_geo.db"
-FAILED_FILE = "../data/failed_geocoding.txt"
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_FILE = os.path.abspath(os.path.join(BASE_DIR, "../data/oebb_stations_geo.db"))
 
 # List of Badner Bahn stations
 badner_bahn_stations = [
@@ -25,76 +24,57 @@ badner_bahn_stations = [
 
 def init_db():
     """Create a new database table to store Badner Bahn stations."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS badner_bahn (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            station TEXT UNIQUE,
-            latitude REAL,
-            longitude REAL
-        )
-    """)
-    conn.commit()
-    conn.close()
+    with transaction(DB_FILE) as conn:
+        migrate(conn, STATION_GEO_MIGRATIONS)
 
 def station_exists(station):
     """Check if a station is already in the database."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM badner_bahn WHERE station = ?", (station,))
-    result = cursor.fetchone()
-    conn.close()
+    with transaction(DB_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM badner_bahn WHERE station = ?", (station,))
+        result = cursor.fetchone()
     return result is not None
 
-def get_coordinates(station):
-    """Fetch latitude and longitude using Google Maps API."""
-    try:
-        geocode_result = gmaps.geocode(station + ", Austria")
-        if geocode_result:
-            location = geocode_result[0]["geometry"]["location"]
-            return location["lat"], location["lng"]
-    except Exception as e:
-        print(f"⚠️ Google Maps API failed for: {station} | Error: {e}")
-    return None, None
-
 def save_to_db(station, latitude, longitude):
     """Insert station data into the database."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT OR IGNORE INTO badner_bahn (station, latitude, longitude)
-        VALUES (?, ?, ?)
-    """, (station, latitude, longitude))
-    conn.commit()
-    conn.close()
+    with transaction(DB_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT OR IGNORE INTO badner_bahn (station, latitude, longitude)
+            VALUES (?, ?, ?)
+        """, (station, latitude, longitude))
 
 def save_failed(station):
-    """Save failed stations to a text file for later reprocessing."""
-    with open(FAILED_FILE, "a", encoding="utf-8") as fail_file:
-        fail_file.write(f"{station}\n")
-
-# Initialize the database
-init_db()
+    """Queue a failed station for automatic retries (handled by geocoding.geocode_job), unless the API found nothing for it."""
+    query = station + ", Austria"
+    if has_no_result(query):
+        print(f"🚫 No geocoding result for {query}; not queued for retry")
+        return
+    enqueue("geocode", f"badner_bahn|{station}", {"table": "badner_bahn", "name": station, "query": query}, error="no coordinates")
 
-# Process each station
-for station in badner_bahn_stations:
-    if station_exists(station):
-        print(f"⏩ Skipping (already in DB): {station}")
-        continue
+def geocode_badner_bahn(workers=GEOCODE_WORKERS):
+    """Geocode the Badner Bahn stations missing from badner_bahn through the shared geocoding service."""
+    # Initialize the database
+    init_db()
 
-    print(f"🌍 Fetching coordinates for: {station}")
+    worker = start_worker(["geocode"])  # Retries earlier failures alongside this run
+    stations = [station for station in badner_bahn_stations if not station_exists(station)]
+    print(f"🌍 Fetching coordinates for {len(stations)} stations")
+    coordinates = geocode_many([station + ", Austria" for station in stations], workers)
 
-    lat, lon = get_coordinates(station)
+    # Process and store each station
+    for station in stations:
+        lat, lon = coordinates.get(station + ", Austria") or (None, None)
 
-    if lat and lon:
-        save_to_db(station, lat, lon)
-        print(f"✅ Saved: {station} → ({lat}, {lon})")
-    else:
-        print(f"❌ Failed to get coordinates: {station}")
-        save_failed(station)  # Save to failed list
+        if lat and lon:
+            save_to_db(station, lat, lon)
+            print(f"✅ Saved: {station} → ({lat}, {lon})")
+        else:
+            print(f"❌ Failed to get coordinates: {station}")
+            save_failed(station)  # Queue for retry
 
-    time.sleep(1)  # Avoid hitting API rate limits
+    worker.stop()
+    print(f"✅ Process complete. Data saved in '{DB_FILE}'.")
 
-print(f"✅ Process complete. Data saved in '{DB_FILE}'.")
-print(f"❌ Failed stations logged in '{FAILED_FILE}'.")
+if __name__ == "__main__":
+    geocode_badner_bahn()
@@ -0,0 +1,66 @@
+import sys
+import time
+import random
+from datetime import timedelta
+import maps
+
+# Stand-in for the Directions API: every station/destination pair gets a synthetic
+# clock-face timetable (one or two lines, each repeating its pattern every hour or two,
+# some with an express every few trips) and a query returns the earliest-arriving trip
+# that can still be caught, like the real transit router.
+# tests/test_maps.py asserts the search is exact; this measures the calls reusing trips saves
+LINE_HEADWAYS = (30, 60, 60, 120)
+EXPRESS_EVERY = (0, 0, 2, 3)  # 0: no express on that line
+
+def build_timetable(rng):
+    """The walk to the station and [(departure, arrival)] in minutes after midnight for one pair."""
+    walk = rng.randint(2, 15)
+    trips = []
+    for _ in range(rng.randint(1, 2)):
+        headway = rng.choice(LINE_HEADWAYS)
+        express_every = rng.choice(EXPRESS_EVERY)
+        offset = rng.randrange(headway)
+        base = rng.randint(25, 150)
+        for n, departure in enumerate(range(6 * 60 + offset, 22 * 60, headway)):
+            duration = base + rng.randint(0, 4)  # A few minutes of slack differ by trip
+            if express_every and n % express_every == 0:
+                duration = int(duration * 0.75)
+            trips.append((departure, departure + duration))
+    return walk, sorted(trips)
+
+class FakeDirections:
+    def __init__(self, pairs, seed=0):
+        rng = random.Random(seed)
+        self.timetables = {pair: build_timetable(rng) for pair in pairs}
+
+    def directions(self, origin, destination, mode=None, departure_time=None, transit_routing_preference=None):
+        walk, trips = self.timetables[(origin, destination)]
+        midnight = departure_time.replace(hour=0, minute=0, second=0, microsecond=0)
+        asked = (departure_time - midnight).total_seconds() / 60
+        catchable = [(arrival, -departure) for departure, arrival in trips if departure - walk >= asked]
+        if not catchable:
+            return []
+        arrival, departure = min(catchable)
+        leave = midnight + timedelta(minutes=-departure - walk)
+        arrive = midnight + timedelta(minutes=arrival)
+        return [{"legs": [{
+            "duration": {"value": int((arrive - leave).total_seconds())},
+            "departure_time": {"value": leave.timestamp()},
+            "arrival_time": {"value": arrive.timestamp()},
+        }]}]
+
+def run_benchmark(pairs=500):
+    coordinates = [(48.0 + i / 1000, 16.0, (47.5, 16.5)) for i in range(pairs)]
+    maps.gmaps = FakeDirections([(f"{lat},{lon}", f"{dest[0]},{dest[1]}") for lat, lon, dest in coordinates])
+    slots = len(list(maps.departure_times()))
+
+    calls_before = maps.api_call_count
+    start = time.perf_counter()
+    for lat, lon, dest in coordinates:
+        maps.shortest_travel_time(lat, lon, dest)
+    calls = maps.api_call_count - calls_before
+    print(f"⏱️ {calls} calls ({calls / pairs:.1f} per pair, {slots} slots) in {time.perf_counter() - start:.2f} s")
+
+if __name__ == "__main__":
+    # python benchDepartures.py [pairs]
+    run_benchmark(*(int(arg) for arg in sys.argv[1:2]))
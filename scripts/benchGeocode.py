@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import random
+import hashlib
+import tempfile
+import geolocateAds
+import geocodeService
+from storage import transaction
+from migrations import migrate
+from standInServer import StandInServer
+
+# Stand-in for the Google Geocoding API: deterministic coordinates inside Austria,
+# ~50 ms latency, and an occasional OVER_QUERY_LIMIT or 503 to exercise the backoff.
+# The correctness checks live in tests/test_geocodeService.py; this only measures throughput
+LATENCY = 0.05
+OVER_LIMIT_RATE = 0.05
+SERVER_ERROR_RATE = 0.02
+GEOCODE_PATH = "/maps/api/geocode/json"
+
+def fake_location(address):
+    digest = hashlib.sha1(address.encode("utf-8")).digest()
+    return 46.4 + digest[0] / 255 * 2.6, 9.5 + digest[1] / 255 * 7.5
+
+def respond(query):
+    time.sleep(LATENCY)
+    roll = random.random()
+    if roll < SERVER_ERROR_RATE:
+        return 503, None
+    if roll < SERVER_ERROR_RATE + OVER_LIMIT_RATE:
+        return 200, {"status": "OVER_QUERY_LIMIT", "results": []}
+    lat, lng = fake_location(query.get("address", [""])[0])
+    return 200, {"status": "OK", "results": [{"geometry": {"location": {"lat": lat, "lng": lng}}}]}
+
+def seed_ads(db_path, ads, places):
+    """Fill a scratch database with ads spread over `places` distinct ZIP/city pairs."""
+    with transaction(db_path) as conn:
+        migrate(conn)
+        conn.executemany(
+            "INSERT INTO ads (url, title, price, size, zip_code, city, region) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (f"https://example.invalid/{i}", "Bench", 100000, 50.0, str(1000 + i % places), f"Ort {i % places}", "Bench")
+                for i in range(ads)
+            ]
+        )
+
+def run_benchmark(ads=2000, places=500, workers=8, qps=50):
+    scratch = tempfile.mkdtemp()
+    geolocateAds.DB_NAME = os.path.join(scratch, "bench_ads.db")
+    geocodeService.CACHE_DB = os.path.join(scratch, "bench_geocode_cache.db")
+    geocodeService.BACKOFF_BASE = 0.1
+    geolocateAds.resolve = lambda zip_code, city: None  # Measure the remote path, not the offline gazetteer
+    seed_ads(geolocateAds.DB_NAME, ads, places)
+    with StandInServer(respond, GEOCODE_PATH) as server:
+        geocodeService.GEOCODE_URL = server.url
+        start = time.perf_counter()
+        geolocateAds.geolocate_ads(workers=workers, qps=qps)
+        print(f"⏱️ {ads} ads / {places} places in {time.perf_counter() - start:.1f} s with {workers} workers at {qps} QPS "
+              f"({len(server.queries)} requests)")
+
+if __name__ == "__main__":
+    # python benchGeocode.py [ads] [places] [workers] [qps]
+    run_benchmark(*(int(arg) for arg in sys.argv[1:5]))
@@ -0,0 +1,150 @@
+import os
+import sys
+import csv
+import time
+import random
+import tempfile
+import numpy as np
+import maps
+import gtfsRouter
+from storage import transaction
+from migrations import migrate, STATION_GEO_MIGRATIONS
+
+# Synthetic GTFS feed: lines wandering over a grid of stops spanning the
+# destinations, each running both ways all day at its own headway.
+# tests/test_gtfsRouter.py checks the routes against forward searches and
+# connection_scan; this only measures speed
+GRID_KM = 2.0
+LAT_RANGE = (47.6, 48.3)
+LON_RANGE = (15.9, 16.7)
+SPEED_KM_PER_MIN = 1.0
+UNLIMITED_ROUNDS = 50
+
+def grid_stops():
+    lat_step = GRID_KM / 111
+    lon_step = GRID_KM / (111 * np.cos(np.radians(np.mean(LAT_RANGE))))
+    return [
+        (lat, lon)
+        for lat in np.arange(LAT_RANGE[0], LAT_RANGE[1], lat_step)
+        for lon in np.arange(LON_RANGE[0], LON_RANGE[1], lon_step)
+    ], int(np.ceil((LON_RANGE[1] - LON_RANGE[0]) / lon_step))
+
+def write_feed(path, lines, rng):
+    """Write the feed; returns its size and the stops some line serves."""
+    stops, columns = grid_stops()
+    # Put a stop on every destination and start a few lines there
+    terminals = []
+    for lat, lon in maps.DESTINATIONS.values():
+        nearest = min(range(len(stops)), key=lambda i: (stops[i][0] - lat) ** 2 + (stops[i][1] - lon) ** 2)
+        stops[nearest] = (lat, lon)
+        terminals.append(nearest)
+    os.makedirs(path, exist_ok=True)
+
+    def write(name, header, rows):
+        with open(os.path.join(path, name), "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+
+    write("stops.txt", ["stop_id", "stop_name", "stop_lat", "stop_lon"],
+          [(f"s{i}", f"Stop {i}", f"{lat:.6f}", f"{lon:.6f}") for i, (lat, lon) in enumerate(stops)])
+    write("calendar.txt", ["service_id", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday", "start_date", "end_date"],
+          [("daily", 1, 1, 1, 1, 1, 1, 1, "20000101", "20991231")])
+
+    trips, stop_times, served = [], [], set()
+    for line in range(lines):
+        stop = terminals[line % len(terminals)] if line < 4 * len(terminals) else rng.randrange(len(stops))
+        route = [stop]
+        for _ in range(rng.randint(8, 30)):
+            row, col = divmod(route[-1], columns)
+            row, col = row + rng.choice((-1, 0, 1)), col + rng.choice((-1, 0, 1))
+            candidate = row * columns + col
+            if 0 <= row and 0 <= col < columns and candidate < len(stops) and candidate not in route:
+                route.append(candidate)
+        served.update(route)
+        hops = [rng.randint(60, 240) + int(GRID_KM / SPEED_KM_PER_MIN * 60) for _ in route[1:]]
+        headway = rng.choice((10, 15, 20, 30, 60)) * 60
+        offset = rng.randrange(headway)
+        for direction, sequence, seconds in ((0, route, hops), (1, route[::-1], hops[::-1])):
+            for n, start in enumerate(range(5 * 3600 + offset, 23 * 3600, headway)):
+                trip = f"l{line}d{direction}t{n}"
+                trips.append((f"r{line}", "daily", trip))
+                time_now = start
+                for i, stop in enumerate(sequence):
+                    if i:
+                        time_now += seconds[i - 1]
+                    clock = f"{time_now // 3600:02d}:{time_now % 3600 // 60:02d}:{time_now % 60:02d}"
+                    stop_times.append((trip, clock, clock, f"s{stop}", i + 1))
+    write("trips.txt", ["route_id", "service_id", "trip_id"], trips)
+    write("stop_times.txt", ["trip_id", "arrival_time", "departure_time", "stop_id", "stop_sequence"], stop_times)
+    return (len(stops), len(trips), len(stop_times)), [stops[i] for i in sorted(served)]
+
+def connection_scan(network, sources, targets, departure):
+    """Earliest arrival at each target by scanning every connection once, as a reference for the router."""
+    rows, times = connections(network)
+    stop_count = len(network.stop_ids)
+    walked = np.full(stop_count, gtfsRouter.INF, np.int64)   # reached on foot from the origin
+    arrived = np.full(stop_count, gtfsRouter.INF, np.int64)  # reached by vehicle or transfer
+    for stop, seconds in sources.items():
+        walked[stop] = departure + seconds
+    on_board = set()
+    for dep_time, arr_time, from_stop, to_stop, trip in rows[np.searchsorted(times, departure):]:
+        if dep_time > departure + gtfsRouter.MAX_JOURNEY:
+            break
+        if trip in on_board or min(walked[from_stop], arrived[from_stop] + gtfsRouter.TRANSFER_SLACK) <= dep_time:
+            on_board.add(trip)
+            if arr_time < arrived[to_stop]:
+                arrived[to_stop] = arr_time
+                start, end = network.transfer_offsets[to_stop], network.transfer_offsets[to_stop + 1]
+                for other, seconds in zip(network.transfer_targets[start:end], network.transfer_seconds[start:end]):
+                    arrived[other] = min(arrived[other], arr_time + seconds)
+    return [min((arrived[stop] + seconds for stop, seconds in target.items()), default=gtfsRouter.INF) for target in targets]
+
+connection_cache = {}
+
+def connections(network):
+    if id(network) not in connection_cache:
+        rows = []
+        for pattern in range(len(network.pattern_stop_offsets) - 1):
+            arrivals, departures = network.times(pattern)
+            stops = network.pattern_stops[network.pattern_stop_offsets[pattern]:network.pattern_stop_offsets[pattern + 1]]
+            for trip in range(len(arrivals)):
+                for i in range(len(stops) - 1):
+                    rows.append((int(departures[trip, i]), int(arrivals[trip, i + 1]), int(stops[i]), int(stops[i + 1]), (pattern, trip)))
+        rows.sort(key=lambda row: (row[0], row[1]))
+        connection_cache[id(network)] = rows, np.array([row[0] for row in rows])
+    return connection_cache[id(network)]
+
+def seed_stations(db_path, stations, served, rng):
+    """Stations a few hundred meters from served stops, like real stations next to their platforms."""
+    with transaction(db_path) as conn:
+        migrate(conn, STATION_GEO_MIGRATIONS)
+        conn.executemany(
+            "INSERT INTO stations_geo (url, address, latitude, longitude) VALUES (?, ?, ?, ?)",
+            [
+                (f"https://example.invalid/{i}", "Bench", lat + rng.uniform(-0.003, 0.003), lon + rng.uniform(-0.003, 0.003))
+                for i, (lat, lon) in enumerate(rng.sample(served, min(stations, len(served))))
+            ]
+        )
+
+def run_benchmark(lines=300, stations=500, seed=0):
+    rng = random.Random(seed)
+    scratch = tempfile.mkdtemp()
+    gtfsRouter.GTFS_DIR = os.path.join(scratch, "gtfs")
+    gtfsRouter.NETWORK_FILE = os.path.join(scratch, "bench_network.npz")
+    maps.DB_FILE = os.path.join(scratch, "bench_travel_times.db")
+    maps.STATIONS_GEO_DB = os.path.join(scratch, "bench_stations_geo.db")
+    (stop_count, trip_count, stop_time_count), served = write_feed(os.path.join(gtfsRouter.GTFS_DIR, "bench"), lines, rng)
+    print(f"🚉 Synthetic feed: {stop_count} stops, {trip_count} trips, {stop_time_count} stop times")
+    seed_stations(maps.STATIONS_GEO_DB, stations, served, rng)
+
+    start = time.perf_counter()
+    gtfsRouter.compute_travel_times()
+    print(f"⏱️ Full matrix including the network build in {time.perf_counter() - start:.1f} s")
+    start = time.perf_counter()
+    gtfsRouter.compute_travel_times(replace=True)
+    print(f"⏱️ Again from the saved network in {time.perf_counter() - start:.1f} s")
+
+if __name__ == "__main__":
+    # python benchGtfs.py [lines] [stations]
+    run_benchmark(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import random
+import hashlib
+import tempfile
+import maps
+import jobQueue
+import travelMatrix
+from storage import transaction
+from throttle import configure_host
+from migrations import migrate, STATION_GEO_MIGRATIONS
+from standInServer import StandInServer
+
+# Stand-in for the Distance Matrix API: deterministic transit durations per
+# origin, destination and departure, ~100 ms latency, an occasional
+# OVER_QUERY_LIMIT to exercise the backoff, and 400s past the element limits.
+# The correctness checks live in tests/test_travelMatrix.py; this only measures throughput
+LATENCY = 0.1
+OVER_LIMIT_RATE = 0.03
+UNREACHABLE_RATE = 0.01
+MATRIX_PATH = "/maps/api/distancematrix/json"
+
+def fake_minutes(origin, destination, departure):
+    """Travel time in minutes, or None when the pair has no connection."""
+    digest = hashlib.sha1(f"{origin}|{destination}".encode("utf-8")).digest()
+    if digest[0] / 255 < UNREACHABLE_RATE:
+        return None
+    slot = int(departure) // 1800
+    return 30 + digest[1] % 120 + hashlib.sha1(f"{origin}|{destination}|{slot}".encode("utf-8")).digest()[0] % 25
+
+def matrix_answer(query):
+    """(status_code, payload) the real API would give for a request, without latency or quota errors."""
+    origins = query["origins"][0].split("|")
+    destinations = query["destinations"][0].split("|")
+    if len(origins) > travelMatrix.MAX_ORIGINS or len(origins) * len(destinations) > travelMatrix.MAX_ELEMENTS:
+        return 400, None
+    rows = []
+    for origin in origins:
+        row = []
+        for destination in destinations:
+            minutes = fake_minutes(origin, destination, query["departure_time"][0])
+            row.append({"status": "OK", "duration": {"value": minutes * 60}} if minutes else {"status": "ZERO_RESULTS"})
+        rows.append({"elements": row})
+    return 200, {"status": "OK", "rows": rows}
+
+def respond(query):
+    time.sleep(LATENCY)
+    if random.random() < OVER_LIMIT_RATE:
+        return 200, {"status": "OVER_QUERY_LIMIT", "rows": []}
+    return matrix_answer(query)
+
+def seed_stations(db_path, stations):
+    with transaction(db_path) as conn:
+        migrate(conn, STATION_GEO_MIGRATIONS)
+        conn.executemany(
+            "INSERT INTO stations_geo (url, address, latitude, longitude) VALUES (?, ?, ?, ?)",
+            [(f"https://example.invalid/{i}", "Bench", 47.5 + i / 1000, 16.0 + i / 2000) for i in range(stations)]
+        )
+
+def expected_travel_times(stations):
+    """What the stand-in's answers should reduce to, computed without HTTP."""
+    expected = {}
+    for station, lat, lon in stations:
+        for name, (dest_lat, dest_lon) in maps.DESTINATIONS.items():
+            times = [
+                (fake_minutes(f"{lat},{lon}", f"{dest_lat},{dest_lon}", int(departure.timestamp())), departure)
+                for departure in maps.departure_times()
+            ]
+            times = [(minutes, departure) for minutes, departure in times if minutes is not None]
+            if times:
+                minutes, departure = min(times, key=lambda t: (t[0], t[1]))
+                expected[(station, name)] = (minutes, departure.strftime("%H:%M"))
+    return expected
+
+def run_benchmark(stations=500, workers=4, qps=20):
+    scratch = tempfile.mkdtemp()
+    maps.DB_FILE = os.path.join(scratch, "bench_travel_times.db")
+    maps.STATIONS_GEO_DB = os.path.join(scratch, "bench_stations_geo.db")
+    jobQueue.JOBS_DB = os.path.join(scratch, "bench_jobs.db")
+    travelMatrix.BACKOFF_BASE = 0.1
+    seed_stations(maps.STATIONS_GEO_DB, stations)
+    with StandInServer(respond, MATRIX_PATH) as server:
+        travelMatrix.DISTANCE_MATRIX_URL = server.url
+        configure_host(server.url, qps)
+        start = time.perf_counter()
+        travelMatrix.compute_travel_times(workers)
+        elapsed = time.perf_counter() - start
+        slots = len(list(maps.departure_times()))
+        print(f"⏱️ {stations} stations in {elapsed:.1f} s with {workers} workers at {qps} requests/s, {len(server.queries)} requests "
+              f"({stations * len(maps.DESTINATIONS) * slots} Directions calls before)")
+
+if __name__ == "__main__":
+    # python benchMatrix.py [stations] [workers] [qps]
+    run_benchmark(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+import random
+import tempfile
+import maps
+from config import PROFILE_SLOT_MINUTES
+from storage import transaction
+from travelProfiles import Profile
+
+# Synthetic departures for each pair: one or two lines at their own headway, some
+# only running part of the day, so profiles differ in frequency as well as speed.
+# tests/test_travelProfiles.py checks the summaries against brute_force; this only measures speed
+HEADWAYS = (15, 30, 60, 120, 480)
+
+def build_journeys(rng):
+    journeys = []
+    for _ in range(rng.randint(1, 2)):
+        headway = rng.choice(HEADWAYS)
+        first, last = rng.choice(((5 * 60, 23 * 60), (6 * 60, 12 * 60), (14 * 60, 20 * 60)))
+        base = rng.randint(20, 150)
+        for departure in range(first + rng.randrange(headway), last, headway):
+            journeys.append((departure, departure + base + rng.randint(0, 6)))
+    return journeys
+
+def brute_force(journeys, slot):
+    """Minutes from leaving at a slot to the earliest arrival of a journey that can still be caught."""
+    arrivals = [arrival for departure, arrival in journeys if departure >= slot]
+    return min(arrivals) - slot if arrivals else None
+
+def run_benchmark(pairs=10000, seed=0):
+    rng = random.Random(seed)
+    maps.DB_FILE = os.path.join(tempfile.mkdtemp(), "bench_travel_times.db")
+    maps.init_db()
+    journeys = {
+        (f"station{i}", name): build_journeys(rng) for i in range(pairs // len(maps.DESTINATIONS)) for name in maps.DESTINATIONS
+    }
+
+    start = time.perf_counter()
+    profiles = {key: Profile.from_journeys(trips, maps.START_TIME, maps.END_TIME, PROFILE_SLOT_MINUTES) for key, trips in journeys.items()}
+    maps.save_travel_profiles(profiles)
+    print(f"📦 Built and saved {len(profiles)} profiles in {time.perf_counter() - start:.2f} s")
+    with transaction(maps.DB_FILE) as conn:
+        size = conn.execute("SELECT SUM(LENGTH(arrivals)) FROM travel_profiles").fetchone()[0]
+    print(f"💾 {size / len(profiles):.0f} bytes of slots per pair")
+
+    # What the export does for every pair
+    start = time.perf_counter()
+    summaries = {key: profile.summary() for key, profile in maps.load_travel_profiles().items()}
+    print(f"⏱️ Loaded and summarized {len(summaries)} profiles in {time.perf_counter() - start:.2f} s")
+
+if __name__ == "__main__":
+    # python benchProfiles.py [pairs]
+    run_benchmark(*(int(arg) for arg in sys.argv[1:2]))
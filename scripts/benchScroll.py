@@ -0,0 +1,84 @@
+import sys
+import time
+import random
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from willhaben import create_driver, slow_scroll, count_ad_links
+
+# Results page stand-in: 5 entries per batch, next batch lazy-loads 300 ms after reaching the bottom
+FIXTURE_PAGE = """<!DOCTYPE html>
+<html><body>
+<div id="results"></div>
+<script>
+const total = %(total)d;
+let loaded = 0, loading = false;
+function addBatch() {
+    const results = document.getElementById("results");
+    for (let i = 0; i < 5 && loaded < total; i++, loaded++) {
+        const entry = document.createElement("div");
+        entry.style.height = "400px";
+        entry.innerHTML = `<a data-testid="search-result-entry-header-${loaded}" href="/iad/ad/${loaded}">Ad ${loaded}</a>`;
+        results.appendChild(entry);
+    }
+    loading = false;
+}
+addBatch();
+window.addEventListener("scroll", () => {
+    if (!loading && loaded < total && window.innerHeight + window.scrollY >= document.body.scrollHeight - 200) {
+        loading = true;
+        setTimeout(addBatch, 300);
+    }
+});
+</script>
+</body></html>
+"""
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = (FIXTURE_PAGE % {"total": 25}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def fixed_sleep_scroll(driver, max_scrolls=10):
+    """The previous slow_scroll: 3 steps with random sleeps plus a 2 s pause per round."""
+    last_height = driver.execute_script("return document.body.scrollHeight")
+    for _ in range(max_scrolls):
+        for _ in range(3):
+            driver.execute_script("window.scrollBy(0, 300);")
+            time.sleep(random.uniform(1.2, 2.5))
+        time.sleep(2)
+        new_height = driver.execute_script("return document.body.scrollHeight")
+        if new_height == last_height:
+            break
+        last_height = new_height
+
+def time_scroll(driver, url, scroll):
+    driver.get(url)
+    start = time.perf_counter()
+    scroll(driver)
+    return time.perf_counter() - start, count_ad_links(driver)
+
+def run_benchmark(rounds=3):
+    server = HTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+    driver = create_driver()
+    try:
+        for name, scroll in (("fixed sleeps", fixed_sleep_scroll), ("adaptive", slow_scroll)):
+            timings = []
+            for _ in range(rounds):
+                elapsed, found = time_scroll(driver, url, scroll)
+                timings.append(elapsed)
+            print(f"⏱️ {name}: {sum(timings) / len(timings):.1f} s per page ({found} ads loaded)")
+    finally:
+        driver.quit()
+        server.shutdown()
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
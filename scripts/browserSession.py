@@ -0,0 +1,136 @@
+import os
+import atexit
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import WebDriverException
+from webdriver_manager.chrome import ChromeDriverManager
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DRIVER_PATH_FILE = os.path.abspath(os.path.join(BASE_DIR, "../data/.chromedriver_path"))
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# Chrome flags per kind of browser we start
+PROFILES = {
+    "willhaben": [
+        "--headless",
+        "--disable-blink-features=AutomationControlled",
+        "--no-sandbox",
+        "--disable-dev-shm-usage",
+        f"user-agent={USER_AGENT}",
+    ],
+    "remax": ["--headless", "--disable-gpu", "--no-sandbox"],
+    "remax-visible": ["--disable-gpu", "--no-sandbox"],
+    "oebb": ["--headless", "--disable-gpu", "--no-sandbox"],
+}
+
+driver_path_lock = threading.Lock()
+resolved_driver_path = None
+
+def get_driver_path():
+    """Resolve the chromedriver binary once and remember it across runs."""
+    global resolved_driver_path
+    with driver_path_lock:
+        if resolved_driver_path:
+            return resolved_driver_path
+        if os.path.exists(DRIVER_PATH_FILE):
+            with open(DRIVER_PATH_FILE, "r", encoding="utf-8") as f:
+                cached = f.read().strip()
+            if cached and os.path.exists(cached):
+                resolved_driver_path = cached
+                return resolved_driver_path
+        resolved_driver_path = ChromeDriverManager().install()
+        os.makedirs(os.path.dirname(DRIVER_PATH_FILE), exist_ok=True)
+        with open(DRIVER_PATH_FILE, "w", encoding="utf-8") as f:
+            f.write(resolved_driver_path)
+        return resolved_driver_path
+
+def new_driver(profile="willhaben"):
+    """Start a fresh Chrome with the profile's flags, reusing the cached driver binary."""
+    options = webdriver.ChromeOptions()
+    for argument in PROFILES[profile]:
+        options.add_argument(argument)
+    try:
+        return webdriver.Chrome(service=Service(get_driver_path()), options=options)
+    except WebDriverException:
+        # The cached binary may no longer match the installed Chrome
+        forget_driver_path()
+        return webdriver.Chrome(service=Service(get_driver_path()), options=options)
+
+def forget_driver_path():
+    global resolved_driver_path
+    with driver_path_lock:
+        resolved_driver_path = None
+        if os.path.exists(DRIVER_PATH_FILE):
+            os.remove(DRIVER_PATH_FILE)
+
+class DriverPool:
+    """Keeps started browsers warm so later searches in the same process skip startup and cookie banners."""
+
+    def __init__(self):
+        self.idle = {}
+        self.accepted_hosts = {}  # id(driver) -> hosts whose cookie banner was accepted
+        self.lock = threading.Lock()
+
+    def acquire(self, profile="willhaben"):
+        with self.lock:
+            idle = self.idle.get(profile)
+            if idle:
+                return idle.pop()
+        print(f"🌐 Starting {profile} browser...")
+        return new_driver(profile)
+
+    def release(self, driver, profile="willhaben"):
+        if not self.is_alive(driver):
+            self.discard(driver)
+            return
+        with self.lock:
+            self.idle.setdefault(profile, []).append(driver)
+
+    def is_alive(self, driver):
+        try:
+            driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+    def discard(self, driver):
+        self.accepted_hosts.pop(id(driver), None)
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    def accept_cookies_once(self, driver, accept):
+        """Run `accept` only the first time this browser visits the current host."""
+        host = urlparse(driver.current_url).netloc
+        hosts = self.accepted_hosts.setdefault(id(driver), set())
+        if host in hosts:
+            return
+        accept(driver)
+        hosts.add(host)
+
+    def close_all(self):
+        with self.lock:
+            drivers = [driver for idle in self.idle.values() for driver in idle]
+            self.idle = {}
+        for driver in drivers:
+            self.discard(driver)
+
+pool = DriverPool()
+atexit.register(pool.close_all)
+
+@contextmanager
+def browser(profile="willhaben"):
+    """Borrow a warm browser from the process-wide pool."""
+    driver = pool.acquire(profile)
+    try:
+        yield driver
+    finally:
+        pool.release(driver, profile)
+
+def accept_cookies_once(driver, accept):
+    pool.accept_cookies_once(driver, accept)
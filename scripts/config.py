@@ -5,3 +5,26 @@ DESTINATIONS = {
 	"Location2": (34.052235, -118.243683),
 	"Location3": (41.878113, -87.629799),
 }
+
+# Politeness budget per host: (requests per second, burst size)
+HOST_RATE_LIMITS = {
+	"www.willhaben.at": (1.0, 3),
+	"www.remax.at": (1.0, 3),
+	"maps.googleapis.com": (20.0, 5),
+}
+
+# Keep compressed copies of every fetched page in data/archive so ads can be re-parsed offline
+ARCHIVE_PAGES = False
+
+# Geocoding endpoint; tests/test_geocodeService.py points it at a local stand-in server
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+GEOCODE_WORKERS = 8
+
+# Distance Matrix endpoint for travelMatrix.py; tests/test_travelMatrix.py points it at a local stand-in server
+DISTANCE_MATRIX_URL = "https://maps.googleapis.com/maps/api/distancematrix/json"
+MATRIX_WORKERS = 4
+MATRIX_ELEMENTS_PER_SECOND = 1000  # Element quota, on top of the per-request budget in HOST_RATE_LIMITS
+
+# Width of the departure slots in the travel-time profiles (travelProfiles.py); a profile holds
+# one arrival per slot from START_TIME to END_TIME, so 5 minutes is 109 slots (218 bytes) per pair
+PROFILE_SLOT_MINUTES = 5
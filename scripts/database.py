@@ -1,60 +1,135 @@
 import sqlite3
 import json
 import os
+import threading
+from storage import transaction, BatchWriter
+from migrations import migrate
+from adAttributes import PROMOTED_COLUMNS, typed_attributes
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_NAME = os.path.join(BASE_DIR, "../data/scraped_ads.db")
 DB_NAME = os.path.abspath(DB_NAME)  # optional, resolves full path
 
 def create_table():
-    """Ensures the database table exists without dropping existing data."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS ads (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            url TEXT UNIQUE,
-            title TEXT,
-            price INTEGER,
-            size REAL,
-            price_per_m2 REAL,
-            zip_code TEXT,
-            city TEXT,
-            region TEXT,
-            price_info TEXT,
-            energy_certificate TEXT,
-            attributes TEXT,
-            date_scraped TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
+    """Brings the database schema up to date without dropping existing data."""
+    with transaction(DB_NAME) as conn:
+        migrate(conn)
 
-    conn.commit()
-    conn.close()
+AD_COLUMNS = ["url", "title", "price", "size", "price_per_m2", "zip_code", "city", "region", "price_info", "energy_certificate", "attributes"]
+AD_COLUMNS += list(PROMOTED_COLUMNS)  # Filled by encode_row from the three JSON dicts
+INSERT_AD_SQL = f'''
+    INSERT INTO ads ({", ".join(AD_COLUMNS)})
+    VALUES ({", ".join("?" for _ in AD_COLUMNS)})
+'''
+INSERT_NEW_AD_SQL = INSERT_AD_SQL.replace("INSERT", "INSERT OR IGNORE", 1)
 
 def insert_ad(url, title, price, size, price_per_m2, zip_code, city, region, price_info, energy_certificate, attributes):
     """Inserts a new ad into the database if it doesn't already exist."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-
     try:
-        cursor.execute('''
-            INSERT INTO ads (url, title, price, size, price_per_m2, zip_code, city, region, price_info, energy_certificate, attributes)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            url, title, price, size, price_per_m2, zip_code, city, region,
-            json.dumps(price_info, ensure_ascii=False),
-            json.dumps(energy_certificate, ensure_ascii=False),
-            json.dumps(attributes, ensure_ascii=False)
-        ))
-
-        conn.commit()
+        with transaction(DB_NAME) as conn:
+            conn.execute(INSERT_AD_SQL, encode_row((
+                url, title, price, size, price_per_m2, zip_code, city, region,
+                price_info, energy_certificate, attributes
+            )))
         print(f"✅ Added to database: {title} ({price}€) | {city}, {region}")
 
     except sqlite3.IntegrityError:
         print(f"⚠️ Skipped (Already in DB): {title}")
 
-    conn.close()
+def encode_row(row):
+    """JSON-encode the dict fields of an insert_ad argument tuple and append the typed attribute columns."""
+    url, title, price, size, price_per_m2, zip_code, city, region, price_info, energy_certificate, attributes = row
+    return (
+        url, title, price, size, price_per_m2, zip_code, city, region,
+        json.dumps(price_info, ensure_ascii=False),
+        json.dumps(energy_certificate, ensure_ascii=False),
+        json.dumps(attributes, ensure_ascii=False)
+    ) + typed_attributes(price_info, energy_certificate, attributes)
+
+def insert_ads(rows):
+    """Inserts a batch of ads in one transaction, ignoring URLs already in the database."""
+    if not rows:
+        return 0
+    with transaction(DB_NAME) as conn:
+        # rowcount, unlike total_changes, leaves out rows written by triggers
+        inserted = conn.executemany(INSERT_NEW_AD_SQL, [encode_row(row) for row in rows]).rowcount
+    print(f"✅ Added {inserted} ads to database ({len(rows) - inserted} already present)")
+    return inserted
+
+UPSERT_AD_SQL = INSERT_AD_SQL + "ON CONFLICT(url) DO UPDATE SET " + ", ".join(
+    f"{column} = excluded.{column}" for column in AD_COLUMNS if column != "url"
+)
+
+def upsert_ads(rows):
+    """Inserts a batch of ads, overwriting the scraped fields of ads that already exist."""
+    if not rows:
+        return 0
+    with transaction(DB_NAME) as conn:
+        conn.executemany(UPSERT_AD_SQL, [encode_row(row) for row in rows])
+    return len(rows)
+
+def get_ads_by_url(urls):
+    """Returns {url: (id, price, size, title)} for the given URLs that are in the database."""
+    if not urls:
+        return {}
+    placeholders = ", ".join("?" for _ in urls)
+    with transaction(DB_NAME) as conn:
+        rows = conn.execute(f"SELECT url, id, price, size, title FROM ads WHERE url IN ({placeholders})", list(urls)).fetchall()
+    return {url: (ad_id, price, size, title) for url, ad_id, price, size, title in rows}
+
+def record_observations(observations):
+    """Records (ad_id, price, size, title) sightings in price_history.
+
+    A sighting that matches the ad's latest history row only moves its last_seen;
+    anything else opens a new row.
+    """
+    if not observations:
+        return
+    with transaction(DB_NAME) as conn:
+        cursor = conn.cursor()
+        for ad_id, price, size, title in observations:
+            latest = cursor.execute('''
+                SELECT id, price, size, title FROM price_history
+                WHERE ad_id = ? ORDER BY id DESC LIMIT 1
+            ''', (ad_id,)).fetchone()
+            if latest and latest[1:] == (price, size, title):
+                cursor.execute("UPDATE price_history SET last_seen = CURRENT_TIMESTAMP WHERE id = ?", (latest[0],))
+            else:
+                cursor.execute(
+                    "INSERT INTO price_history (ad_id, price, size, title) VALUES (?, ?, ?, ?)",
+                    (ad_id, price, size, title)
+                )
+
+def quarantine_ad(ad_data, source, reason):
+    """Keep a rejected ad out of ads but on record, with everything that was scraped."""
+    with transaction(DB_NAME) as conn:
+        conn.execute(
+            "INSERT INTO quarantine (url, source, reason, payload) VALUES (?, ?, ?, ?)",
+            (ad_data.get("URL"), source, reason, json.dumps(ad_data, ensure_ascii=False, default=str))
+        )
+    print(f"🚧 Quarantined ({reason}): {ad_data.get('URL')}")
+
+def report_batch(rows, inserted):
+    print(f"✅ Added {inserted} ads to database ({len(rows) - inserted} already present)")
+
+# Crawlers queue ads here; rows are written every 50 ads or 5 seconds, and at exit.
+# Created on first use, so importing this module touches no database
+ad_writer = None
+ad_writer_lock = threading.Lock()
+
+def get_ad_writer():
+    """The shared batched writer for DB_NAME, bringing the schema up to date when it is created."""
+    global ad_writer
+    with ad_writer_lock:
+        if ad_writer is None:
+            create_table()
+            ad_writer = BatchWriter(DB_NAME, INSERT_NEW_AD_SQL, batch_rows=50, flush_seconds=5.0, on_flush=report_batch)
+        return ad_writer
 
-# Ensure the table is created before inserting ads
-create_table()
+def queue_ad(url, title, price, size, price_per_m2, zip_code, city, region, price_info, energy_certificate, attributes):
+    """Buffers an ad for the batched writer; use insert_ad when the row must be visible immediately."""
+    get_ad_writer().add(encode_row((
+        url, title, price, size, price_per_m2, zip_code, city, region,
+        price_info, energy_certificate, attributes
+    )))
+    print(f"📝 Queued for database: {title} ({price}€) | {city}, {region}")
@@ -0,0 +1,147 @@
+import io
+import os
+import re
+import sys
+import difflib
+import zipfile
+import threading
+import unicodedata
+import requests
+from storage import transaction
+from migrations import migrate
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GAZETTEER_DB = os.path.abspath(os.path.join(BASE_DIR, "../data/gazetteer.db"))
+# GeoNames postal code dump for Austria (tab separated, CC-BY)
+GEONAMES_URL = "https://download.geonames.org/export/zip/AT.zip"
+
+FUZZY_CUTOFF = 0.8
+
+def create_postal_places_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS postal_places (
+            zip_code TEXT NOT NULL,
+            place TEXT NOT NULL,
+            place_key TEXT NOT NULL,
+            state TEXT,
+            district TEXT,
+            latitude REAL NOT NULL,
+            longitude REAL NOT NULL,
+            PRIMARY KEY (zip_code, place)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_postal_places_key ON postal_places (place_key)")
+
+GAZETTEER_MIGRATIONS = [create_postal_places_table]
+
+def place_key(name):
+    """Spelling-insensitive form of a place name: 'St. Pölten' and 'Sankt Poelten' both become 'sanktpoelten'."""
+    name = (name or "").lower().strip()
+    for umlaut, spelled in (("ä", "ae"), ("ö", "oe"), ("ü", "ue"), ("ß", "ss")):
+        name = name.replace(umlaut, spelled)
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    name = re.sub(r"\bst\.?\s", "sankt ", name)
+    return re.sub(r"[^a-z0-9]", "", name)
+
+def read_geonames(text):
+    """Yield postal_places rows from a GeoNames postal code dump."""
+    for line in text.splitlines():
+        fields = line.split("\t")
+        if len(fields) < 11 or not fields[9] or not fields[10]:
+            continue
+        zip_code, place, state, district = fields[1], fields[2], fields[3], fields[5]
+        yield zip_code, place, place_key(place), state, district, float(fields[9]), float(fields[10])
+
+def load_dump(source):
+    """Text of a GeoNames dump from a .txt or .zip path, or downloaded when no path is given."""
+    if source is None:
+        print(f"⬇️ Downloading {GEONAMES_URL}...")
+        response = requests.get(GEONAMES_URL, timeout=60)
+        response.raise_for_status()
+        data = response.content
+    else:
+        with open(source, "rb") as f:
+            data = f.read()
+    if data[:2] == b"PK":
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            name = next(n for n in archive.namelist() if n.endswith(".txt") and not n.lower().startswith("readme"))
+            data = archive.read(name)
+    return data.decode("utf-8")
+
+def import_gazetteer(source=None):
+    """Replace the gazetteer with the places of a GeoNames postal code dump."""
+    rows = list(read_geonames(load_dump(source)))
+    with transaction(GAZETTEER_DB) as conn:
+        migrate(conn, GAZETTEER_MIGRATIONS)
+        conn.execute("DELETE FROM postal_places")
+        conn.executemany("INSERT OR REPLACE INTO postal_places VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    gazetteer.reset()
+    print(f"✅ Imported {len(rows)} postal places into {GAZETTEER_DB}")
+    return len(rows)
+
+class Gazetteer:
+    """In-memory view of postal_places, loaded on first lookup."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_zip = None  # zip_code -> [(place_key, latitude, longitude)]
+        self.by_key = None  # place_key -> [(latitude, longitude)]
+
+    def reset(self):
+        with self.lock:
+            self.by_zip = self.by_key = None
+
+    def load(self):
+        with self.lock:
+            if self.by_zip is not None:
+                return
+            by_zip, by_key = {}, {}
+            if os.path.exists(GAZETTEER_DB):
+                with transaction(GAZETTEER_DB) as conn:
+                    migrate(conn, GAZETTEER_MIGRATIONS)
+                    rows = conn.execute("SELECT zip_code, place_key, latitude, longitude FROM postal_places").fetchall()
+                for zip_code, key, latitude, longitude in rows:
+                    by_zip.setdefault(zip_code, []).append((key, latitude, longitude))
+                    by_key.setdefault(key, []).append((latitude, longitude))
+            self.by_zip, self.by_key = by_zip, by_key
+
+    def resolve(self, zip_code, city):
+        """Coordinates for a ZIP code and/or city, or None when the gazetteer cannot tell."""
+        self.load()
+        key = place_key(city)
+        places = self.by_zip.get((zip_code or "").strip(), [])
+
+        if places:
+            for place, latitude, longitude in places:
+                if place == key:
+                    return latitude, longitude
+            # 'Wien' vs 'Wien, Favoriten', or a misspelt village in the right ZIP code
+            if len(key) >= 4:
+                for place, latitude, longitude in places:
+                    if place.startswith(key) or key.startswith(place):
+                        return latitude, longitude
+                close = difflib.get_close_matches(key, [place for place, _, _ in places], n=1, cutoff=FUZZY_CUTOFF)
+                if close:
+                    return next((lat, lon) for place, lat, lon in places if place == close[0])
+            # Every place in a ZIP code lies close together; use their centre
+            return (
+                sum(lat for _, lat, _ in places) / len(places),
+                sum(lon for _, _, lon in places) / len(places),
+            )
+
+        if key in self.by_key and len(self.by_key[key]) == 1:
+            return self.by_key[key][0]
+        if key:
+            close = difflib.get_close_matches(key, self.by_key.keys(), n=1, cutoff=FUZZY_CUTOFF)
+            if close and len(self.by_key[close[0]]) == 1:  # An ambiguous name without a ZIP code is no answer
+                return self.by_key[close[0]][0]
+        return None
+
+gazetteer = Gazetteer()
+
+def resolve(zip_code, city):
+    return gazetteer.resolve(zip_code, city)
+
+if __name__ == "__main__":
+    # python gazetteer.py [AT.zip | AT.txt]  (no path: download from GeoNames)
+    import_gazetteer(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,167 @@
+import os
+import re
+import time
+import random
+import threading
+import unicodedata
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from config import GOOGLE_API_KEY, GEOCODE_URL, GEOCODE_WORKERS
+from storage import transaction
+from migrations import migrate
+from throttle import throttle
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DB = os.path.abspath(os.path.join(BASE_DIR, "../data/geocode_cache.db"))
+REQUEST_TIMEOUT = 10
+
+# Answers worth retrying: quota bursts and transient server errors
+RETRY_STATUSES = {"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"}
+# Answers that will not change on a retry, so they are cached like hits
+FINAL_STATUSES = {"OK", "ZERO_RESULTS"}
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0   # seconds before the first retry, doubled on each further one
+BACKOFF_MAX = 32.0
+
+api_call_count = 0
+api_call_lock = threading.Lock()
+
+def create_geocode_cache_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS geocode_cache (
+            query_key TEXT PRIMARY KEY,
+            query TEXT,
+            status TEXT NOT NULL,
+            latitude REAL,
+            longitude REAL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    """)
+
+GEOCODE_CACHE_MIGRATIONS = [create_geocode_cache_table]
+
+def create_session(pool_size=GEOCODE_WORKERS):
+    """Keep-alive session sized so every geocoding worker has its own pooled connection."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+session = create_session()
+
+def query_key(query):
+    """Cache key for a query: case, spacing and punctuation differences map to the same entry."""
+    query = unicodedata.normalize("NFC", query or "").casefold()
+    query = re.sub(r"[,;]+", ",", query)
+    query = re.sub(r"\s*,\s*", ", ", query)
+    return re.sub(r"\s+", " ", query).strip(" ,")
+
+def backoff_delay(attempt):
+    """Exponential backoff with jitter so parallel workers do not retry in lockstep."""
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+def request_geocode(address):
+    """Ask the geocoding API for an address, retrying quota and server errors with backoff.
+
+    Returns (status, (latitude, longitude) or None).
+    """
+    global api_call_count
+    for attempt in range(MAX_RETRIES + 1):
+        throttle(GEOCODE_URL)  # Only real API calls spend the QPS budget
+        with api_call_lock:
+            api_call_count += 1
+        try:
+            response = session.get(
+                GEOCODE_URL, params={"address": address, "key": GOOGLE_API_KEY}, timeout=REQUEST_TIMEOUT
+            )
+            if response.status_code >= 500:
+                status = f"HTTP {response.status_code}"
+            else:
+                data = response.json()
+                status = data["status"]
+                if status == "OK":
+                    location = data["results"][0]["geometry"]["location"]
+                    return status, (location["lat"], location["lng"])
+                if status not in RETRY_STATUSES:
+                    print(f"⚠️ Geocoding failed for: {address} ({status})")
+                    return status, None
+        except (requests.RequestException, ValueError) as e:
+            status = str(e)
+
+        if attempt < MAX_RETRIES:
+            delay = backoff_delay(attempt)
+            print(f"⏳ {status} for {address}, retrying in {delay:.1f} s")
+            time.sleep(delay)
+    print(f"❌ Giving up on {address} after {MAX_RETRIES + 1} attempts ({status})")
+    return status, None
+
+def load_cached(keys, chunk_size=500):
+    """{query_key: (latitude, longitude) or None} for the keys already answered."""
+    keys = list(keys)
+    cached = {}
+    with transaction(CACHE_DB) as conn:
+        migrate(conn, GEOCODE_CACHE_MIGRATIONS)
+        for i in range(0, len(keys), chunk_size):
+            chunk = keys[i:i + chunk_size]
+            rows = conn.execute(
+                f"SELECT query_key, latitude, longitude FROM geocode_cache WHERE query_key IN ({', '.join('?' for _ in chunk)})",
+                chunk
+            ).fetchall()
+            for key, latitude, longitude in rows:
+                cached[key] = (latitude, longitude) if latitude is not None else None
+    return cached
+
+def store_results(results):
+    """Persist {query_key: (query, status, coordinates)} for final answers only."""
+    rows = [
+        (key, query, status, *(coordinates or (None, None)))
+        for key, (query, status, coordinates) in results.items() if status in FINAL_STATUSES
+    ]
+    if not rows:
+        return
+    with transaction(CACHE_DB) as conn:
+        migrate(conn, GEOCODE_CACHE_MIGRATIONS)
+        conn.executemany("""
+            INSERT OR REPLACE INTO geocode_cache (query_key, query, status, latitude, longitude)
+            VALUES (?, ?, ?, ?, ?)
+        """, rows)
+
+def geocode_many(queries, workers=GEOCODE_WORKERS):
+    """Geocode a batch of address strings: {query: (latitude, longitude) or None}.
+
+    Each distinct normalized query is looked up once, cached answers cost no
+    network call, and misses are fetched concurrently under the QPS limit.
+    """
+    queries = list(dict.fromkeys(q for q in queries if q))
+    keys = {query: query_key(query) for query in queries}
+    cached = load_cached(set(keys.values()))
+
+    missing = {}
+    for query, key in keys.items():
+        if key not in cached:
+            missing.setdefault(key, query)
+
+    results = {}
+    if missing:
+        print(f"🌍 Geocoding {len(missing)} of {len(keys)} queries ({len(keys) - len(missing)} cached)")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for (key, query), (status, coordinates) in zip(missing.items(), executor.map(request_geocode, missing.values())):
+                results[key] = (query, status, coordinates)
+        store_results(results)
+
+    answers = dict(cached)
+    answers.update({key: coordinates for key, (_, _, coordinates) in results.items()})
+    return {query: answers.get(key) for query, key in keys.items()}
+
+def has_no_result(query):
+    """True when the API already answered ZERO_RESULTS for the query, which a retry would only repeat from the cache."""
+    with transaction(CACHE_DB) as conn:
+        migrate(conn, GEOCODE_CACHE_MIGRATIONS)
+        row = conn.execute("SELECT status FROM geocode_cache WHERE query_key = ?", (query_key(query),)).fetchone()
+    return row is not None and row[0] == "ZERO_RESULTS"
+
+def geocode(query):
+    """Geocode one address string through the shared cache."""
+    return geocode_many([query], workers=1).get(query)
@@ -1,97 +1,89 @@
-import time
-import sqlite3
-import googlemaps
-from config import GOOGLE_API_KEY
-
-API_KEY = GOOGLE_API_KEY
-gmaps = googlemaps.Client(key=API_KEY)
+import os
+from config import GEOCODE_WORKERS
+from storage import transaction
+from migrations import migrate, STATION_GEO_MIGRATIONS
+from geocodeService import geocode, geocode_many, has_no_result
+from jobQueue import enqueue, register_handler, start_worker, PermanentJobError
+import badnerBahn
 
 # New SQLite DB file
-DB_FILE = "../data/oebb_stations_geo.db"
-FAILED_FILE = "../data/failed_geocoding.txt"
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_FILE = os.path.abspath(os.path.join(BASE_DIR, "../data/oebb_stations_geo.db"))
+STATIONS_DB = os.path.abspath(os.path.join(BASE_DIR, "../data/oebb_stations.db"))  # Written by oebb.py
 
 def init_db():
     """Create a new database table to store URLs, addresses, and GPS coordinates."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS stations_geo (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            url TEXT UNIQUE,
-            address TEXT,
-            latitude REAL,
-            longitude REAL
-        )
-    """)
-    conn.commit()
-    conn.close()
+    with transaction(DB_FILE) as conn:
+        migrate(conn, STATION_GEO_MIGRATIONS)
 
 def address_exists(url):
     """Check if a station URL is already in the new database."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM stations_geo WHERE url = ?", (url,))
-    result = cursor.fetchone()
-    conn.close()
+    with transaction(DB_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM stations_geo WHERE url = ?", (url,))
+        result = cursor.fetchone()
     return result is not None
 
-def get_coordinates(address):
-    """Fetch latitude and longitude using Google Maps API."""
-    try:
-        geocode_result = gmaps.geocode(address)
-        if geocode_result:
-            location = geocode_result[0]["geometry"]["location"]
-            return location["lat"], location["lng"]
-    except Exception as e:
-        print(f"⚠️ Google Maps API failed for: {address} | Error: {e}")
-    return None, None
-
 def save_to_db(url, address, latitude, longitude):
     """Insert station data into the new database."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT OR IGNORE INTO stations_geo (url, address, latitude, longitude)
-        VALUES (?, ?, ?, ?)
-    """, (url, address, latitude, longitude))
-    conn.commit()
-    conn.close()
+    with transaction(DB_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT OR IGNORE INTO stations_geo (url, address, latitude, longitude)
+            VALUES (?, ?, ?, ?)
+        """, (url, address, latitude, longitude))
 
 def save_failed(url, address):
-    """Save failed addresses to a text file for later reprocessing."""
-    with open(FAILED_FILE, "a", encoding="utf-8") as fail_file:
-        fail_file.write(f"{url}|{address}\n")
+    """Queue a failed address for automatic retries, unless the API found nothing for it."""
+    if has_no_result(address):
+        print(f"🚫 No geocoding result for {address}; not queued for retry")
+        return
+    enqueue("geocode", f"stations_geo|{url}", {"table": "stations_geo", "name": url, "query": address}, error="no coordinates")
+
+def geocode_job(payload):
+    """Retry handler for queued station geocoding, for both ÖBB and Badner Bahn stations."""
+    coordinates = geocode(payload["query"])
+    if coordinates is None:
+        if has_no_result(payload["query"]):
+            raise PermanentJobError(f"No geocoding result for {payload['query']}")
+        raise LookupError(f"No coordinates for {payload['query']}")
+    if payload["table"] == "badner_bahn":
+        badnerBahn.save_to_db(payload["name"], *coordinates)
+    else:
+        save_to_db(payload["name"], payload["query"], *coordinates)
 
-# Initialize the new database
-init_db()
+register_handler("geocode", geocode_job, concurrency=4)
 
-# Read existing database with full addresses
-old_db = "../data/oebb_stations.db"
-conn_old = sqlite3.connect(old_db)
-cursor_old = conn_old.cursor()
-cursor_old.execute("SELECT url, postal_code FROM stations")  # Full address is in postal_code
+def geocode_stations(workers=GEOCODE_WORKERS):
+    """Geocode every ÖBB station address not yet in stations_geo through the shared geocoding service."""
+    # Initialize the new database
+    init_db()
 
-stations = cursor_old.fetchall()
-conn_old.close()
+    # Read existing database with full addresses
+    with transaction(STATIONS_DB) as conn_old:
+        cursor_old = conn_old.cursor()
+        cursor_old.execute("SELECT url, postal_code FROM stations")  # Full address is in postal_code
 
-# Process and store each station
-for url, address in stations:
-    if address_exists(url):
-        print(f"⏩ Skipping (already in DB): {url}")
-        continue
+        stations = cursor_old.fetchall()
 
-    print(f"🌍 Fetching coordinates for: {address}")
+    worker = start_worker(["geocode"])  # Retries earlier failures alongside this run
+    stations = [(url, address) for url, address in stations if not address_exists(url)]
+    print(f"🌍 Fetching coordinates for {len(stations)} stations")
+    coordinates = geocode_many([address for _, address in stations], workers)
 
-    lat, lon = get_coordinates(address)
+    # Process and store each station
+    for url, address in stations:
+        lat, lon = coordinates.get(address) or (None, None)
 
-    if lat and lon:
-        save_to_db(url, address, lat, lon)
-        print(f"✅ Saved: {address} → ({lat}, {lon})")
-    else:
-        print(f"❌ Failed to get coordinates: {address}")
-        save_failed(url, address)  # Save to failed list
+        if lat and lon:
+            save_to_db(url, address, lat, lon)
+            print(f"✅ Saved: {address} → ({lat}, {lon})")
+        else:
+            print(f"❌ Failed to get coordinates: {address}")
+            save_failed(url, address)  # Queue for retry
 
-    time.sleep(1)  # Avoid hitting API rate limits
+    worker.stop()
+    print(f"✅ Process complete. Data saved in '{DB_FILE}'.")
 
-print(f"✅ Process complete. Data saved in '{DB_FILE}'.")
-print(f"❌ Failed stations logged in '{FAILED_FILE}'.")
+if __name__ == "__main__":
+    geocode_stations()
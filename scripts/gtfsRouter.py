@@ -0,0 +1,498 @@
+import io
+import os
+import csv
+import sys
+import glob
+import time
+import zipfile
+from datetime import datetime
+import numpy as np
+from config import PROFILE_SLOT_MINUTES
+from travelProfiles import Profile
+from maps import DESTINATIONS, START_TIME, END_TIME, init_db, load_stations, save_travel_times, save_travel_profiles
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Unpacked feeds or their .zip files (ÖBB, VOR, Wiener Lokalbahnen, ...), merged into one network
+GTFS_DIR = os.path.abspath(os.path.join(BASE_DIR, "../data/gtfs"))
+NETWORK_FILE = os.path.abspath(os.path.join(BASE_DIR, "../data/gtfs_network.npz"))
+
+WALK_SPEED = 1.0             # m/s, straight-line distance, so slower than a real walk
+MAX_ACCESS_METERS = 1000     # from a station or destination coordinate to a stop
+MAX_TRANSFER_METERS = 300    # between stops when changing trains
+TRANSFER_SLACK = 60          # seconds to change vehicles
+MAX_ROUNDS = 5               # vehicles per journey
+MAX_JOURNEY = 4 * 3600       # arrivals later than this after departure are not explored
+
+INF = np.iinfo(np.int64).max // 4
+EARTH_RADIUS_M = 6371000
+
+def parse_time(value):
+    """Seconds after midnight of a GTFS time; past-midnight trips use hours >= 24."""
+    if not value:
+        return None
+    hours, minutes, seconds = value.strip().split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+def clock_seconds(value):
+    hours, minutes = value.split(":")
+    return int(hours) * 3600 + int(minutes) * 60
+
+def distances(lat, lon, lats, lons):
+    """Meters from one point to arrays of points."""
+    phi1, phi2 = np.radians(lat), np.radians(lats)
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+def feed_paths():
+    return sorted(glob.glob(os.path.join(GTFS_DIR, "*.zip")) + [
+        path for path in glob.glob(os.path.join(GTFS_DIR, "*")) if os.path.isdir(path)
+    ])
+
+def read_table(feed, name):
+    """Rows of one GTFS file as dicts; empty when the feed does not have it."""
+    if feed.endswith(".zip"):
+        with zipfile.ZipFile(feed) as archive:
+            if name not in archive.namelist():
+                return []
+            text = archive.read(name).decode("utf-8-sig")
+    else:
+        path = os.path.join(feed, name)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8-sig") as f:
+            text = f.read()
+    return csv.DictReader(io.StringIO(text))
+
+def active_services(feed, day):
+    """service_ids running on a date, from calendar.txt and its calendar_dates.txt exceptions."""
+    date = day.strftime("%Y%m%d")
+    weekday = day.strftime("%A").lower()
+    services = {
+        row["service_id"] for row in read_table(feed, "calendar.txt")
+        if row["start_date"] <= date <= row["end_date"] and row[weekday] == "1"
+    }
+    for row in read_table(feed, "calendar_dates.txt"):
+        if row["date"] == date:
+            if row["exception_type"] == "1":
+                services.add(row["service_id"])
+            else:
+                services.discard(row["service_id"])
+    return services
+
+def fill_times(times):
+    """Stops without a time (not a timepoint) take the previous stop's time."""
+    last = times[0]
+    for i, value in enumerate(times):
+        if value is None:
+            times[i] = last
+        last = times[i]
+    return times
+
+def read_trips(feed, prefix, stop_index, day):
+    """{trip: (stops, arrivals, departures)} for the trips of one feed running on the day."""
+    services = active_services(feed, day)
+    running = {row["trip_id"] for row in read_table(feed, "trips.txt") if row["service_id"] in services}
+    rows = {}
+    for row in read_table(feed, "stop_times.txt"):
+        if row["trip_id"] in running:
+            rows.setdefault(row["trip_id"], []).append((
+                int(row["stop_sequence"]), stop_index[prefix + row["stop_id"]],
+                parse_time(row["arrival_time"]), parse_time(row["departure_time"]),
+            ))
+    trips = {}
+    for trip_id, stop_times in rows.items():
+        stop_times.sort()
+        if len(stop_times) < 2:
+            continue
+        arrivals = [arrival if arrival is not None else departure for _, _, arrival, departure in stop_times]
+        departures = [departure if departure is not None else arrival for _, _, arrival, departure in stop_times]
+        if arrivals[0] is None:
+            continue
+        trips[prefix + trip_id] = (
+            tuple(stop for _, stop, _, _ in stop_times), fill_times(arrivals), fill_times(departures)
+        )
+    return trips
+
+def fifo_groups(trips):
+    """Split trips of one stop sequence so that no trip overtakes another, as route scans assume."""
+    groups = []
+    for arrivals, departures in sorted(trips, key=lambda trip: trip[1][0]):
+        for group in groups:
+            last_arrivals, last_departures = group[-1]
+            if all(a >= b for a, b in zip(arrivals, last_arrivals)) and all(a >= b for a, b in zip(departures, last_departures)):
+                group.append((arrivals, departures))
+                break
+        else:
+            groups.append([(arrivals, departures)])
+    return groups
+
+def transfers_between(lats, lons, max_meters=MAX_TRANSFER_METERS):
+    """Walking links between nearby stops as CSR arrays (offsets, targets, seconds)."""
+    cell = max_meters / 111000  # degrees of latitude; a degree of longitude is shorter by cos(latitude)
+    lon_cell = cell / np.cos(np.radians(lats.max() if len(lats) else 0))
+    cells = {}
+    keys = list(zip(np.floor(lats / cell).astype(int), np.floor(lons / lon_cell).astype(int)))
+    for stop, key in enumerate(keys):
+        cells.setdefault(key, []).append(stop)
+
+    offsets, targets, seconds = [0], [], []
+    for stop, (row, col) in enumerate(keys):
+        nearby = np.array([
+            other for dr in (-1, 0, 1) for dc in (-1, 0, 1) for other in cells.get((row + dr, col + dc), ()) if other != stop
+        ], dtype=np.int64)
+        if len(nearby):
+            meters = distances(lats[stop], lons[stop], lats[nearby], lons[nearby])
+            close = meters <= max_meters
+            targets.extend(nearby[close].tolist())
+            seconds.extend(np.ceil(meters[close] / WALK_SPEED).astype(int).tolist())
+        offsets.append(len(targets))
+    return np.array(offsets, np.int64), np.array(targets, np.int32), np.array(seconds, np.int32)
+
+class Network:
+    """A day's timetable as flat arrays, grouped into patterns (trips sharing one stop sequence).
+
+    - pattern p serves pattern_stops[pattern_stop_offsets[p]:pattern_stop_offsets[p + 1]]
+    - its trips are rows pattern_trip_offsets[p]..[p + 1], sorted by departure,
+      with the times of trip row r at time_offsets[p] + (r - first row) * stops
+    - stop s is served by stop_patterns[stop_pattern_offsets[s]:...[s + 1]],
+      at position stop_pattern_positions of the same slice
+    - transfers from s: transfer_targets/transfer_seconds[transfer_offsets[s]:...[s + 1]]
+    """
+
+    FIELDS = (
+        "stop_ids", "stop_lats", "stop_lons",
+        "pattern_stop_offsets", "pattern_stops", "pattern_trip_offsets", "time_offsets", "arrivals", "departures",
+        "stop_pattern_offsets", "stop_patterns", "stop_pattern_positions",
+        "transfer_offsets", "transfer_targets", "transfer_seconds",
+    )
+
+    def __init__(self, **arrays):
+        for field in self.FIELDS:
+            setattr(self, field, arrays[field])
+
+    @classmethod
+    def build(cls, feeds, day):
+        stop_ids, lats, lons = [], [], []
+        trips = {}
+        for n, feed in enumerate(feeds):
+            prefix = f"{n}:"
+            for row in read_table(feed, "stops.txt"):
+                if row.get("stop_lat") and row.get("stop_lon"):
+                    stop_ids.append(prefix + row["stop_id"])
+                    lats.append(float(row["stop_lat"]))
+                    lons.append(float(row["stop_lon"]))
+            stop_index = {stop_id: i for i, stop_id in enumerate(stop_ids)}
+            trips.update(read_trips(feed, prefix, stop_index, day))
+
+        sequences = {}
+        for stops, arrivals, departures in trips.values():
+            sequences.setdefault(stops, []).append((arrivals, departures))
+
+        pattern_stops, pattern_stop_offsets = [], [0]
+        pattern_trip_offsets, time_offsets = [0], [0]
+        arrivals, departures = [], []
+        for stops, stop_trips in sequences.items():
+            for group in fifo_groups(stop_trips):
+                pattern_stops.extend(stops)
+                pattern_stop_offsets.append(len(pattern_stops))
+                for trip_arrivals, trip_departures in group:
+                    arrivals.extend(trip_arrivals)
+                    departures.extend(trip_departures)
+                pattern_trip_offsets.append(pattern_trip_offsets[-1] + len(group))
+                time_offsets.append(len(arrivals))
+
+        lats, lons = np.array(lats), np.array(lons)
+        return cls.from_patterns(
+            np.array(stop_ids), lats, lons, np.array(pattern_stops, np.int32), np.array(pattern_stop_offsets, np.int64),
+            np.array(pattern_trip_offsets, np.int64), np.array(time_offsets, np.int64),
+            np.array(arrivals, np.int32), np.array(departures, np.int32), transfers_between(lats, lons),
+        )
+
+    @classmethod
+    def from_patterns(cls, stop_ids, lats, lons, pattern_stops, pattern_stop_offsets, pattern_trip_offsets,
+                      time_offsets, arrivals, departures, transfers):
+        """Add the stop -> pattern index to the pattern arrays."""
+        pattern_of = np.repeat(np.arange(len(pattern_stop_offsets) - 1, dtype=np.int32), np.diff(pattern_stop_offsets))
+        position = np.arange(len(pattern_stops)) - np.repeat(pattern_stop_offsets[:-1], np.diff(pattern_stop_offsets))
+        order = np.argsort(pattern_stops, kind="stable")
+        stop_pattern_offsets = np.zeros(len(stop_ids) + 1, np.int64)
+        np.cumsum(np.bincount(pattern_stops, minlength=len(stop_ids)), out=stop_pattern_offsets[1:])
+        transfer_offsets, transfer_targets, transfer_seconds = transfers
+        return cls(
+            stop_ids=stop_ids, stop_lats=lats, stop_lons=lons,
+            pattern_stop_offsets=pattern_stop_offsets, pattern_stops=pattern_stops,
+            pattern_trip_offsets=pattern_trip_offsets, time_offsets=time_offsets,
+            arrivals=arrivals, departures=departures,
+            stop_pattern_offsets=stop_pattern_offsets, stop_patterns=pattern_of[order],
+            stop_pattern_positions=position[order].astype(np.int32),
+            transfer_offsets=transfer_offsets, transfer_targets=transfer_targets, transfer_seconds=transfer_seconds,
+        )
+
+    def reversed(self):
+        """The same network with time running backwards: every trip reversed and times negated.
+
+        An earliest-arrival search on it from a destination finds the latest
+        departures towards that destination from every stop, so one search
+        serves all stations. Walking links are symmetric and kept as they are.
+        """
+        pattern_stops, arrivals, departures = [], [], []
+        for pattern in range(len(self.pattern_stop_offsets) - 1):
+            start, end = self.pattern_stop_offsets[pattern], self.pattern_stop_offsets[pattern + 1]
+            pattern_stops.append(self.pattern_stops[start:end][::-1])
+            pattern_arrivals, pattern_departures = self.times(pattern)
+            # The trip arriving last at the end now leaves first
+            arrivals.append((-pattern_departures[::-1, ::-1]).ravel())
+            departures.append((-pattern_arrivals[::-1, ::-1]).ravel())
+        return Network.from_patterns(
+            self.stop_ids, self.stop_lats, self.stop_lons,
+            np.concatenate(pattern_stops).astype(np.int32), self.pattern_stop_offsets,
+            self.pattern_trip_offsets, self.time_offsets,
+            np.concatenate(arrivals).astype(np.int32), np.concatenate(departures).astype(np.int32),
+            (self.transfer_offsets, self.transfer_targets, self.transfer_seconds),
+        )
+
+    def save(self, path, signature):
+        np.savez(path, signature=np.array(signature), **{field: getattr(self, field) for field in self.FIELDS})
+
+    @classmethod
+    def load(cls, path, signature):
+        """The saved network, or None when it was built from other feeds or for another day."""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            if str(data["signature"]) != signature:
+                return None
+            return cls(**{field: data[field] for field in cls.FIELDS})
+
+    def times(self, pattern):
+        """(arrivals, departures) of a pattern as trips x stops views."""
+        stops = self.pattern_stop_offsets[pattern + 1] - self.pattern_stop_offsets[pattern]
+        start, end = self.time_offsets[pattern], self.time_offsets[pattern + 1]
+        return self.arrivals[start:end].reshape(-1, stops), self.departures[start:end].reshape(-1, stops)
+
+    def summary(self):
+        return (f"{len(self.stop_ids)} stops, {len(self.pattern_stop_offsets) - 1} patterns, "
+                f"{self.pattern_trip_offsets[-1]} trips, {len(self.arrivals)} stop times")
+
+def load_network(day):
+    """The network for a day, rebuilt from GTFS_DIR only when the feeds or the day changed."""
+    feeds = feed_paths()
+    if not feeds:
+        raise FileNotFoundError(f"No GTFS feeds in {GTFS_DIR}")
+    signature = day.strftime("%Y-%m-%d") + "|" + "|".join(
+        f"{os.path.basename(feed)}:{os.path.getmtime(feed):.0f}" for feed in feeds
+    )
+    network = Network.load(NETWORK_FILE, signature)
+    if network is None:
+        start = time.time()
+        print(f"🚉 Building the {day:%Y-%m-%d} network from {len(feeds)} GTFS feeds...")
+        network = Network.build(feeds, day)
+        network.save(NETWORK_FILE, signature)
+        print(f"✅ {network.summary()} in {time.time() - start:.1f} s")
+    return network
+
+class Router:
+    """RAPTOR earliest-arrival search over a Network, run as a range query over a departure window."""
+
+    def __init__(self, network, rounds=MAX_ROUNDS):
+        self.network = network
+        self.rounds = rounds
+
+    def nearby_stops(self, latitude, longitude, max_meters=MAX_ACCESS_METERS):
+        """{stop: walking seconds} for the stops around a coordinate."""
+        meters = distances(latitude, longitude, self.network.stop_lats, self.network.stop_lons)
+        close = np.flatnonzero(meters <= max_meters)
+        return {int(stop): int(np.ceil(meters[stop] / WALK_SPEED)) for stop in close}
+
+    def patterns_at(self, stops):
+        """Patterns serving any of the stops, each with the earliest position one of them has in it."""
+        net = self.network
+        starts, ends = net.stop_pattern_offsets[stops], net.stop_pattern_offsets[stops + 1]
+        counts = ends - starts
+        if not counts.sum():
+            return np.empty(0, np.int64), np.empty(0, np.int64)
+        index = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        patterns, positions = net.stop_patterns[index], net.stop_pattern_positions[index]
+        order = np.lexsort((positions, patterns))
+        patterns, positions = patterns[order], positions[order]
+        first = np.concatenate(([True], patterns[1:] != patterns[:-1]))
+        return patterns[first], positions[first]
+
+    def departures_at(self, sources, start, end):
+        """Distinct times, latest first, at which leaving the origin catches a vehicle at a source stop."""
+        net = self.network
+        times = set()
+        for pattern, position in zip(*self.patterns_at(np.array(list(sources), np.int64))):
+            _, departures = net.times(pattern)
+            stops = net.pattern_stops[net.pattern_stop_offsets[pattern]:net.pattern_stop_offsets[pattern + 1]]
+            for column in range(position, len(stops)):
+                stop = int(stops[column])
+                if stop in sources:
+                    leave = departures[:, column].astype(np.int64) - sources[stop]
+                    times.update(leave[(leave >= start) & (leave <= end)].tolist())
+        return sorted(times, reverse=True)
+
+    def scan(self, pattern, position, previous, current, marked, bound, slack):
+        """Ride the earliest catchable trip of one pattern from `position` on and improve the stops after boarding."""
+        net = self.network
+        stops = net.pattern_stops[net.pattern_stop_offsets[pattern] + position:net.pattern_stop_offsets[pattern + 1]]
+        arrivals, departures = net.times(pattern)
+        arrivals, departures = arrivals[:, position:], departures[:, position:]
+
+        ready = previous[stops] + slack
+        reachable = ready < INF
+        if not reachable.any():
+            return
+        # Trips gone before the first boarding, or leaving after the bound, cannot help
+        first = np.searchsorted(departures[:, -1], ready[reachable].min())
+        last = np.searchsorted(departures[:, 0], bound, side="right")
+        if first >= last:
+            return
+        arrivals, departures = arrivals[first:last], departures[first:last]
+
+        catchable = departures >= ready[None, :]
+        none = len(departures)
+        earliest = np.where(catchable.any(axis=0), catchable.argmax(axis=0), none)
+        # Trip on board when reaching each stop: the earliest one caught at any stop before it
+        riding = np.concatenate(([none], np.minimum.accumulate(earliest)[:-1]))
+        alight = np.flatnonzero(riding < none)
+        if not len(alight):
+            return
+        times = arrivals[riding[alight], alight].astype(np.int64)
+        targets = stops[alight]
+        better = times < np.minimum(current[targets], bound)
+        if better.any():
+            targets, times = targets[better], times[better]
+            np.minimum.at(current, targets, times)
+            marked[targets] = True
+
+    def walk(self, marked, current, bound):
+        """Relax the transfer links out of the stops improved this round."""
+        net = self.network
+        stops = np.flatnonzero(marked)
+        starts, ends = net.transfer_offsets[stops], net.transfer_offsets[stops + 1]
+        counts = ends - starts
+        if not counts.sum():
+            return
+        index = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        targets = net.transfer_targets[index]
+        times = np.repeat(current[stops], counts) + net.transfer_seconds[index]
+        better = times < np.minimum(current[targets], bound)
+        if better.any():
+            targets, times = targets[better], times[better]
+            np.minimum.at(current, targets, times)
+            marked[targets] = True
+
+    def profile(self, sources, targets, start, end):
+        """Pareto-optimal (departure, arrival) journeys from the sources to every target, leaving in [start, end].
+
+        `sources` and each target are {stop: walking seconds}. Departures are
+        searched latest first and labels are kept between them (rRAPTOR), so
+        each earlier departure only explores what it can improve. A round's
+        labels start from the previous round's, which makes them the best
+        arrival with at most that many vehicles and lets them prune that round.
+        """
+        stop_count = len(self.network.stop_ids)
+        labels = np.full((self.rounds + 1, stop_count), INF, np.int64)
+        journeys = [[] for _ in targets]
+
+        # Every target's stops in one array, so all targets are read with a single gather
+        owners = np.array([i for i, target in enumerate(targets) for _ in target], np.int64)
+        target_stops = np.array([stop for target in targets for stop in target], np.int64)
+        target_seconds = np.array([seconds for target in targets for seconds in target.values()], np.int64)
+        firsts = np.flatnonzero(np.concatenate(([True], owners[1:] != owners[:-1]))) if len(owners) else owners
+        latest = np.full(len(targets), INF, np.int64)
+
+        def arrivals():
+            arrival = np.full(len(targets), INF, np.int64)
+            if len(owners):
+                reached = labels[1:, target_stops].min(axis=0) + target_seconds
+                arrival[owners[firsts]] = np.minimum.reduceat(reached, firsts)
+            return np.minimum(arrival, INF)
+
+        for departure in self.departures_at(sources, start, end):
+            marked = np.zeros(stop_count, bool)
+            for stop, seconds in sources.items():
+                if departure + seconds < labels[0, stop]:
+                    labels[0, stop] = departure + seconds
+                    marked[stop] = True
+
+            for round in range(1, self.rounds + 1):
+                if not marked.any():
+                    break
+                # Once every target is reached, nothing arriving later than all of them matters
+                bound = min(departure + MAX_JOURNEY, int(arrivals().max()) if len(targets) else INF)
+                if round > 1:
+                    np.minimum(labels[round], labels[round - 1], out=labels[round])
+                patterns, positions = self.patterns_at(np.flatnonzero(marked))
+                marked = np.zeros(stop_count, bool)
+                slack = TRANSFER_SLACK if round > 1 else 0
+                for pattern, position in zip(patterns.tolist(), positions.tolist()):
+                    self.scan(pattern, position, labels[round - 1], labels[round], marked, bound, slack)
+                self.walk(marked, labels[round], bound)
+
+            # A later departure arriving just as early makes this one pointless; labels
+            # kept from later departures can also stretch a journey past MAX_JOURNEY
+            arrival = arrivals()
+            for target in np.flatnonzero((arrival < latest) & (arrival - departure <= MAX_JOURNEY)).tolist():
+                journeys[target].append((departure, int(arrival[target])))
+            latest = np.minimum(latest, arrival)
+        return [journey[::-1] for journey in journeys]
+
+def shortest_journey(journeys):
+    """(minutes, "HH:MM") of the quickest journey in a profile, or None."""
+    if not journeys:
+        return None
+    departure, arrival = min(journeys, key=lambda journey: (journey[1] - journey[0], journey[0]))
+    return (arrival - departure) // 60, f"{departure // 3600:02d}:{departure % 3600 // 60:02d}"
+
+def compute_travel_times(day=None, replace=False):
+    """Route every station to every destination offline and write travel_times rows.
+
+    Each destination is one search on the reversed network, arriving from
+    START_TIME until MAX_JOURNEY after END_TIME, which yields the journeys of
+    every station at once. Without `replace`, pairs already in travel_times
+    keep their value.
+    """
+    day = day or datetime.today()
+    network = load_network(day)
+    router = Router(network)
+    backwards = Router(network.reversed())
+    init_db()
+
+    began = time.time()
+    start, end = clock_seconds(START_TIME), clock_seconds(END_TIME)
+    stations = load_stations()
+    access = [router.nearby_stops(lat, lon) for _, lat, lon in stations]
+    for (station, _, _), stops in zip(stations, access):
+        if not stops:
+            print(f"⚠️ No stop within {MAX_ACCESS_METERS} m of {station}")
+
+    best, travel_profiles = {}, {}
+    for name, coordinates in DESTINATIONS.items():
+        egress = router.nearby_stops(*coordinates)
+        if not egress:
+            print(f"⚠️ No stop within {MAX_ACCESS_METERS} m of {name}")
+            continue
+        profiles = backwards.profile(egress, access, -(end + MAX_JOURNEY), -start)
+        for (station, _, _), journeys in zip(stations, profiles):
+            # Back to forward time: leave at -arrival, arrive at -departure
+            forward = [(-arrival, -departure) for departure, arrival in journeys if start <= -arrival <= end]
+            shortest = shortest_journey(forward)
+            if shortest is not None:
+                best[(station, name)] = shortest
+                # Journeys leaving after END_TIME still serve the last slots
+                travel_profiles[(station, name)] = Profile.from_journeys(
+                    [(-arrival // 60, -(departure // 60)) for departure, arrival in journeys],
+                    START_TIME, END_TIME, PROFILE_SLOT_MINUTES,
+                )
+        print(f"🚆 {name}: {sum(1 for key in best if key[1] == name)} stations reachable ({time.time() - began:.1f} s)")
+
+    saved = save_travel_times(stations, best, replace)
+    save_travel_profiles(travel_profiles, replace)
+    print(f"✅ Routed {len(stations)} stations x {len(DESTINATIONS)} destinations in {time.time() - began:.1f} s, saved {saved} travel times")
+
+if __name__ == "__main__":
+    # python gtfsRouter.py [YYYY-MM-DD] [--replace]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    compute_travel_times(datetime.strptime(args[0], "%Y-%m-%d") if args else None, replace="--replace" in sys.argv)
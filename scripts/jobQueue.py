@@ -0,0 +1,280 @@
+import os
+import sys
+import json
+import time
+import random
+import importlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from storage import transaction
+from migrations import migrate
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+JOBS_DB = os.path.abspath(os.path.join(BASE_DIR, "../data/jobs.db"))
+DATA_DIR = os.path.abspath(os.path.join(BASE_DIR, "../data"))
+
+# Module that registers the handler for each job kind when imported
+JOB_MODULES = {
+    "geocode": "geocoding",
+    "directions": "maps",
+    "station_page": "oebb",
+}
+
+def create_jobs_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            payload TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',  -- pending, running, done, failed
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0,  -- Unix time
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (kind, key)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs (status, kind, next_attempt_at)")
+
+JOBS_MIGRATIONS = [create_jobs_table]
+
+# A job still 'running' this long after it was claimed belongs to a process that died
+JOB_LEASE_SECONDS = 3600
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help; the job fails at once instead of backing off."""
+
+class JobKind:
+    """How jobs of one kind are run: handler(payload) raises on failure."""
+
+    def __init__(self, handler, concurrency=1, max_attempts=8, backoff_base=60.0, backoff_max=6 * 3600.0):
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def delay(self, attempts):
+        """Exponential backoff with jitter after the given number of failed attempts."""
+        return min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1)) * random.uniform(0.75, 1.25)
+
+HANDLERS = {}
+
+def register_handler(kind, handler, **options):
+    HANDLERS[kind] = JobKind(handler, **options)
+
+def job_kind(kind):
+    if kind not in HANDLERS and kind in JOB_MODULES:
+        importlib.import_module(JOB_MODULES[kind])
+    return HANDLERS.get(kind)
+
+def init_jobs():
+    with transaction(JOBS_DB) as conn:
+        migrate(conn, JOBS_MIGRATIONS)
+
+def enqueue(kind, key, payload=None, error=None):
+    """Record a call to retry later; a failure from the main run counts as the first attempt.
+
+    Jobs already done are left alone, so enqueueing is safe to repeat.
+    """
+    init_jobs()
+    attempts = 1 if error else 0
+    next_attempt_at = time.time()
+    if error:
+        options = HANDLERS.get(kind) or JobKind(None)
+        next_attempt_at += options.delay(attempts)
+    with transaction(JOBS_DB) as conn:
+        conn.execute("""
+            INSERT INTO jobs (kind, key, payload, attempts, next_attempt_at, last_error)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(kind, key) DO UPDATE SET
+                payload = excluded.payload,
+                status = 'pending',
+                attempts = jobs.attempts + excluded.attempts,
+                next_attempt_at = excluded.next_attempt_at,
+                last_error = COALESCE(excluded.last_error, jobs.last_error),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE jobs.status != 'done'
+        """, (kind, key, json.dumps(payload, ensure_ascii=False), attempts, next_attempt_at, error))
+    if error:
+        print(f"🗂️ Queued {kind} retry for {key}: {error}")
+
+def claim(kind, limit):
+    """Mark up to `limit` due jobs of a kind as running and return them as (id, key, payload, attempts)."""
+    with transaction(JOBS_DB) as conn:
+        rows = conn.execute("""
+            SELECT id, key, payload, attempts FROM jobs
+            WHERE status = 'pending' AND kind = ? AND next_attempt_at <= ?
+            ORDER BY next_attempt_at LIMIT ?
+        """, (kind, time.time(), limit)).fetchall()
+        conn.executemany(
+            "UPDATE jobs SET status = 'running', updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            [(row[0],) for row in rows]
+        )
+    return [(job_id, key, json.loads(payload) if payload else None, attempts) for job_id, key, payload, attempts in rows]
+
+def complete(job_id):
+    with transaction(JOBS_DB) as conn:
+        conn.execute("""
+            UPDATE jobs SET status = 'done', attempts = attempts + 1, last_error = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (job_id,))
+
+def fail(job_id, options, attempts, error, permanent=False):
+    """Schedule the next attempt with backoff, or give up after max_attempts or on a permanent error."""
+    attempts += 1
+    status = "failed" if permanent or attempts >= options.max_attempts else "pending"
+    with transaction(JOBS_DB) as conn:
+        conn.execute("""
+            UPDATE jobs SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (status, attempts, time.time() + options.delay(attempts), error, job_id))
+    return status
+
+def run_job(kind, options, job):
+    job_id, key, payload, attempts = job
+    try:
+        options.handler(payload)
+    except Exception as e:
+        status = fail(job_id, options, attempts, str(e), permanent=isinstance(e, PermanentJobError))
+        print(f"{'❌ Gave up on' if status == 'failed' else '⏳ Will retry'} {kind} {key}: {e}")
+        return False
+    complete(job_id)
+    print(f"✅ Retried {kind} {key}")
+    return True
+
+def recover_running(stale_after=None):
+    """Jobs left 'running' by a process that died go back to pending.
+
+    With `stale_after` (seconds), only jobs claimed at least that long ago, so
+    a worker starting next to another live process leaves its jobs alone.
+    """
+    with transaction(JOBS_DB) as conn:
+        if stale_after is None:
+            conn.execute("UPDATE jobs SET status = 'pending' WHERE status = 'running'")
+        else:
+            conn.execute(
+                "UPDATE jobs SET status = 'pending' WHERE status = 'running' AND updated_at <= datetime('now', ?)",
+                (f"-{int(stale_after)} seconds",)
+            )
+
+def next_due(kinds):
+    with transaction(JOBS_DB) as conn:
+        row = conn.execute(
+            f"SELECT MIN(next_attempt_at) FROM jobs WHERE status = 'pending' AND kind IN ({', '.join('?' for _ in kinds)})",
+            list(kinds)
+        ).fetchone()
+    return row[0]
+
+def drain(kinds=None, wait_for_backoff=False, stop=None):
+    """Run due jobs, each kind on its own pool of `concurrency` threads.
+
+    Returns when nothing is due, or, with wait_for_backoff, when nothing is
+    pending at all. `stop` (a threading.Event) ends the loop early.
+    """
+    init_jobs()
+    kinds = [kind for kind in (kinds or JOB_MODULES) if job_kind(kind)]
+    if not kinds:
+        return 0
+    done = 0
+    executors = {kind: ThreadPoolExecutor(max_workers=HANDLERS[kind].concurrency) for kind in kinds}
+    running = {kind: set() for kind in kinds}
+    try:
+        while not (stop and stop.is_set()):
+            for kind in kinds:
+                options = HANDLERS[kind]
+                running[kind] = {future for future in running[kind] if not future.done()}
+                free = options.concurrency - len(running[kind])
+                if free > 0:
+                    for job in claim(kind, free):
+                        running[kind].add(executors[kind].submit(run_job, kind, options, job))
+
+            in_flight = set().union(*running.values())
+            if in_flight:
+                finished, _ = wait(in_flight, timeout=1.0, return_when=FIRST_COMPLETED)
+                done += sum(1 for future in finished if future.result())
+                continue
+
+            due = next_due(kinds)
+            if due is None or not wait_for_backoff:
+                break
+            pause = max(0.0, min(due - time.time(), 60.0))
+            if stop:
+                stop.wait(pause)
+            else:
+                time.sleep(pause)
+    finally:
+        for executor in executors.values():
+            executor.shutdown(wait=True)
+    return done
+
+class Worker:
+    """Drains the queue on a background thread so retries never block the main run."""
+
+    def __init__(self, kinds=None):
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=drain, args=(kinds, True, self.stop_event), daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Let in-flight jobs finish; anything still pending waits for the next run."""
+        self.stop_event.set()
+        self.thread.join()
+
+def start_worker(kinds=None):
+    init_jobs()
+    recover_running(JOB_LEASE_SECONDS)  # Otherwise jobs of a crashed run would be skipped forever
+    return Worker(kinds).start()
+
+def status_counts():
+    init_jobs()
+    with transaction(JOBS_DB) as conn:
+        return conn.execute("SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status ORDER BY kind, status").fetchall()
+
+def import_failed_files():
+    """Load the retry lists the scripts used to append to into the queue."""
+    imported = 0
+    for name in ("failed_travel_times.txt", "failed_travel_times_retry.txt"):
+        for parts in read_failed_file(name):
+            if len(parts) == 4:
+                station, destination, latitude, longitude = parts
+                enqueue("directions", f"{station}|{destination}", {
+                    "station": station, "destination": destination,
+                    "latitude": float(latitude), "longitude": float(longitude),
+                })
+                imported += 1
+    for parts in read_failed_file("failed_geocoding.txt"):
+        if len(parts) == 2:  # url|address from geocoding.py
+            url, address = parts
+            enqueue("geocode", f"stations_geo|{url}", {"table": "stations_geo", "name": url, "query": address})
+        else:  # station name from badnerBahn.py
+            enqueue("geocode", f"badner_bahn|{parts[0]}", {"table": "badner_bahn", "name": parts[0], "query": parts[0] + ", Austria"})
+        imported += 1
+    for parts in read_failed_file("failed_stations.txt"):
+        enqueue("station_page", parts[0], {"url": parts[0]})
+        imported += 1
+    print(f"🗂️ Imported {imported} failed calls into the job queue")
+    return imported
+
+def read_failed_file(name):
+    path = os.path.join(DATA_DIR, name)
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip().split("|") for line in f if line.strip()]
+
+if __name__ == "__main__":
+    # python jobQueue.py [--import-failed] [--wait] [kind ...]
+    args = sys.argv[1:]
+    if "--import-failed" in args:
+        import_failed_files()
+    init_jobs()
+    recover_running()
+    drain([a for a in args if not a.startswith("--")] or None, wait_for_backoff="--wait" in args)
+    for kind, status, count in status_counts():
+        print(f"📋 {kind}: {count} {status}")
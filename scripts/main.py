@@ -1,12 +1,13 @@
 import json
 import os
+from urllib.parse import urlparse
 
 from willhaben import scrape_all_pages
 from remax import run_remax_scraper
 from geolocateAds import geolocate_ads
 from visualizeAds import process_data
 
-URLS_FILE = "saved_urls.json"
+URLS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "saved_urls.json")
 
 def load_urls():
     if not os.path.exists(URLS_FILE):
@@ -26,7 +27,7 @@ def detect_source(url):
     else:
         return None
 
-def run_scraper(url):
+def run_scraper(url, post_process=True):
     source = detect_source(url)
     if not source:
         print("❌ Unknown source. Only Willhaben and RE/MAX are supported.")
@@ -34,17 +35,32 @@ def run_scraper(url):
 
     try:
         if source == "willhaben":
-            scrape_all_pages(url, True)
+            scrape_all_pages(url, True, use_http=True)
         elif source == "remax":
-            run_remax_scraper()
+            # A bare search page has no filters yet, so let the user set them in the browser
+            run_remax_scraper(url if urlparse(url).query else None)
 
-        geolocate_ads()
-        process_data()
-
-        print("✅ Scraping complete and JSON updated.")
+        if post_process:
+            geolocate_ads()
+            process_data()
+            print("✅ Scraping complete and JSON updated.")
     except Exception as e:
         print(f"❌ Error during scraping 2: {e}")
 
+def run_all():
+    """Scrape every saved URL in one process so browsers stay warm between searches."""
+    urls = load_urls()
+    if not urls:
+        print("No URLs saved.")
+        return
+    for i, url in enumerate(urls):
+        print(f"\n🔎 [{i + 1}/{len(urls)}] {url}")
+        run_scraper(url, post_process=False)
+
+    geolocate_ads()
+    process_data()
+    print("✅ All saved URLs scraped and JSON updated.")
+
 def list_urls():
     urls = load_urls()
     if not urls:
@@ -85,7 +101,8 @@ def main_menu():
         print("1. List saved URLs")
         print("2. Add a new URL")
         print("3. Run scraper on saved URL")
-        print("4. Exit")
+        print("4. Run scraper on all saved URLs")
+        print("5. Exit")
         choice = input("Choose an option: ").strip()
 
         if choice == "1":
@@ -95,10 +112,12 @@ def main_menu():
         elif choice == "3":
             choose_and_run()
         elif choice == "4":
+            run_all()
+        elif choice == "5":
             print("👋 Goodbye!")
             break
         else:
-            print("❌ Invalid choice. Please enter 1, 2, 3 or 4.")
+            print("❌ Invalid choice. Please enter 1, 2, 3, 4 or 5.")
 
 if __name__ == "__main__":
     print("🏠 Welcome to the Real Estate Scraper!")
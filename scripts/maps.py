@@ -1,15 +1,24 @@
+import os
 import time
-import sqlite3
+import threading
 import googlemaps
 from datetime import datetime, timedelta
-from config import GOOGLE_API_KEY
+from config import GOOGLE_API_KEY, PROFILE_SLOT_MINUTES
+from storage import transaction
+from migrations import migrate, TRAVEL_TIMES_MIGRATIONS
+from jobQueue import enqueue, register_handler, start_worker
+from travelProfiles import Profile
 
 API_KEY = GOOGLE_API_KEY
-gmaps = googlemaps.Client(key=API_KEY)
+gmaps = None  # Created on first use so other scripts can import this module's helpers without a key
+
+api_call_count = 0
+api_call_lock = threading.Lock()
 
 # New SQLite DB file for travel times
-DB_FILE = "../data/oebb_travel_times.db"
-FAILED_FILE = "../data/failed_travel_times.txt"
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_FILE = os.path.abspath(os.path.join(BASE_DIR, "../data/oebb_travel_times.db"))
+STATIONS_GEO_DB = os.path.abspath(os.path.join(BASE_DIR, "../data/oebb_stations_geo.db"))
 
 DESTINATIONS = {
 	"Schimetta": (48.18453801245323, 16.33267402432996),
@@ -25,35 +34,30 @@ INTERVAL_MINUTES = 30
 
 def init_db():
     """Create a new database table to store travel times."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS travel_times (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            station TEXT,
-            destination TEXT,
-            shortest_travel_time INTEGER,  -- In minutes
-            departure_time TEXT,
-            latitude REAL,
-            longitude REAL
-        )
-    """)
-    conn.commit()
-    conn.close()
+    with transaction(DB_FILE) as conn:
+        migrate(conn, TRAVEL_TIMES_MIGRATIONS)
 
 def station_exists(station, destination):
     """Check if a travel time entry is already in the database."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT * FROM travel_times WHERE station = ? AND destination = ?
-    """, (station, destination))
-    result = cursor.fetchone()
-    conn.close()
+    with transaction(DB_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT * FROM travel_times WHERE station = ? AND destination = ?
+        """, (station, destination))
+        result = cursor.fetchone()
     return result is not None
 
-def get_travel_time(origin, destination_coords, departure_time):
-    """Fetch public transport travel time from Google Maps API."""
+def get_trip(origin, destination_coords, departure_time):
+    """Fetch the public transport trip Google Maps suggests when leaving at departure_time.
+
+    Returns (minutes, departure, arrival) with the trip's actual departure and
+    arrival as datetimes, or None.
+    """
+    global api_call_count, gmaps
+    with api_call_lock:
+        api_call_count += 1
+        if gmaps is None:
+            gmaps = googlemaps.Client(key=API_KEY)
     try:
         directions = gmaps.directions(
             origin, f"{destination_coords[0]},{destination_coords[1]}",
@@ -62,81 +66,191 @@ def get_travel_time(origin, destination_coords, departure_time):
             transit_routing_preference="fewer_transfers"
         )
         if directions:
-            return directions[0]["legs"][0]["duration"]["value"] // 60  # Convert seconds to minutes
+            leg = directions[0]["legs"][0]
+            minutes = leg["duration"]["value"] // 60  # Convert seconds to minutes
+            # Walking-only routes have no timetable; they leave whenever asked
+            departure = datetime.fromtimestamp(leg["departure_time"]["value"]) if "departure_time" in leg else departure_time
+            arrival = datetime.fromtimestamp(leg["arrival_time"]["value"]) if "arrival_time" in leg else departure + timedelta(seconds=leg["duration"]["value"])
+            return minutes, departure, arrival
     except Exception as e:
         print(f"⚠️ API failed for {origin} → {destination_coords} | Error: {e}")
     return None
 
+def get_travel_time(origin, destination_coords, departure_time):
+    """Fetch public transport travel time from Google Maps API."""
+    trip = get_trip(origin, destination_coords, departure_time)
+    return trip[0] if trip else None
+
 def save_to_db(station, destination, travel_time, departure_time, latitude, longitude):
     """Insert the shortest travel time into the database."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO travel_times (station, destination, shortest_travel_time, departure_time, latitude, longitude)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (station, destination, travel_time, departure_time, latitude, longitude))
-    conn.commit()
-    conn.close()
+    with transaction(DB_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO travel_times (station, destination, shortest_travel_time, departure_time, latitude, longitude)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (station, destination, travel_time, departure_time, latitude, longitude))
 
 def save_failed(station, destination, latitude, longitude):
-    """Save failed attempts to a separate file for retrying later."""
-    with open(FAILED_FILE, "a", encoding="utf-8") as fail_file:
-        fail_file.write(f"{station}|{destination}|{latitude}|{longitude}\n")
+    """Queue a failed station → destination pair for automatic retries."""
+    enqueue("directions", f"{station}|{destination}", {
+        "station": station, "destination": destination, "latitude": latitude, "longitude": longitude,
+    }, error="no valid travel times")
+
+def departure_times():
+    """Departure times from START_TIME to END_TIME today, every INTERVAL_MINUTES."""
+    date_today = datetime.today()
+    start_dt = datetime.strptime(f"{date_today.date()} {START_TIME}", "%Y-%m-%d %H:%M")
+    end_dt = datetime.strptime(f"{date_today.date()} {END_TIME}", "%Y-%m-%d %H:%M")
+    current_time = start_dt
+    while current_time <= end_dt:
+        yield current_time
+        current_time += timedelta(minutes=INTERVAL_MINUTES)
 
-# Initialize the database
-init_db()
+def sample_trips(latitude, longitude, destination_coords):
+    """The day's departure slots and the trip found for each, as (slots, {index: trip or None}).
 
-# Read all stations (ÖBB + Badner Bahn) from `oebb_stations_geo.db`
-conn_geo = sqlite3.connect("../data/oebb_stations_geo.db")
-cursor_geo = conn_geo.cursor()
+    A trip that actually leaves at 10:20 is also the router's answer for every
+    slot from the one asked up to 10:20, so those slots reuse it instead of
+    costing another call.
+    """
+    origin = f"{latitude},{longitude}"
+    slots = list(departure_times())
+    trips = {}  # slot index -> (minutes, departure, arrival) or None
+    latest = None  # The last trip found, which leaves no earlier than any found before it
+    for index, slot in enumerate(slots):
+        if latest is not None and latest[1] >= slot:
+            trips[index] = latest
+        else:
+            trips[index] = get_trip(origin, destination_coords, slot)
+            latest = trips[index] or latest
+    return slots, trips
 
-# Fetch all stations from both tables
-cursor_geo.execute("SELECT url, latitude, longitude FROM stations_geo")
-oebb_stations = cursor_geo.fetchall()
+def shortest_of(slots, trips):
+    """Shortest sampled trip as (minutes, "HH:MM" of its slot), or (None, None)."""
+    found = [(trip[0], index) for index, trip in trips.items() if trip is not None]
+    if not found:
+        return None, None
+    shortest_time, best_index = min(found)
+    return shortest_time, slots[best_index].strftime("%H:%M")
 
-cursor_geo.execute("SELECT station, latitude, longitude FROM badner_bahn")
-badner_stations = cursor_geo.fetchall()
+def profile_of(trips):
+    """Departure profile of the sampled trips; slots between samples take the next trip sampled.
 
-conn_geo.close()
+    Trips leaving between two samples are never seen, so the profile is marked
+    as sampled every INTERVAL_MINUTES and the export leaves out its frequency.
+    """
+    journeys = []
+    for trip in trips.values():
+        if trip is not None:
+            _, departure, arrival = trip
+            midnight = departure.replace(hour=0, minute=0, second=0, microsecond=0)
+            journeys.append((int((departure - midnight).total_seconds()) // 60, int((arrival - midnight).total_seconds()) // 60))
+    return Profile.from_journeys(journeys, START_TIME, END_TIME, PROFILE_SLOT_MINUTES, sample_minutes=INTERVAL_MINUTES)
 
-all_stations = oebb_stations + badner_stations  # Merge both lists
+def shortest_travel_time(latitude, longitude, destination_coords):
+    """Shortest travel time over the day's departure times as (minutes, "HH:MM"), or (None, None)."""
+    return shortest_of(*sample_trips(latitude, longitude, destination_coords))
 
-# Process each station and calculate the shortest travel time
-for station, lat, lon in all_stations:
-    for dest_name, dest_coords in DESTINATIONS.items():
-        if station_exists(station, dest_name):
-            print(f"⏩ Skipping (already in DB): {station} → {dest_name}")
-            continue
+def directions_job(payload):
+    """Retry handler for queued station → destination pairs."""
+    init_db()
+    if station_exists(payload["station"], payload["destination"]):
+        return
+    slots, trips = sample_trips(payload["latitude"], payload["longitude"], DESTINATIONS[payload["destination"]])
+    shortest_time, best_departure = shortest_of(slots, trips)
+    if shortest_time is None:
+        raise LookupError("No valid travel times")
+    save_to_db(payload["station"], payload["destination"], shortest_time, best_departure, payload["latitude"], payload["longitude"])
+    save_travel_profiles({(payload["station"], payload["destination"]): profile_of(trips)})
 
-        print(f"🚆 Calculating travel time: {station} → {dest_name}")
+register_handler("directions", directions_job)
 
-        # Generate departure times (every 30 minutes from 09:00 to 18:00)
-        date_today = datetime.today()
-        start_dt = datetime.strptime(f"{date_today.date()} {START_TIME}", "%Y-%m-%d %H:%M")
-        end_dt = datetime.strptime(f"{date_today.date()} {END_TIME}", "%Y-%m-%d %H:%M")
-        current_time = start_dt
+def load_stations():
+    """All stations (ÖBB + Badner Bahn) with coordinates from `oebb_stations_geo.db`."""
+    with transaction(STATIONS_GEO_DB) as conn_geo:
+        cursor_geo = conn_geo.cursor()
 
-        shortest_time = None
-        best_departure = None
+        # Fetch all stations from both tables
+        cursor_geo.execute("SELECT url, latitude, longitude FROM stations_geo")
+        oebb_stations = cursor_geo.fetchall()
 
-        while current_time <= end_dt:
-            travel_time = get_travel_time(f"{lat},{lon}", dest_coords, current_time)
+        cursor_geo.execute("SELECT station, latitude, longitude FROM badner_bahn")
+        badner_stations = cursor_geo.fetchall()
 
-            if travel_time is not None:
-                if shortest_time is None or travel_time < shortest_time:
-                    shortest_time = travel_time
-                    best_departure = current_time.strftime("%H:%M")
+    return oebb_stations + badner_stations  # Merge both lists
 
-            current_time += timedelta(minutes=INTERVAL_MINUTES)  # Increment by 30 minutes
+def missing_stations():
+    """Stations (name, latitude, longitude) without a travel time to at least one destination."""
+    with transaction(DB_FILE) as conn:
+        done = conn.execute(
+            "SELECT station, COUNT(DISTINCT destination) FROM travel_times GROUP BY station"
+        ).fetchall()
+    complete = {station for station, count in done if count >= len(DESTINATIONS)}
+    return [station for station in load_stations() if station[0] not in complete]
 
-        if shortest_time is not None:
-            save_to_db(station, dest_name, shortest_time, best_departure, lat, lon)
-            print(f"✅ Saved: {station} → {dest_name} ({shortest_time} min, best at {best_departure})")
-        else:
-            print(f"❌ No valid travel times found for {station} → {dest_name}")
-            save_failed(station, dest_name, lat, lon)  # Save to failed list
+def save_travel_times(stations, best, replace=False):
+    """Write one travel_times row per (station, destination) pair in one transaction; existing pairs are kept unless `replace`."""
+    coordinates = {station: (lat, lon) for station, lat, lon in stations}
+    with transaction(DB_FILE) as conn:
+        return conn.executemany(f"""
+            INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO travel_times (station, destination, shortest_travel_time, departure_time, latitude, longitude)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [
+            (station, destination, minutes, departure, *coordinates[station])
+            for (station, destination), (minutes, departure) in best.items()
+        ]).rowcount
+
+def save_travel_profiles(profiles, replace=False):
+    """Write {(station, destination): Profile} in one transaction; existing profiles are kept unless `replace`."""
+    with transaction(DB_FILE) as conn:
+        return conn.executemany(f"""
+            INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO travel_profiles (station, destination, first_slot, slot_minutes, arrivals, sample_minutes)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [
+            (station, destination, profile.first_slot, profile.slot_minutes, profile.to_blob(), profile.sample_minutes)
+            for (station, destination), profile in profiles.items()
+        ]).rowcount
+
+def load_travel_profiles():
+    """{(station, destination): Profile} for every stored pair."""
+    with transaction(DB_FILE) as conn:
+        rows = conn.execute("SELECT station, destination, first_slot, slot_minutes, arrivals, sample_minutes FROM travel_profiles").fetchall()
+    return {
+        (station, destination): Profile.from_blob(first_slot, slot_minutes, arrivals, sample_minutes)
+        for station, destination, first_slot, slot_minutes, arrivals, sample_minutes in rows
+    }
+
+def compute_travel_times():
+    """Calculate the shortest travel time from every station to every destination not yet stored."""
+    # Initialize the database
+    init_db()
+    worker = start_worker(["directions"])  # Retries earlier failures alongside this run
+    calls_before = api_call_count
+
+    # Process each station and calculate the shortest travel time
+    for station, lat, lon in load_stations():
+        for dest_name, dest_coords in DESTINATIONS.items():
+            if station_exists(station, dest_name):
+                print(f"⏩ Skipping (already in DB): {station} → {dest_name}")
+                continue
+
+            print(f"🚆 Calculating travel time: {station} → {dest_name}")
+            slots, trips = sample_trips(lat, lon, dest_coords)
+            shortest_time, best_departure = shortest_of(slots, trips)
+
+            if shortest_time is not None:
+                save_to_db(station, dest_name, shortest_time, best_departure, lat, lon)
+                save_travel_profiles({(station, dest_name): profile_of(trips)})
+                print(f"✅ Saved: {station} → {dest_name} ({shortest_time} min, best at {best_departure})")
+            else:
+                print(f"❌ No valid travel times found for {station} → {dest_name}")
+                save_failed(station, dest_name, lat, lon)  # Queue for retry
+
+        time.sleep(1)  # Avoid hitting API rate limits
 
-    time.sleep(1)  # Avoid hitting API rate limits
+    worker.stop()
+    print(f"✅ Process complete. Data saved in '{DB_FILE}'.")
+    print(f"🌍 Directions API Calls Made: {api_call_count - calls_before}")
 
-print(f"✅ Process complete. Data saved in '{DB_FILE}'.")
-print(f"❌ Failed stations logged in '{FAILED_FILE}'.")
+if __name__ == "__main__":
+    compute_travel_times()
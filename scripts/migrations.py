@@ -0,0 +1,305 @@
+from adAttributes import PROMOTED_COLUMNS, backfill_typed_attributes
+from normalize import repair_ads
+
+def column_names(cursor, table):
+    return {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+
+def add_column(cursor, table, column, definition):
+    """ALTER TABLE ADD COLUMN, skipped when a hand-run script already added it."""
+    if column not in column_names(cursor, table):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def create_ads_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ads (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT UNIQUE,
+            title TEXT,
+            price INTEGER,
+            size REAL,
+            price_per_m2 REAL,
+            zip_code TEXT,
+            city TEXT,
+            region TEXT,
+            price_info TEXT,
+            energy_certificate TEXT,
+            attributes TEXT,
+            date_scraped TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # One row per observed (price, size, title) state of an ad
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS price_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ad_id INTEGER NOT NULL REFERENCES ads(id),
+            price INTEGER,
+            size REAL,
+            title TEXT,
+            first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_price_history_ad ON price_history (ad_id, id)")
+
+def add_geocoding_schema(cursor):
+    """Coordinates on ads plus the location_cache that geolocateAds relies on."""
+    add_column(cursor, "ads", "latitude", "REAL")
+    add_column(cursor, "ads", "longitude", "REAL")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS location_cache (
+            zip_code TEXT,
+            city TEXT,
+            latitude REAL,
+            longitude REAL
+        )
+    ''')
+    # Hand-made caches may hold duplicates, which would block the unique index
+    cursor.execute('''
+        DELETE FROM location_cache WHERE rowid NOT IN (
+            SELECT MIN(rowid) FROM location_cache GROUP BY zip_code, city
+        )
+    ''')
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_location_cache_key ON location_cache (zip_code, city)")
+    # Seed the cache from ads that were geocoded before it existed (formerly data/create.sql)
+    cursor.execute('''
+        INSERT OR IGNORE INTO location_cache (zip_code, city, latitude, longitude)
+        SELECT zip_code, city, latitude, longitude
+        FROM ads
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+        GROUP BY zip_code, city
+    ''')
+
+def add_hot_query_indexes(cursor):
+    # Matches the WHERE clause of geolocateAds.get_pending_locations
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ads_ungeocoded ON ads (zip_code, city) WHERE latitude IS NULL OR longitude IS NULL")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ads_price ON ads (price)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ads_size ON ads (size)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ads_date_scraped ON ads (date_scraped)")
+
+# Copies one JSON column into ad_attributes, for NEW in a trigger or for every row of ads
+AD_ATTRIBUTES_FROM_JSON = '''
+    INSERT OR REPLACE INTO ad_attributes (ad_id, source, key, value)
+    SELECT {ad}.id, '{source}', key, value FROM {tables}json_each({ad}.{source})
+    WHERE json_valid({ad}.{source}) AND json_type({ad}.{source}) = 'object'
+'''
+AD_ATTRIBUTE_SOURCES = ("attributes", "price_info", "energy_certificate")
+
+def add_typed_attributes(cursor):
+    """Typed columns for the common attributes, and every label/value pair in ad_attributes."""
+    for column, definition in PROMOTED_COLUMNS.items():
+        add_column(cursor, "ads", column, definition)
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_ads_{column} ON ads ({column})")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ad_attributes (
+            ad_id INTEGER NOT NULL REFERENCES ads(id),
+            source TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT,
+            PRIMARY KEY (ad_id, source, key)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ad_attributes_key ON ad_attributes (key, value)")
+
+    # Triggers keep the side table in step with every insert path, including executemany batches
+    inserts = "".join(AD_ATTRIBUTES_FROM_JSON.format(ad="NEW", tables="", source=source) + ";" for source in AD_ATTRIBUTE_SOURCES)
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS ads_attributes_insert AFTER INSERT ON ads BEGIN {inserts} END")
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS ads_attributes_update
+        AFTER UPDATE OF {", ".join(AD_ATTRIBUTE_SOURCES)} ON ads BEGIN
+            DELETE FROM ad_attributes WHERE ad_id = NEW.id;
+            {inserts}
+        END
+    ''')
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS ads_attributes_delete AFTER DELETE ON ads BEGIN DELETE FROM ad_attributes WHERE ad_id = OLD.id; END")
+
+    for source in AD_ATTRIBUTE_SOURCES:
+        cursor.execute(AD_ATTRIBUTES_FROM_JSON.format(ad="ads", tables="ads, ", source=source))
+    backfill_typed_attributes(cursor)
+
+def add_quarantine(cursor):
+    """Rejected ads land in quarantine; rows polluted before normalization are repaired or moved there."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS quarantine (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT,
+            source TEXT,
+            reason TEXT,
+            payload TEXT,
+            date_quarantined TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_quarantine_url ON quarantine (url)")
+    repair_ads(cursor)
+
+def flattened_details(ad):
+    """SQL expression joining every label and value of an ad's JSON columns into one text."""
+    pairs = " UNION ALL ".join(
+        f"SELECT key, value FROM json_each(CASE WHEN json_valid({ad}.{source}) THEN {ad}.{source} END)"
+        for source in AD_ATTRIBUTE_SOURCES
+    )
+    return f"(SELECT group_concat(key || ' ' || value, ' ') FROM ({pairs}))"
+
+def add_ads_search(cursor):
+    """Full-text index over titles and attribute text; rowid is ads.id."""
+    # remove_diacritics lets 'fernwarme' find 'Fernwärme'; prefix indexes keep 'garten*' queries fast
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS ads_fts USING fts5(
+            title, details,
+            tokenize = "unicode61 remove_diacritics 2",
+            prefix = '3 5'
+        )
+    ''')
+    insert = f"INSERT INTO ads_fts (rowid, title, details) VALUES (NEW.id, NEW.title, {flattened_details('NEW')});"
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS ads_fts_insert AFTER INSERT ON ads BEGIN {insert} END")
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS ads_fts_update
+        AFTER UPDATE OF title, {", ".join(AD_ATTRIBUTE_SOURCES)} ON ads BEGIN
+            DELETE FROM ads_fts WHERE rowid = OLD.id;
+            {insert}
+        END
+    ''')
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS ads_fts_delete AFTER DELETE ON ads BEGIN DELETE FROM ads_fts WHERE rowid = OLD.id; END")
+    cursor.execute("DELETE FROM ads_fts")
+    cursor.execute(f"INSERT INTO ads_fts (rowid, title, details) SELECT id, title, {flattened_details('ads')} FROM ads")
+
+def seed_price_history(cursor):
+    """Every ad starts with a price_history row for the state it was first saved in.
+
+    Without it the first change refresh.py sees would overwrite the old price
+    with nothing on record. The trigger covers every insert path; upserts of
+    existing ads are updates and do not fire it.
+    """
+    cursor.execute('''
+        INSERT INTO price_history (ad_id, price, size, title, first_seen, last_seen)
+        SELECT id, price, size, title, COALESCE(date_scraped, CURRENT_TIMESTAMP), COALESCE(date_scraped, CURRENT_TIMESTAMP)
+        FROM ads
+        WHERE id NOT IN (SELECT ad_id FROM price_history)
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS ads_price_history_insert AFTER INSERT ON ads BEGIN
+            INSERT INTO price_history (ad_id, price, size, title, first_seen, last_seen)
+            VALUES (NEW.id, NEW.price, NEW.size, NEW.title,
+                    COALESCE(NEW.date_scraped, CURRENT_TIMESTAMP), COALESCE(NEW.date_scraped, CURRENT_TIMESTAMP));
+        END
+    ''')
+
+def reparse_balcony(cursor):
+    """Refill the typed columns now that balconies listed under Freifläche/Außenfläche count."""
+    backfill_typed_attributes(cursor)
+
+# Schema history of scraped_ads.db; position + 1 is the version stored in PRAGMA user_version.
+# Only ever append to this list.
+ADS_MIGRATIONS = [
+    create_ads_tables,
+    add_geocoding_schema,
+    add_hot_query_indexes,
+    add_typed_attributes,
+    add_quarantine,
+    add_ads_search,
+    seed_price_history,
+    reparse_balcony,
+]
+
+def create_stations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            postal_code TEXT,
+            street TEXT,
+            state TEXT,
+            url TEXT UNIQUE
+        )
+    """)
+
+def create_station_geo_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stations_geo (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT UNIQUE,
+            address TEXT,
+            latitude REAL,
+            longitude REAL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS badner_bahn (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            station TEXT UNIQUE,
+            latitude REAL,
+            longitude REAL
+        )
+    """)
+
+def create_travel_times_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS travel_times (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            station TEXT,
+            destination TEXT,
+            shortest_travel_time INTEGER,  -- In minutes
+            departure_time TEXT,
+            latitude REAL,
+            longitude REAL
+        )
+    """)
+
+def key_travel_times(cursor):
+    """One row per (station, destination), keeping the shortest time where retries left duplicates."""
+    cursor.execute("""
+        DELETE FROM travel_times WHERE id NOT IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY station, destination ORDER BY shortest_travel_time IS NULL, shortest_travel_time, id
+                ) AS rank
+                FROM travel_times
+            ) WHERE rank = 1
+        )
+    """)
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_travel_times_key ON travel_times (station, destination)")
+
+def create_travel_profiles_table(cursor):
+    """Earliest arrival per departure slot for each (station, destination), next to its shortest time."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS travel_profiles (
+            station TEXT,
+            destination TEXT,
+            first_slot INTEGER,    -- Minutes after midnight
+            slot_minutes INTEGER,
+            arrivals BLOB,         -- uint16 little-endian minutes after midnight per slot, 65535 = none
+            PRIMARY KEY (station, destination)
+        ) WITHOUT ROWID
+    """)
+
+def add_profile_sampling(cursor):
+    """Minutes between the Directions samples a profile was built from; NULL when it holds every departure.
+
+    Profiles written earlier stay NULL; rerun maps.py pairs to mark them.
+    """
+    add_column(cursor, "travel_profiles", "sample_minutes", "INTEGER")
+
+STATIONS_MIGRATIONS = [create_stations_table]
+STATION_GEO_MIGRATIONS = [create_station_geo_tables]
+TRAVEL_TIMES_MIGRATIONS = [create_travel_times_table, key_travel_times, create_travel_profiles_table, add_profile_sampling]
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn, migrations=ADS_MIGRATIONS):
+    """Apply every migration newer than the database's user_version, each in its own transaction."""
+    conn.commit()
+    version = schema_version(conn)
+    for number, migration in enumerate(migrations[version:], start=version + 1):
+        cursor = conn.cursor()
+        cursor.execute("SAVEPOINT migration")
+        try:
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+            cursor.execute("RELEASE migration")
+        except Exception:
+            cursor.execute("ROLLBACK TO migration")
+            cursor.execute("RELEASE migration")
+            raise
+        print(f"🧱 Applied migration {number}: {migration.__name__}")
+    return schema_version(conn)
@@ -0,0 +1,134 @@
+import re
+
+# Plausible ranges for a listing; anything outside is a parsing error, not a bargain
+PRICE_RANGE = (1, 100_000_000)  # €, low enough for rentals
+SIZE_RANGE = (5, 100_000)  # m²
+
+MISSING = {"", "n/a", "na", "-", "k.a.", "keine angabe", "auf anfrage", "preis auf anfrage"}
+
+def parse_number(text):
+    """Parse Austrian-formatted numbers: '1.234,5' -> 1234.5, '3' -> 3.0, '54.3' -> 54.3."""
+    if isinstance(text, (int, float)):
+        return float(text)
+    match = re.search(r"-?\d[\d.\s ]*(?:,\d+)?", text or "")
+    if not match:
+        return None
+    number = re.sub(r"[\s ]", "", match.group(0)).rstrip(".")
+    if "," in number:
+        number = number.replace(".", "").replace(",", ".")
+    elif re.fullmatch(r"-?\d{1,3}(\.\d{3})+", number):
+        number = number.replace(".", "")  # Dots are thousands separators
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+def parse_euro(text):
+    """Parse 'EUR 250.000' or '€ 1.234,56' into a whole-euro integer, None if there is no number."""
+    number = parse_number(text)
+    return int(number) if number is not None else None
+
+def parse_area(text):
+    """Parse '72,5 m²' into 72.5, None if there is no number."""
+    return parse_number(text)
+
+def is_missing(value):
+    return value is None or (isinstance(value, str) and value.strip().lower() in MISSING)
+
+def normalize_zip(value):
+    """Austrian ZIP codes are four digits; anything else is dropped rather than stored."""
+    match = re.search(r"\b\d{4}\b", str(value or ""))
+    return match.group(0) if match else None
+
+def check_range(name, value, bounds):
+    if value is None:
+        return f"missing {name}"
+    low, high = bounds
+    if not low <= value <= high:
+        return f"{name} {value} outside {low}-{high}"
+    return None
+
+def normalize_ad(ad_data):
+    """Return (ad dict with typed price, size, price per m² and ZIP, None), or (None, reason) for a bad ad."""
+    if not ad_data:
+        return None, "nothing scraped"
+    price = None if is_missing(ad_data.get("Price (€)")) else parse_euro(ad_data.get("Price (€)"))
+    size = None if is_missing(ad_data.get("Size (m²)")) else parse_area(ad_data.get("Size (m²)"))
+    reason = check_range("price", price, PRICE_RANGE) or check_range("size", size, SIZE_RANGE)
+    if reason:
+        return None, reason
+
+    location = dict(ad_data.get("Location") or {})
+    location["ZIP Code"] = normalize_zip(location.get("ZIP Code"))
+    clean = dict(ad_data)
+    clean.update({
+        "Price (€)": price,
+        "Size (m²)": size,
+        "Price per m² (€)": round(price / size, 2),
+        "Location": location,
+    })
+    return clean, None
+
+def register_functions(conn):
+    """Expose the parsers to SQL so repairs run as set-based UPDATEs."""
+    conn.create_function("parse_euro", 1, parse_euro, deterministic=True)
+    conn.create_function("parse_area", 1, parse_area, deterministic=True)
+
+def repair_ads(cursor, chunk_size=1000):
+    """Convert text prices and sizes left by older scrapers, chunk by chunk, quarantining what cannot be saved.
+
+    Replaces the data/format.py post-pass.
+    """
+    register_functions(cursor.connection)
+    low_price, high_price = PRICE_RANGE
+    low_size, high_size = SIZE_RANGE
+    repaired = quarantined = 0
+    last_id = 0
+    while True:
+        row = cursor.execute(
+            "SELECT MAX(id) FROM (SELECT id FROM ads WHERE id > ? ORDER BY id LIMIT ?)", (last_id, chunk_size)
+        ).fetchone()
+        if row[0] is None:
+            break
+        chunk = (last_id, row[0])
+        cursor.execute('''
+            UPDATE ads SET
+                price = CASE WHEN typeof(price) = 'text' THEN parse_euro(price) ELSE price END,
+                size = CASE WHEN typeof(size) = 'text' THEN parse_area(size) ELSE size END
+            WHERE id > ? AND id <= ? AND (typeof(price) = 'text' OR typeof(size) = 'text')
+        ''', chunk)
+        repaired += cursor.rowcount
+
+        bad = '''
+            id > ? AND id <= ? AND (
+                price IS NULL OR size IS NULL
+                OR price NOT BETWEEN ? AND ? OR size NOT BETWEEN ? AND ?
+            )
+        '''
+        bounds = chunk + (low_price, high_price, low_size, high_size)
+        cursor.execute(f'''
+            INSERT INTO quarantine (url, source, reason, payload)
+            SELECT url, 'repair', 'unusable price or size',
+                   json_object('title', title, 'price', price, 'size', size, 'zip_code', zip_code, 'city', city)
+            FROM ads WHERE {bad}
+        ''', bounds)
+        cursor.execute(f"DELETE FROM price_history WHERE ad_id IN (SELECT id FROM ads WHERE {bad})", bounds)
+        cursor.execute(f"DELETE FROM ads WHERE {bad}", bounds)
+        quarantined += cursor.rowcount
+
+        cursor.execute('''
+            UPDATE ads SET price_per_m2 = ROUND(CAST(price AS REAL) / size, 2)
+            WHERE id > ? AND id <= ? AND price_per_m2 IS NOT ROUND(CAST(price AS REAL) / size, 2)
+        ''', chunk)
+        last_id = row[0]
+    if repaired or quarantined:
+        print(f"🧹 Repaired {repaired} ads, quarantined {quarantined}")
+    return repaired, quarantined
+
+if __name__ == "__main__":
+    # python normalize.py  (re-run the repair, e.g. after importing an old database by hand)
+    from storage import transaction
+    from database import DB_NAME, create_table
+    create_table()
+    with transaction(DB_NAME) as conn:
+        repair_ads(conn.cursor())
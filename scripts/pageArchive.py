@@ -0,0 +1,71 @@
+import os
+import gzip
+import hashlib
+import threading
+from datetime import datetime
+from config import ARCHIVE_PAGES
+from storage import transaction
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARCHIVE_DIR = os.path.abspath(os.path.join(BASE_DIR, "../data/archive"))
+INDEX_DB = os.path.join(ARCHIVE_DIR, "index.db")
+
+def init_archive():
+    """Create the archive folder and its fetch index."""
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    with transaction(INDEX_DB) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                source TEXT NOT NULL,   -- willhaben / remax
+                kind TEXT NOT NULL,     -- listing / detail
+                fetched_at TIMESTAMP NOT NULL,
+                sha256 TEXT NOT NULL
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_pages_url ON pages (url, fetched_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_pages_source ON pages (source, kind)")
+
+def blob_path(sha256):
+    return os.path.join(ARCHIVE_DIR, sha256[:2], f"{sha256}.html.gz")
+
+def archive_page(url, html, source, kind="detail", enabled=None):
+    """Store a raw page compressed under its content hash and record the fetch. No-op unless archiving is on."""
+    if not (ARCHIVE_PAGES if enabled is None else enabled) or not html:
+        return None
+    data = html.encode("utf-8")
+    sha256 = hashlib.sha256(data).hexdigest()
+    path = blob_path(sha256)
+    # Identical pages share one blob
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    with transaction(INDEX_DB) as conn:
+        conn.execute(
+            "INSERT INTO pages (url, source, kind, fetched_at, sha256) VALUES (?, ?, ?, ?, ?)",
+            (url, source, kind, datetime.now().isoformat(timespec="seconds"), sha256)
+        )
+    return sha256
+
+def load_page(sha256):
+    with gzip.open(blob_path(sha256), "rb") as f:
+        return f.read().decode("utf-8")
+
+def latest_pages(source, kind="detail"):
+    """Yield (url, fetched_at, html) for the most recent archived fetch of every URL."""
+    with transaction(INDEX_DB) as conn:
+        rows = conn.execute("""
+            SELECT url, MAX(fetched_at), sha256 FROM pages
+            WHERE source = ? AND kind = ?
+            GROUP BY url
+        """, (source, kind)).fetchall()
+    for url, fetched_at, sha256 in rows:
+        yield url, fetched_at, load_page(sha256)
+
+if ARCHIVE_PAGES:
+    init_archive()
@@ -0,0 +1,127 @@
+import sys
+import time
+import asyncio
+from willhaben import accept_cookies, get_all_ad_urls, next_page_url, accept_ad, ad_to_row, new_ads_on_page
+from willhabenScraper import scrape_willhaben_details
+from willhabenHttp import scrape_willhaben_details_http
+from database import create_table, insert_ads
+from throttle import throttle, configure_host
+from seenIndex import get_seen_index
+from browserSession import pool, accept_cookies_once
+
+class CrawlPipeline:
+    """Listing producer -> detail fetchers -> batched DB writer, connected by bounded queues."""
+
+    def __init__(self, search_url, stop_on_seen=False, fetchers=4, queue_size=20,
+                 batch_size=25, flush_seconds=5.0, max_requests_per_second=None, fallback=True):
+        self.search_url = search_url
+        self.stop_on_seen = stop_on_seen
+        self.fetchers = fetchers
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.fallback = fallback
+        # Bounded queues give each stage backpressure on the one before it
+        self.url_queue = asyncio.Queue(maxsize=queue_size)
+        self.ad_queue = asyncio.Queue(maxsize=batch_size * 2)
+        self.stop = asyncio.Event()
+        self.seen_index = get_seen_index()
+        if max_requests_per_second is not None:
+            configure_host(search_url, max_requests_per_second)
+
+    async def produce_listings(self):
+        """Walk the result pages and queue every new ad URL."""
+        driver = await asyncio.to_thread(pool.acquire, "willhaben")
+        queued = set()
+        page = 1
+        try:
+            while not self.stop.is_set():
+                print(f"📄 Scraping Page {page}...")
+                page_url = next_page_url(self.search_url, page)
+                await asyncio.to_thread(throttle, page_url)
+                await asyncio.to_thread(driver.get, page_url)
+                await asyncio.to_thread(accept_cookies_once, driver, accept_cookies)
+                ad_urls = await asyncio.to_thread(get_all_ad_urls, driver)
+                if not ad_urls:
+                    print("🚫 No more ads found. Stopping pagination.")
+                    break
+                # Ads written by the writer stage land in the same index, so this sees them too
+                new_urls, stop = new_ads_on_page([url for url in ad_urls if url not in queued], self.stop_on_seen)
+                for ad_url in new_urls:
+                    queued.add(ad_url)
+                    await self.url_queue.put(ad_url)
+                if stop:
+                    self.stop.set()
+                page += 1
+        finally:
+            await asyncio.to_thread(pool.release, driver, "willhaben")
+            for _ in range(self.fetchers):
+                await self.url_queue.put(None)
+
+    async def fetch_details(self, fetcher_id):
+        """Scrape queued ads over HTTP, using a lazily started browser only as a fallback."""
+        driver = None
+        try:
+            while True:
+                ad_url = await self.url_queue.get()
+                if ad_url is None:
+                    break
+                print(f"🧵 Fetcher {fetcher_id} scraping: {ad_url}")
+                try:
+                    ad_data = await asyncio.to_thread(scrape_willhaben_details_http, ad_url)
+                    if ad_data is None and self.fallback and ad_url not in self.seen_index:
+                        if driver is None:
+                            driver = await asyncio.to_thread(pool.acquire, "willhaben")
+                        ad_data = await asyncio.to_thread(scrape_willhaben_details, driver, ad_url)
+                except Exception as e:
+                    print(f"❌ Fetcher {fetcher_id} failed on {ad_url}: {e}")
+                    continue
+                ad_data = await asyncio.to_thread(accept_ad, ad_data)
+                if ad_data is not None:
+                    await self.ad_queue.put(ad_to_row(ad_data))
+        finally:
+            if driver is not None:
+                await asyncio.to_thread(pool.release, driver, "willhaben")
+
+    async def write_batches(self):
+        """Insert ads in batches of batch_size, or whatever arrived within flush_seconds."""
+        batch = []
+        deadline = time.monotonic() + self.flush_seconds
+        while True:
+            timeout = max(deadline - time.monotonic(), 0)
+            try:
+                row = await asyncio.wait_for(self.ad_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                row = False
+            if row:
+                batch.append(row)
+            if batch and (row is None or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                await asyncio.to_thread(insert_ads, batch)
+                self.seen_index.add_many(row[0] for row in batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_seconds
+            if row is None:
+                break
+
+    async def run(self):
+        await asyncio.to_thread(create_table)
+        writer = asyncio.create_task(self.write_batches())
+        fetchers = [asyncio.create_task(self.fetch_details(i + 1)) for i in range(self.fetchers)]
+        try:
+            await self.produce_listings()
+            await asyncio.gather(*fetchers)
+        finally:
+            # If producing failed the fetchers are still waiting for URLs; stop them before
+            # the writer's sentinel so the rows they already queued are written ahead of it
+            for fetcher in fetchers:
+                fetcher.cancel()
+            await asyncio.gather(*fetchers, return_exceptions=True)
+            await self.ad_queue.put(None)
+            await writer
+
+def scrape_all_pages_pipelined(search_url, stop_on_seen=False, **options):
+    """Run the pipelined crawl from synchronous code."""
+    asyncio.run(CrawlPipeline(search_url, stop_on_seen, **options).run())
+
+if __name__ == "__main__":
+    scrape_all_pages_pipelined(sys.argv[1], stop_on_seen="--stop-on-seen" in sys.argv)
@@ -0,0 +1,79 @@
+import sys
+from willhaben import (
+    accept_cookies, get_all_ad_cards, next_page_url,
+    has_price_and_size, accept_ad, ad_to_row, save_ad
+)
+from willhabenHttp import scrape_willhaben_details_http
+from database import create_table, get_ads_by_url, upsert_ads, record_observations
+from throttle import throttle
+from browserSession import pool, accept_cookies_once
+
+def card_changed(card, stored):
+    """True if a result card disagrees with the stored row on price, size or title."""
+    _, price, size, title = stored
+    if card["price"] is not None and card["price"] != price:
+        return True
+    if card["size"] is not None and (size is None or abs(card["size"] - size) >= 1):
+        return True  # Cards round the living area, so ignore sub-m² differences
+    if card["title"] and title and card["title"] != title:
+        return True
+    return False
+
+def refresh_page(driver, cards):
+    """Compare one page of result cards with the database and re-scrape only what changed."""
+    stored_ads = get_ads_by_url([card["url"] for card in cards])
+    observations = []
+    changed = new = failed = 0
+
+    for card in cards:
+        stored = stored_ads.get(card["url"])
+        if stored is None:
+            ad_data = scrape_willhaben_details_http(card["url"], driver)
+            if has_price_and_size(ad_data):
+                save_ad(ad_data)
+                new += 1
+            continue
+
+        ad_id, price, size, title = stored
+        if not card_changed(card, stored):
+            observations.append((ad_id, price, size, title))
+            continue
+
+        print(f"🔄 Changed: {card['url']} ({price}€ → {card['price']}€)")
+        ad_data = accept_ad(scrape_willhaben_details_http(card["url"], driver, skip_known=False))
+        if ad_data is None:
+            print(f"⚠️ Could not re-scrape changed ad: {card['url']}")
+            failed += 1
+            continue
+        upsert_ads([ad_to_row(ad_data)])
+        observations.append((ad_id, ad_data["Price (€)"], ad_data["Size (m²)"], ad_data["Title"]))
+        changed += 1
+
+    # Saved ads already hold the state they were stored in (and new ads their first row) in price_history
+    record_observations(observations)
+    unchanged = len(cards) - changed - new - failed
+    print(f"📊 {len(cards)} cards: {changed} changed, {new} new, {failed} failed, {unchanged} unchanged")
+
+def refresh_search(search_url):
+    """Walk every result page and refresh stored ads whose card price, size or title changed."""
+    create_table()
+    driver = pool.acquire("willhaben")
+    page = 1
+    try:
+        while True:
+            print(f"📄 Refreshing Page {page}...")
+            page_url = next_page_url(search_url, page)
+            throttle(page_url)
+            driver.get(page_url)
+            accept_cookies_once(driver, accept_cookies)
+            cards = get_all_ad_cards(driver)
+            if not cards:
+                print("🚫 No more ads found. Refresh complete.")
+                break
+            refresh_page(driver, cards)
+            page += 1
+    finally:
+        pool.release(driver, "willhaben")
+
+if __name__ == "__main__":
+    refresh_search(sys.argv[1])
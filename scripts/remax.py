@@ -1,89 +1,168 @@
+import sys
 import time
-from selenium import webdriver
+import requests
+from html.parser import HTMLParser
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from database import insert_ad
+from database import create_table
+from willhabenScraper import build_ad_data
+from willhaben import has_price_and_size, save_ad
+from seenIndex import get_seen_index
+from throttle import throttle
+from pageArchive import archive_page
+from config import ARCHIVE_PAGES
+from normalize import parse_euro, parse_area
+from browserSession import browser
 
-def setup_driver():
-    service = Service(ChromeDriverManager().install())
-    options = webdriver.ChromeOptions()
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    return webdriver.Chrome(service=service, options=options)
+SEARCH_URL = "https://www.remax.at/de/immobilien/immobilien-suchen"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+REQUEST_TIMEOUT = 15
 
-def scrape_remax_ads(url, driver):
-    """Extracts ZIP, City, Size, and Price, then saves to DB one by one"""
-    driver.execute_script(f"window.open('{url}', '_blank');")
-    driver.switch_to.window(driver.window_handles[1])
-    time.sleep(2)
+def create_session(pool_size=8):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=2)
+    session.mount("https://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "de-AT,de;q=0.9"})
+    return session
+
+class RemaxDetailParser(HTMLParser):
+    """Collect the address headline and info table cells of a RE/MAX detail page."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []  # (tag, classes) of open elements
+        self.location_parts = []
+        self.rows = []
+
+    def inside(self, css_class, tag=None):
+        return any(css_class in classes and (tag is None or open_tag == tag) for open_tag, classes in self.stack)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("br", "img", "meta", "link", "input", "hr"):
+            return
+        classes = (dict(attrs).get("class") or "").split()
+        self.stack.append((tag, classes))
+        if tag == "tr" and self.inside("immodetail-infotable"):
+            self.rows.append([])
+        elif tag == "td" and self.rows and self.inside("immodetail-infotable"):
+            self.rows[-1].append("")
+
+    def handle_endtag(self, tag):
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data):
+        if self.inside("immodetail-address") and self.inside("id-infobox", "h2"):
+            self.location_parts.append(data)
+        elif self.rows and self.rows[-1] and any(tag == "td" for tag, _ in self.stack) and self.inside("immodetail-infotable"):
+            self.rows[-1][-1] += data
+
+def parse_remax_html(html, url):
+    """Parse a RE/MAX detail page into the same dict shape as the Willhaben scrapers."""
+    parser = RemaxDetailParser()
+    parser.feed(html)
+    parser.close()
+
+    location_text = " ".join(" ".join(parser.location_parts).split())
+    zip_code, city = None, location_text or None
+    parts = location_text.split(" - ")
+    if len(parts) == 2:
+        zip_code, city = parts
+
+    size, price = None, None
+    for row in parser.rows:
+        column_values = [" ".join(col.split()) for col in row]
+        if len(column_values) == 3:
+            size, price = parse_area(column_values[0]), parse_euro(column_values[2])
+            break
 
+    location = {"ZIP Code": zip_code, "City": city, "Region": None}
+    return build_ad_data(url, "RE/MAX Listing", price, size, location, {}, {}, {})
+
+def fetch_remax_ad(session, url):
+    """Fetch and parse one detail page over HTTP."""
+    throttle(url)
     try:
-        zip_code, city = "N/A", "N/A"
-        try:
-            address_container = driver.find_element(By.CLASS_NAME, "immodetail-address")
-            location_element = address_container.find_element(By.CSS_SELECTOR, "h2.id-infobox")
-            location_text = location_element.text.strip()
-            print(f"📍 Found Location: {location_text}")
-            parts = location_text.split(" - ")
-            if len(parts) == 2:
-                zip_code, city = parts
-            else:
-                city = location_text
-        except:
-            print("⚠️ Location not found in immodetail-address")
-
-        size, price = "N/A", "N/A"
-        try:
-            info_table = driver.find_element(By.CLASS_NAME, "immodetail-infotable")
-            rows = info_table.find_elements(By.TAG_NAME, "tr")
-            for row in rows:
-                columns = row.find_elements(By.TAG_NAME, "td")
-                column_values = [col.text.strip() for col in columns]
-                if len(column_values) == 3:
-                    size, _, price = column_values
-                    break
-        except Exception as e:
-            print(f"⚠️ Error extracting from immodetail-infotable: {e}")
+        response = session.get(url, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"⚠️ Error fetching {url}: {e}")
+        return None
+    archive_page(url, response.text, "remax")
+    return parse_remax_html(response.text, url)
 
-        print(f"💾 Inserting into DB: {url}")
-        insert_ad(
-            url, "RE/MAX Listing", price, size, "N/A",
-            zip_code, city, "N/A", {}, {}, {}
-        )
+def scrape_remax_ads(url, driver):
+    """Extracts ZIP, City, Size, and Price with the browser, for pages the HTTP path could not parse"""
+    throttle(url)
+    driver.get(url)
+    time.sleep(2)
+    if ARCHIVE_PAGES:
+        archive_page(url, driver.page_source, "remax")
+    return parse_remax_html(driver.page_source, url)
 
-    except Exception as e:
-        print(f"⚠️ Error scraping {url}: {e}")
+def get_listing_urls(driver):
+    ads = driver.find_elements(By.CSS_SELECTOR, "a.immobox-hoch--body__title")
+    return sorted({ad.get_attribute("href") for ad in ads if ad.get_attribute("href")})
 
-    driver.close()
-    driver.switch_to.window(driver.window_handles[0])
+def scrape_listing_page(session, executor, ad_urls):
+    """Fetch the page's new ads concurrently; the calling thread is the only DB writer."""
+    seen_index = get_seen_index()
+    new_urls = seen_index.filter_new(ad_urls)
+    print(f"🔍 {len(ad_urls)} ads on this page, {len(new_urls)} new")
 
-def run_remax_scraper():
-    driver = setup_driver()
-    driver.get("https://www.remax.at/de/immobilien/immobilien-suchen")
+    retry_urls = []
+    for url, ad_data in zip(new_urls, executor.map(lambda u: fetch_remax_ad(session, u), new_urls)):
+        if has_price_and_size(ad_data):
+            print(f"📍 {ad_data['Location']['ZIP Code']} {ad_data['Location']['City']}: {ad_data['Price (€)']}€, {ad_data['Size (m²)']} m²")
+            save_ad(ad_data)
+        else:
+            retry_urls.append(url)
 
-    print("🔹 The browser is open. Please set your filters manually.")
-    input("🔸 Press Enter to continue scraping once filters are set...")
+    # Fall back to a second, headless browser for pages that need JavaScript; the listing
+    # browser stays on its page, whose URL does not change when "next" is clicked
+    if retry_urls:
+        with browser("remax") as detail_driver:
+            for url in retry_urls:
+                save_ad(scrape_remax_ads(url, detail_driver))
 
+def run_remax_scraper(search_url=None, headless=None, workers=4):
+    """Scrape RE/MAX results for a search URL; without one, wait for filters to be set by hand."""
+    create_table()
+    interactive = search_url is None
+    if headless is None:
+        headless = not interactive
+    profile = "remax" if headless else "remax-visible"
+    session = create_session(workers)
+    # Entered before the first page load, so errors or Ctrl-C while waiting for filters still return the browser
     try:
-        while True:
-            time.sleep(2)
-            ads = driver.find_elements(By.CSS_SELECTOR, "a.immobox-hoch--body__title")
-            ad_urls = {ad.get_attribute("href") for ad in ads if ad.get_attribute("href")}
-            for url in sorted(ad_urls):
-                scrape_remax_ads(url, driver)
-
-            try:
-                next_button = driver.find_element(By.CSS_SELECTOR, "a.next")
-                driver.execute_script("arguments[0].click();", next_button)
-                print("\n➡️ Moving to the next page...\n")
+        with browser(profile) as driver, ThreadPoolExecutor(max_workers=workers) as executor:
+            driver.get(search_url or SEARCH_URL)
+
+            if interactive:
+                print("🔹 The browser is open. Please set your filters manually.")
+                input("🔸 Press Enter to continue scraping once filters are set...")
+
+            while True:
                 time.sleep(2)
-            except:
-                print("\n🚀 No more pages. Scraping complete.")
-                break
+                scrape_listing_page(session, executor, get_listing_urls(driver))
+
+                try:
+                    next_button = driver.find_element(By.CSS_SELECTOR, "a.next")
+                    driver.execute_script("arguments[0].click();", next_button)
+                    print("\n➡️ Moving to the next page...\n")
+                except:
+                    print("\n🚀 No more pages. Scraping complete.")
+                    break
 
     except Exception as e:
         print(f"❌ Error during scraping: {e}")
     finally:
-        print("\n✅ Scraping finished. Closing browser...")
-        driver.quit()
+        session.close()
+        print("\n✅ Scraping finished.")
+
+if __name__ == "__main__":
+    # python remax.py "<search url with filters>"  (no URL: set filters by hand in the browser)
+    run_remax_scraper(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,39 @@
+import sys
+import time
+from pageArchive import init_archive, latest_pages
+from willhabenHttp import parse_willhaben_html
+from remax import parse_remax_html
+from willhaben import ad_to_row
+from normalize import normalize_ad
+from database import create_table, upsert_ads
+
+# Offline parser for each archived source: (html, url) -> ad dict in the scrape_willhaben_details shape
+PARSERS = {
+    "willhaben": parse_willhaben_html,
+    "remax": parse_remax_html,
+}
+
+def reparse_archive(sources=None, batch_size=500):
+    """Rebuild ads rows from the newest archived detail page of every URL, without network access."""
+    init_archive()
+    create_table()
+    start = time.time()
+    for source in sources or PARSERS:
+        parse = PARSERS[source]
+        batch, parsed, skipped = [], 0, 0
+        for url, fetched_at, html in latest_pages(source, "detail"):
+            ad_data, _ = normalize_ad(parse(html, url))
+            if ad_data is None:
+                skipped += 1
+                continue
+            batch.append(ad_to_row(ad_data))
+            if len(batch) >= batch_size:
+                parsed += upsert_ads(batch)
+                batch = []
+        parsed += upsert_ads(batch)
+        print(f"♻️ {source}: rebuilt {parsed} ads from archive, {skipped} pages without a usable price/size")
+    print(f"✅ Re-parse finished in {time.time() - start:.1f} sec")
+
+if __name__ == "__main__":
+    # python reparseArchive.py [willhaben remax ...]
+    reparse_archive(sys.argv[1:] or None)
@@ -0,0 +1,82 @@
+import re
+import time
+import argparse
+from storage import transaction
+from database import DB_NAME, create_table
+
+def fts_query(text):
+    """Turn free text into an FTS5 query: every word must match, 'garten*' stays a prefix search."""
+    terms = []
+    for word in re.findall(r"[\w*]+", text or ""):
+        prefix = word.endswith("*")
+        word = word.strip("*")
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " AND ".join(terms)
+
+def search_ads(text=None, min_price=None, max_price=None, min_size=None, max_size=None,
+               zip_codes=None, city=None, region=None, limit=50):
+    """Ads matching the text in title or attributes, within the price/size/location filters.
+
+    Text matches are ranked by relevance (bm25, titles weighted above attributes);
+    without text the cheapest ads come first.
+    """
+    conditions, params = [], []
+    for column, operator, value in (
+        ("a.price", ">=", min_price), ("a.price", "<=", max_price),
+        ("a.size", ">=", min_size), ("a.size", "<=", max_size),
+        ("a.city", "=", city), ("a.region", "=", region),
+    ):
+        if value is not None:
+            conditions.append(f"{column} {operator} ?")
+            params.append(value)
+    if zip_codes:
+        conditions.append(f"a.zip_code IN ({', '.join('?' for _ in zip_codes)})")
+        params.extend(zip_codes)
+
+    query = fts_query(text)
+    if query:
+        sql = '''
+            SELECT a.id, a.url, a.title, a.price, a.size, a.zip_code, a.city, a.region
+            FROM ads_fts f JOIN ads a ON a.id = f.rowid
+            WHERE ads_fts MATCH ?
+        '''
+        params.insert(0, query)
+        order = "bm25(ads_fts, 10.0, 1.0)"
+    else:
+        sql = '''
+            SELECT a.id, a.url, a.title, a.price, a.size, a.zip_code, a.city, a.region
+            FROM ads a WHERE 1 = 1
+        '''
+        order = "a.price"
+    sql += "".join(f" AND {condition}" for condition in conditions)
+    sql += f" ORDER BY {order} LIMIT ?"
+    params.append(limit)
+
+    with transaction(DB_NAME) as conn:
+        return conn.execute(sql, params).fetchall()
+
+if __name__ == "__main__":
+    # python search.py provisionsfrei "Garten*" --max-price 400000 --zip 2500 2340
+    parser = argparse.ArgumentParser(description="Full-text search over scraped ads")
+    parser.add_argument("text", nargs="*")
+    parser.add_argument("--min-price", type=int)
+    parser.add_argument("--max-price", type=int)
+    parser.add_argument("--min-size", type=float)
+    parser.add_argument("--max-size", type=float)
+    parser.add_argument("--zip", nargs="+", dest="zip_codes")
+    parser.add_argument("--city")
+    parser.add_argument("--region")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+    create_table()
+
+    start = time.perf_counter()
+    results = search_ads(
+        " ".join(args.text), args.min_price, args.max_price, args.min_size, args.max_size,
+        args.zip_codes, args.city, args.region, args.limit
+    )
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    for ad_id, url, title, price, size, zip_code, city, region in results:
+        print(f"🏠 {title} | {price}€, {size} m² | {zip_code} {city} | {url}")
+    print(f"🔎 {len(results)} ads in {elapsed_ms:.1f} ms")
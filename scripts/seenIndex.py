@@ -0,0 +1,64 @@
+import sqlite3
+import hashlib
+import threading
+import database
+from storage import transaction
+
+def url_key(url):
+    """64-bit hash of an ad URL; collisions are negligible at our table sizes."""
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "big")
+
+class SeenIndex:
+    """In-memory set of known ad URLs, loaded once from the ads table and updated as ads are inserted."""
+
+    def __init__(self, db_name=None):
+        self.db_name = db_name or database.DB_NAME
+        self.keys = set()
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        with transaction(self.db_name) as conn:
+            try:
+                keys = {url_key(url) for (url,) in conn.execute("SELECT url FROM ads")}
+            except sqlite3.OperationalError:
+                keys = set()  # No ads table yet
+        with self.lock:
+            self.keys = keys
+        print(f"🗂️ Loaded {len(keys)} known ad URLs")
+
+    def __contains__(self, url):
+        return url_key(url) in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def filter_new(self, urls):
+        """Return the URLs that are not in the database yet, keeping their order."""
+        return [url for url in urls if url_key(url) not in self.keys]
+
+    def first_seen(self, urls):
+        """Return the position of the first known URL, or None if all are new."""
+        for i, url in enumerate(urls):
+            if url_key(url) in self.keys:
+                return i
+        return None
+
+    def add(self, url):
+        with self.lock:
+            self.keys.add(url_key(url))
+
+    def add_many(self, urls):
+        with self.lock:
+            self.keys.update(url_key(url) for url in urls)
+
+shared_index = None
+shared_index_lock = threading.Lock()
+
+def get_seen_index():
+    """Return the process-wide index, loading it on first use."""
+    global shared_index
+    with shared_index_lock:
+        if shared_index is None:
+            shared_index = SeenIndex()
+        return shared_index
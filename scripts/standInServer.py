@@ -0,0 +1,55 @@
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+class StandInServer:
+    """Local HTTP server answering GET requests for the Google APIs in tests and benchmarks.
+
+    `respond(query)` gets the parsed query string ({name: [values]}) and
+    returns (status_code, payload); the payload is sent as JSON, or as an
+    empty error page when it is None. Every query is kept in `queries` so
+    callers can count the API calls that reached the server.
+    """
+
+    def __init__(self, respond, path="/"):
+        self.respond = respond
+        self.queries = []
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+        self.url = f"http://127.0.0.1:{self.server.server_port}{path}"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                with stand_in.lock:
+                    stand_in.queries.append(query)
+                status, payload = stand_in.respond(query)
+                if payload is None:
+                    self.send_error(status)
+                    return
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
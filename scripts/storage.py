@@ -0,0 +1,119 @@
+import os
+import time
+import atexit
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+BUSY_TIMEOUT_MS = 30000
+
+connections = {}  # absolute db path -> (connection, lock)
+connections_lock = threading.Lock()
+writers = []
+
+def get_connection(db_path):
+    """Return this process's long-lived connection to a database file, opening it in WAL mode on first use."""
+    path = os.path.abspath(db_path)
+    with connections_lock:
+        if path not in connections:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            connections[path] = (conn, threading.RLock())
+        return connections[path]
+
+@contextmanager
+def transaction(db_path):
+    """Run a block on the shared connection; commit on success, roll back on error."""
+    flush_writers(db_path)
+    conn, lock = get_connection(db_path)
+    with lock:
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+class BatchWriter:
+    """Buffers rows for one statement and writes them with executemany every `batch_rows` rows or `flush_seconds`."""
+
+    def __init__(self, db_path, sql, batch_rows=500, flush_seconds=2.0, on_flush=None):
+        self.db_path = os.path.abspath(db_path)
+        self.sql = sql
+        self.batch_rows = batch_rows
+        self.flush_seconds = flush_seconds
+        self.on_flush = on_flush
+        self.rows = []
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+        self.stopped = threading.Event()
+        writers.append(self)
+        threading.Thread(target=self.flush_periodically, daemon=True).start()
+
+    def add(self, row):
+        with self.lock:
+            self.rows.append(row)
+            due = len(self.rows) >= self.batch_rows
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write everything buffered in one transaction; returns the number of rows changed."""
+        conn, lock = get_connection(self.db_path)
+        # Held until the commit, so a flush that finds the buffer empty returns only after
+        # another thread's rows are written; always taken before self.lock
+        with lock:
+            with self.lock:
+                rows, self.rows = self.rows, []
+                self.last_flush = time.monotonic()
+            if not rows:
+                return 0
+            try:
+                changed = conn.executemany(self.sql, rows).rowcount  # Excludes rows written by triggers
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                with self.lock:
+                    self.rows[:0] = rows  # Keep them, in order, for the next flush
+                raise
+        if self.on_flush:
+            self.on_flush(rows, changed)
+        return changed
+
+    def flush_periodically(self):
+        while not self.stopped.wait(self.flush_seconds / 2):
+            if self.rows and time.monotonic() - self.last_flush >= self.flush_seconds:
+                try:
+                    self.flush()
+                except sqlite3.Error as e:
+                    print(f"❌ Background flush failed: {e}")
+
+    def close(self):
+        self.stopped.set()
+        try:
+            self.flush()
+        finally:
+            if self in writers:
+                writers.remove(self)
+
+def flush_writers(db_path=None):
+    """Flush pending batches, for one database file or all of them."""
+    path = os.path.abspath(db_path) if db_path else None
+    for writer in list(writers):
+        if path is None or writer.db_path == path:
+            writer.flush()
+
+def close_all():
+    """Flush every writer and close every connection; runs automatically at exit."""
+    for writer in list(writers):
+        writer.close()
+    with connections_lock:
+        for conn, lock in connections.values():
+            with lock:
+                conn.close()
+        connections.clear()
+
+atexit.register(close_all)
@@ -0,0 +1,123 @@
+import os
+import math
+from contextlib import contextmanager
+from storage import get_connection, transaction
+from migrations import migrate, STATIONS_MIGRATIONS, STATION_GEO_MIGRATIONS, TRAVEL_TIMES_MIGRATIONS
+from database import DB_NAME, create_table
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIONS_DB = os.path.abspath(os.path.join(BASE_DIR, "../data/oebb_stations.db"))
+STATION_GEO_DB = os.path.abspath(os.path.join(BASE_DIR, "../data/oebb_stations_geo.db"))
+TRAVEL_TIMES_DB = os.path.abspath(os.path.join(BASE_DIR, "../data/oebb_travel_times.db"))
+
+# Schema name each file is attached under on the ads connection, with its migrations
+ATTACHED = {
+    "oebb": (STATIONS_DB, STATIONS_MIGRATIONS),
+    "geo": (STATION_GEO_DB, STATION_GEO_MIGRATIONS),
+    "tt": (TRAVEL_TIMES_DB, TRAVEL_TIMES_MIGRATIONS),
+}
+
+EARTH_RADIUS_M = 6371000
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Straight-line distance in meters; registered as an SQL function on the store."""
+    if None in (lat1, lon1, lat2, lon2):
+        return None
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2)**2
+    return 2 * EARTH_RADIUS_M * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+def attached_schemas(conn):
+    return {row[1] for row in conn.execute("PRAGMA database_list")}
+
+def init_store():
+    """Bring every database file up to date and attach the station files to the ads connection."""
+    create_table()
+    for path, migrations in ATTACHED.values():
+        with transaction(path) as conn:
+            migrate(conn, migrations)
+
+    conn, lock = get_connection(DB_NAME)
+    with lock:
+        conn.commit()  # ATTACH is not allowed inside a transaction
+        present = attached_schemas(conn)
+        for schema, (path, _) in ATTACHED.items():
+            if schema not in present:
+                conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+        conn.create_function("haversine", 4, haversine, deterministic=True)
+
+        # Every station with coordinates, whichever script located it
+        conn.execute("""
+            CREATE TEMP VIEW IF NOT EXISTS station_geo AS
+            SELECT url AS station, latitude, longitude, 'oebb' AS source FROM geo.stations_geo
+            UNION ALL
+            SELECT station, latitude, longitude, 'badner_bahn' AS source FROM geo.badner_bahn
+        """)
+        # One position per station that has travel times
+        conn.execute("""
+            CREATE TEMP VIEW IF NOT EXISTS travel_stations AS
+            SELECT station, latitude, longitude FROM tt.travel_times
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+            GROUP BY station
+        """)
+
+@contextmanager
+def store():
+    """The ads connection with oebb., geo. and tt. attached, for queries that join across files."""
+    init_store()
+    with transaction(DB_NAME) as conn:
+        yield conn
+
+NEAREST_STATION_SQL = """
+    WITH candidates AS (
+        SELECT a.id, s.station, haversine(a.latitude, a.longitude, s.latitude, s.longitude) AS distance
+        FROM ads a
+        JOIN travel_stations s
+          ON s.latitude BETWEEN a.latitude - :box AND a.latitude + :box
+         AND s.longitude BETWEEN a.longitude - :box AND a.longitude + :box
+        WHERE a.latitude IS NOT NULL AND a.longitude IS NOT NULL {ads_filter}
+    ),
+    ranked AS (
+        SELECT id, station, distance,
+               ROW_NUMBER() OVER (PARTITION BY id ORDER BY distance) AS rank
+        FROM candidates
+    )
+    SELECT a.id, a.url, a.title, a.price, a.size, a.zip_code, a.city, a.region,
+           a.latitude, a.longitude, r.station, r.distance
+    FROM ads a
+    JOIN ranked r ON r.id = a.id AND r.rank = 1
+    WHERE 1 = 1 {ads_filter}
+"""
+
+# Search boxes in degrees; ~0.1° is 7-11 km in Austria. The last pass is unbounded.
+NEAREST_STATION_BOXES = (0.1, 0.5, 180)
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+def box_radius(box, latitude):
+    """Radius of the circle that fits inside a ±box° square; a match beyond it may not be the nearest."""
+    return box * METERS_PER_DEGREE * math.cos(math.radians(abs(latitude) + box))
+
+def ads_with_nearest_station(conn):
+    """Geocoded ads with their closest station that has travel times, as one join per search radius.
+
+    Most ads find a station inside the first small box; the wider passes only
+    look at the ads that are still unmatched, or whose match lies in a box
+    corner where a closer station could sit just outside.
+    """
+    rows = {}
+    for box in NEAREST_STATION_BOXES:
+        if rows:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS matched_ads (id INTEGER PRIMARY KEY)")
+            conn.execute("DELETE FROM matched_ads")
+            conn.executemany("INSERT INTO matched_ads (id) VALUES (?)", ((ad_id,) for ad_id in rows))
+            ads_filter = "AND a.id NOT IN (SELECT id FROM matched_ads)"
+        else:
+            ads_filter = ""
+        final = box == NEAREST_STATION_BOXES[-1]
+        for row in conn.execute(NEAREST_STATION_SQL.format(ads_filter=ads_filter), {"box": box}):
+            latitude, distance = row[8], row[11]
+            if final or distance <= box_radius(box, latitude):
+                rows[row[0]] = row[1:]
+    return list(rows.values())
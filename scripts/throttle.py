@@ -0,0 +1,60 @@
+import time
+import threading
+from urllib.parse import urlparse
+from config import HOST_RATE_LIMITS
+
+DEFAULT_RATE = 1.0   # requests per second
+DEFAULT_BURST = 2    # requests allowed back to back before the rate applies
+
+class TokenBucket:
+    """Thread-safe token bucket: refills at `rate` tokens per second up to `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def configure(self, rate, capacity=None):
+        with self.lock:
+            self.rate = rate
+            if capacity is not None:
+                self.capacity = capacity
+                self.tokens = min(self.tokens, capacity)
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available and take them."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if self.rate:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                else:
+                    self.tokens = self.capacity  # rate 0 disables limiting
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                delay = (tokens - self.tokens) / self.rate
+            time.sleep(delay)
+
+buckets = {}
+buckets_lock = threading.Lock()
+
+def limiter_for(url):
+    """Return the bucket shared by every request to the URL's host."""
+    host = urlparse(url).netloc or url
+    with buckets_lock:
+        if host not in buckets:
+            rate, capacity = HOST_RATE_LIMITS.get(host, (DEFAULT_RATE, DEFAULT_BURST))
+            buckets[host] = TokenBucket(rate, capacity)
+        return buckets[host]
+
+def configure_host(url, rate, capacity=None):
+    """Override the request budget for the URL's host at runtime."""
+    limiter_for(url).configure(rate, capacity)
+
+def throttle(url):
+    """Wait for the politeness budget of the URL's host."""
+    limiter_for(url).acquire()
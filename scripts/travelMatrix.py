@@ -0,0 +1,145 @@
+import sys
+import time
+import random
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from config import GOOGLE_API_KEY, DISTANCE_MATRIX_URL, MATRIX_WORKERS, MATRIX_ELEMENTS_PER_SECOND
+from throttle import TokenBucket, throttle
+from maps import DESTINATIONS, init_db, departure_times, missing_stations, save_travel_times, save_failed
+
+# Distance Matrix limits per request
+MAX_ORIGINS = 25
+MAX_ELEMENTS = 100  # origins x destinations
+REQUEST_TIMEOUT = 30
+
+RETRY_STATUSES = {"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"}
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0   # seconds before the first retry, doubled on each further one
+BACKOFF_MAX = 32.0
+
+request_count = 0
+request_lock = threading.Lock()
+elements = TokenBucket(MATRIX_ELEMENTS_PER_SECOND, MAX_ELEMENTS)
+
+def create_session(pool_size=MATRIX_WORKERS):
+    """Keep-alive session sized so every matrix worker has its own pooled connection."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+session = create_session()
+
+def chunk_origins(origins, destination_count):
+    """Split origins into requests that stay within both per-request limits."""
+    size = max(1, min(MAX_ORIGINS, MAX_ELEMENTS // destination_count))
+    return [origins[i:i + size] for i in range(0, len(origins), size)]
+
+def backoff_delay(attempt):
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+def request_matrix(origins, destinations, departure_time):
+    """Transit durations in minutes for every origin x destination at one departure time.
+
+    Returns one list per origin with a value or None per destination, or None
+    when the request keeps failing.
+    """
+    global request_count
+    params = {
+        "origins": "|".join(f"{lat},{lon}" for lat, lon in origins),
+        "destinations": "|".join(f"{lat},{lon}" for lat, lon in destinations),
+        "mode": "transit",
+        "transit_routing_preference": "fewer_transfers",
+        "departure_time": int(departure_time.timestamp()),
+        "key": GOOGLE_API_KEY,
+    }
+    for attempt in range(MAX_RETRIES + 1):
+        elements.acquire(len(origins) * len(destinations))
+        throttle(DISTANCE_MATRIX_URL)
+        with request_lock:
+            request_count += 1
+        try:
+            response = session.get(DISTANCE_MATRIX_URL, params=params, timeout=REQUEST_TIMEOUT)
+            if response.status_code >= 500:
+                status = f"HTTP {response.status_code}"
+            else:
+                data = response.json()
+                status = data["status"]
+                if status == "OK":
+                    return [
+                        [element["duration"]["value"] // 60 if element["status"] == "OK" else None for element in row["elements"]]
+                        for row in data["rows"]
+                    ]
+                if status not in RETRY_STATUSES:
+                    print(f"⚠️ Distance Matrix failed at {departure_time:%H:%M} ({status})")
+                    return None
+        except (requests.RequestException, ValueError, KeyError) as e:
+            status = str(e)
+
+        if attempt < MAX_RETRIES:
+            delay = backoff_delay(attempt)
+            print(f"⏳ {status} at {departure_time:%H:%M}, retrying in {delay:.1f} s")
+            time.sleep(delay)
+    print(f"❌ Giving up on {len(origins)} origins at {departure_time:%H:%M} ({status})")
+    return None
+
+def shortest_travel_times(stations, destinations=DESTINATIONS, workers=MATRIX_WORKERS):
+    """{(station, destination): (minutes, "HH:MM")} over every departure slot.
+
+    The matrix gives a duration per slot but not when the trip actually
+    leaves, so unlike maps.py and gtfsRouter.py this backend writes no
+    travel_profiles: every slot would look like its own departure.
+
+    One request covers a chunk of stations against all destinations for one
+    slot; the chunks of every slot run concurrently under the element quota.
+    """
+    names = list(destinations)
+    coordinates = [destinations[name] for name in names]
+    chunks = chunk_origins(stations, len(names))
+    tasks = [(chunk, departure) for departure in departure_times() for chunk in chunks]
+    print(f"🧮 {len(stations)} stations x {len(names)} destinations in {len(tasks)} matrix requests")
+
+    def run(task):
+        chunk, departure = task
+        return request_matrix([(lat, lon) for _, lat, lon in chunk], coordinates, departure)
+
+    best = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for (chunk, departure), rows in zip(tasks, executor.map(run, tasks)):
+            for (station, _, _), row in zip(chunk, rows or []):
+                for name, minutes in zip(names, row):
+                    if minutes is None:
+                        continue
+                    key = (station, name)
+                    # Earlier slots come first, so ties keep the earliest departure like maps.py
+                    if key not in best or minutes < best[key][0]:
+                        best[key] = (minutes, departure.strftime("%H:%M"))
+    return best
+
+def compute_travel_times(workers=MATRIX_WORKERS):
+    """Fill travel_times for every station still missing a destination, through the Distance Matrix API."""
+    init_db()
+    stations = missing_stations()
+    if not stations:
+        print("✅ All stations already have travel times.")
+        return
+
+    start = time.time()
+    requests_before = request_count
+    best = shortest_travel_times(stations, workers=workers)
+    saved = save_travel_times(stations, best)
+
+    for station, lat, lon in stations:
+        for destination in DESTINATIONS:
+            if (station, destination) not in best:
+                print(f"❌ No valid travel times found for {station} → {destination}")
+                save_failed(station, destination, lat, lon)  # Queue for a Directions retry
+
+    print(f"✅ Saved {saved} travel times in {time.time() - start:.1f} s ({request_count - requests_before} matrix requests)")
+
+if __name__ == "__main__":
+    # python travelMatrix.py [workers]
+    compute_travel_times(*(int(arg) for arg in sys.argv[1:2]))
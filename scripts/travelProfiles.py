@@ -0,0 +1,132 @@
+import sys
+import math
+from array import array
+from bisect import bisect_left
+
+# One arrival per departure slot, as unsigned 16-bit minutes after midnight (little-endian in the blob)
+NO_ARRIVAL = 0xFFFF
+
+def clock_minutes(value):
+    """Minutes after midnight of "HH:MM"."""
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+def clock(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+class Profile:
+    """Earliest arrival when leaving at each departure slot, for one (station, destination) pair.
+
+    Slot i leaves at first_slot + i * slot_minutes. Its arrival is the
+    earliest one of any journey leaving at or after the slot, so waiting for
+    the next train is part of the travel time; NO_ARRIVAL means no journey is
+    known from that slot on.
+
+    `sample_minutes` is None when the journeys were every departure of a
+    timetable (gtfsRouter.py). Profiles from the Directions API (maps.py) only
+    know the trips answered for slots that many minutes apart, so a slot may
+    wait for a sampled trip while an unsampled one leaves earlier.
+    """
+
+    __slots__ = ("first_slot", "slot_minutes", "arrivals", "sample_minutes")
+
+    def __init__(self, first_slot, slot_minutes, arrivals, sample_minutes=None):
+        self.first_slot = first_slot
+        self.slot_minutes = slot_minutes
+        self.arrivals = arrivals
+        self.sample_minutes = sample_minutes
+
+    @classmethod
+    def from_journeys(cls, journeys, start, end, slot_minutes, sample_minutes=None):
+        """Profile of the slots from `start` to `end` ("HH:MM") out of [(departure, arrival)] in minutes after midnight."""
+        first_slot, last_slot = clock_minutes(start), clock_minutes(end)
+        journeys = sorted(journeys)
+        departures = [departure for departure, _ in journeys]
+        # Earliest arrival among the journeys from each one on
+        latest = [NO_ARRIVAL] * (len(journeys) + 1)
+        for i in range(len(journeys) - 1, -1, -1):
+            latest[i] = min(latest[i + 1], journeys[i][1])
+        arrivals = array("H", (
+            latest[bisect_left(departures, slot)] for slot in range(first_slot, last_slot + 1, slot_minutes)
+        ))
+        return cls(first_slot, slot_minutes, arrivals, sample_minutes)
+
+    @classmethod
+    def from_blob(cls, first_slot, slot_minutes, blob, sample_minutes=None):
+        arrivals = array("H")
+        arrivals.frombytes(blob)
+        if sys.byteorder == "big":
+            arrivals.byteswap()
+        return cls(first_slot, slot_minutes, arrivals, sample_minutes)
+
+    def to_blob(self):
+        arrivals = array("H", self.arrivals)
+        if sys.byteorder == "big":
+            arrivals.byteswap()
+        return arrivals.tobytes()
+
+    def slots(self, start=None, end=None):
+        """Indices of the slots leaving from `start` to `end` ("HH:MM", both optional)."""
+        first = 0 if start is None else max(0, -(-(clock_minutes(start) - self.first_slot) // self.slot_minutes))
+        last = len(self.arrivals) if end is None else min(len(self.arrivals), (clock_minutes(end) - self.first_slot) // self.slot_minutes + 1)
+        return range(first, last)
+
+    def travel_times(self, start=None, end=None):
+        """Minutes from each slot in the window to the arrival, None where nothing leaves later."""
+        return [
+            None if self.arrivals[i] == NO_ARRIVAL else self.arrivals[i] - self.first_slot - i * self.slot_minutes
+            for i in self.slots(start, end)
+        ]
+
+    def percentile(self, q, start=None, end=None):
+        """Travel time that a share `q` of the slots in the window beat or match (nearest rank).
+
+        Unreachable slots count as slower than any journey, so a pair served
+        only in the morning has no median over the whole day.
+        """
+        times = sorted(math.inf if minutes is None else minutes for minutes in self.travel_times(start, end))
+        if not times:
+            return None
+        minutes = times[max(0, math.ceil(q * len(times)) - 1)]
+        return None if minutes == math.inf else minutes
+
+    def median(self, start=None, end=None):
+        return self.percentile(0.5, start, end)
+
+    def p90(self, start=None, end=None):
+        return self.percentile(0.9, start, end)
+
+    def best(self, start=None, end=None):
+        """(minutes, "HH:MM") of the quickest slot in the window, the earliest one on ties, or None."""
+        found = [
+            (minutes, i) for i, minutes in zip(self.slots(start, end), self.travel_times(start, end)) if minutes is not None
+        ]
+        if not found:
+            return None
+        minutes, i = min(found)
+        return minutes, clock(self.first_slot + i * self.slot_minutes)
+
+    def frequency(self, start=None, end=None):
+        """Distinct journeys caught from the slots in the window, per hour of the window."""
+        window = self.slots(start, end)
+        if not window:
+            return 0.0
+        journeys = {self.arrivals[i] for i in window if self.arrivals[i] != NO_ARRIVAL}
+        return len(journeys) * 60 / (len(window) * self.slot_minutes)
+
+    def summary(self, start=None, end=None):
+        """The figures the export writes for one pair.
+
+        Like every figure here, `best` counts the wait from the slot, so it can
+        exceed travel_times.shortest_travel_time, which is the trip's own
+        duration. `per_hour` is None for sampled profiles: they cannot catch
+        more than one trip per sample.
+        """
+        best = self.best(start, end)
+        return {
+            "best": best[0] if best else None,
+            "best_departure": best[1] if best else None,
+            "median": self.median(start, end),
+            "p90": self.p90(start, end),
+            "per_hour": None if self.sample_minutes else round(self.frequency(start, end), 1),
+        }
@@ -1,84 +1,33 @@
-import sqlite3
-import pandas as pd
+import os
 import json
-import math
 import time
+from store import store, ads_with_nearest_station
 
-# Database setup
-DATABASE_FILE = "../data/scraped_ads.db"
-TABLE_ADS = "ads"
-DATABASE_STATIONS = "../data/oebb_travel_times.db"
-TABLE_STATIONS = "travel_times"
-JSON_OUTPUT = "../data/real_estate_ads.json"
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+JSON_OUTPUT = os.path.abspath(os.path.join(BASE_DIR, "../data/real_estate_ads.json"))
 
-# Haversine formula to calculate straight-line distance (in meters)
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371000  # Earth radius in meters
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lon2 - lon1)
-
-    a = math.sin(dphi / 2)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2)**2
-    return 2 * R * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-
-# Load train stations from database
-def load_train_stations():
-    print("📡 Fetching train station data...")
-    conn = sqlite3.connect(DATABASE_STATIONS)
-    query = f"SELECT station, latitude, longitude FROM {TABLE_STATIONS}"
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    print(f"✅ Loaded {len(df)} train stations.")
-    return df
-
-# Load real estate ads from database and compute nearest station
-def load_real_estate_ads(stations):
-    print("🏠 Fetching real estate ads...")
-    conn = sqlite3.connect(DATABASE_FILE)
-    query = f"""
-        SELECT url, title, price, size, zip_code, city, region, latitude, longitude
-        FROM {TABLE_ADS}
-        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
-    """
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    print(f"✅ Loaded {len(df)} real estate ads.")
-
-    # Compute nearest station for each ad
-    ads = []
-    total_ads = len(df)
+# Load geocoded ads joined with their nearest station, computed in SQL across the attached databases
+def load_real_estate_ads():
+    print("🏠 Fetching real estate ads with nearest stations...")
     start_time = time.time()
-
-    for i, row in df.iterrows():
-        min_distance = float("inf")
-        nearest_station = None
-
-        for _, station in stations.iterrows():
-            distance = haversine(row["latitude"], row["longitude"], station["latitude"], station["longitude"])
-            if distance < min_distance:
-                min_distance = distance
-                nearest_station = station["station"]
-
-        ads.append({
-            "url": row["url"],
-            "title": row["title"],
-            "price": row["price"],
-            "size": row["size"],
-            "zip_code": row["zip_code"],
-            "city": row["city"],
-            "region": row["region"],
-            "latitude": row["latitude"],
-            "longitude": row["longitude"],
-            "nearest_station": nearest_station,
-            "distance_to_station": round(min_distance, 2)  # Store precomputed distance
-        })
-
-        # Print progress every 100 ads
-        if (i + 1) % 100 == 0 or (i + 1) == total_ads:
-            elapsed_time = time.time() - start_time
-            print(f"⏳ Processed {i + 1}/{total_ads} ads ({elapsed_time:.2f} sec)")
-
-    print("✅ Finished processing all ads.")
+    with store() as conn:
+        rows = ads_with_nearest_station(conn)
+
+    ads = [{
+        "url": url,
+        "title": title,
+        "price": price,
+        "size": size,
+        "zip_code": zip_code,
+        "city": city,
+        "region": region,
+        "latitude": latitude,
+        "longitude": longitude,
+        "nearest_station": station,
+        "distance_to_station": round(distance, 2)  # Store precomputed distance
+    } for url, title, price, size, zip_code, city, region, latitude, longitude, station, distance in rows]
+
+    print(f"✅ Loaded {len(ads)} real estate ads ({time.time() - start_time:.2f} sec)")
     return ads
 
 # Save data to JSON
@@ -90,8 +39,7 @@ def save_json(ads):
 
 def process_data():
     print("🚀 Starting data processing...")
-    stations = load_train_stations()
-    ads = load_real_estate_ads(stations)
+    ads = load_real_estate_ads()
 
     if not ads:
         print("⚠️ No real estate ads found.")
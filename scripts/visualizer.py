@@ -1,12 +1,11 @@
-import sqlite3
-import pandas as pd
+import os
 import json
 import re
+from store import store
+from travelProfiles import Profile
 
-# Database setup
-DATABASE_FILE = "../data/oebb_travel_times.db"
-TABLE_NAME = "travel_times"
-JSON_OUTPUT = "../data/travel_times.json"
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+JSON_OUTPUT = os.path.abspath(os.path.join(BASE_DIR, "../data/travel_times.json"))
 
 # Function to clean station names from URLs
 def extract_station_name(station):
@@ -21,33 +20,39 @@ def extract_station_name(station):
 
 # Load travel times from database
 def load_travel_times():
-    conn = sqlite3.connect(DATABASE_FILE)
-    query = f"""
-        SELECT station, latitude, longitude, destination, shortest_travel_time
-        FROM {TABLE_NAME}
-        WHERE shortest_travel_time > 0
-    """
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df
+    """Rows ordered by the (station, destination) key, so stations stream out grouped."""
+    with store() as conn:
+        return conn.execute("""
+            SELECT t.station, t.latitude, t.longitude, t.destination, t.shortest_travel_time,
+                   p.first_slot, p.slot_minutes, p.arrivals, p.sample_minutes
+            FROM tt.travel_times t
+            LEFT JOIN tt.travel_profiles p ON p.station = t.station AND p.destination = t.destination
+            WHERE t.shortest_travel_time > 0
+            ORDER BY t.station, t.destination
+        """).fetchall()
 
 # Convert data to JSON format
-def save_json(df):
+def save_json(rows):
     data = {}
 
-    for _, row in df.iterrows():
-        original_station = row["station"]  # Keep original name
+    for station, latitude, longitude, destination, travel_time, first_slot, slot_minutes, arrivals, sample_minutes in rows:
+        original_station = station  # Keep original name
         extracted_station = extract_station_name(original_station)  # Extract clean name
 
         if extracted_station not in data:
             data[extracted_station] = {
                 "original_name": original_station,  # Store original name for comparison
-                "latitude": row["latitude"],
-                "longitude": row["longitude"],
-                "travel_times": {}
+                "latitude": latitude,
+                "longitude": longitude,
+                "travel_times": {},
+                "profiles": {}
             }
 
-        data[extracted_station]["travel_times"][row["destination"]] = row["shortest_travel_time"]
+        data[extracted_station]["travel_times"][destination] = travel_time
+        if arrivals is not None:
+            # Median, p90, trains per hour (None when sampled) and best slot over the whole departure window
+            profile = Profile.from_blob(first_slot, slot_minutes, arrivals, sample_minutes)
+            data[extracted_station]["profiles"][destination] = profile.summary()
 
     with open(JSON_OUTPUT, "w") as f:
         json.dump(data, f, indent=4, ensure_ascii=False)
@@ -55,9 +60,9 @@ def save_json(df):
     print(f"✅ Travel time data saved as {JSON_OUTPUT}")
 
 if __name__ == "__main__":
-    df = load_travel_times()
+    rows = load_travel_times()
 
-    if df.empty:
+    if not rows:
         print("⚠️ No travel time data found.")
     else:
-        save_json(df)
+        save_json(rows)
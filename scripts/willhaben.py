@@ -1,15 +1,20 @@
+import re
 import time
-import random
+import queue
+import threading
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
-from willhabenScraper import scrape_willhaben_details, url_exists_in_db
-from database import create_table, insert_ad
+from willhabenScraper import scrape_willhaben_details, parse_price_text, parse_size_text
+from willhabenHttp import scrape_willhaben_details_http
+from database import create_table, queue_ad, quarantine_ad
+from throttle import throttle, configure_host
+from seenIndex import get_seen_index
+from pageArchive import archive_page
+from config import ARCHIVE_PAGES
+from browserSession import new_driver, pool, accept_cookies_once
+from normalize import normalize_ad
 
 def accept_cookies(driver):
     try:
@@ -22,24 +27,40 @@ def accept_cookies(driver):
     except Exception as e:
         print("⚠️ No cookie popup found (or already closed)")
 
-def slow_scroll(driver, max_scrolls=10):
-    last_height = driver.execute_script("return document.body.scrollHeight")
+AD_LINK_SELECTOR = "a[data-testid^='search-result-entry-header']"
+
+def count_ad_links(driver):
+    return driver.execute_script(f"return document.querySelectorAll(\"{AD_LINK_SELECTOR}\").length")
+
+def slow_scroll(driver, max_scrolls=40, settle_rounds=2, poll_interval=0.2, load_timeout=1.5):
+    """Scroll until the number of ad links stops growing, instead of sleeping a fixed time per step."""
+    last_count = count_ad_links(driver)
+    idle_rounds = 0
     for _ in range(max_scrolls):
-        for _ in range(3):
-            driver.execute_script("window.scrollBy(0, 300);")
-            time.sleep(random.uniform(1.2, 2.5))
-        time.sleep(2)
-        new_height = driver.execute_script("return document.body.scrollHeight")
-        if new_height == last_height:
-            break
-        last_height = new_height
-    print("✅ Scrolling completed, all ads should be visible.")
+        driver.execute_script("window.scrollBy(0, window.innerHeight);")
+        # Wait briefly for lazy-loaded entries to show up
+        deadline = time.monotonic() + load_timeout
+        count = count_ad_links(driver)
+        while count == last_count and time.monotonic() < deadline:
+            time.sleep(poll_interval)
+            count = count_ad_links(driver)
+        at_bottom = driver.execute_script("return window.innerHeight + window.scrollY >= document.body.scrollHeight - 2")
+        if count > last_count:
+            idle_rounds = 0
+        elif at_bottom:
+            idle_rounds += 1
+            if idle_rounds >= settle_rounds:
+                break
+        last_count = count
+    print(f"✅ Scrolling completed, {last_count} ads visible.")
 
 def get_all_ad_urls(driver):
     slow_scroll(driver)
+    if ARCHIVE_PAGES:
+        archive_page(driver.current_url, driver.page_source, "willhaben", "listing")
     try:
         ad_elements = WebDriverWait(driver, 5).until(
-            EC.presence_of_all_elements_located((By.CSS_SELECTOR, "a[data-testid^='search-result-entry-header']"))
+            EC.presence_of_all_elements_located((By.CSS_SELECTOR, AD_LINK_SELECTOR))
         )
         ad_links = [ad.get_attribute("href") for ad in ad_elements]
         ad_urls = [f"https://www.willhaben.at{link}" if link.startswith("/") else link for link in ad_links]
@@ -49,6 +70,40 @@ def get_all_ad_urls(driver):
         print("❌ No ads found.")
         return []
 
+# Reads title, price and teaser attributes of every result card in one call
+CARD_SCRIPT = """
+return [...document.querySelectorAll(arguments[0])].map((link) => {
+    const id = link.getAttribute('data-testid').replace('search-result-entry-header-', '');
+    const text = (testid) => {
+        const el = document.querySelector(`[data-testid='${testid}-${id}']`);
+        return el ? el.innerText.trim() : null;
+    };
+    const heading = link.querySelector('h3') || link;
+    return {
+        href: link.getAttribute('href'),
+        title: heading.innerText.trim(),
+        price: text('search-result-entry-price'),
+        teaser: text('search-result-entry-teaser-attributes')
+    };
+});
+"""
+
+def get_all_ad_cards(driver):
+    """Return url, title, price and size of every result card on the current page."""
+    slow_scroll(driver)
+    cards = []
+    for card in driver.execute_script(CARD_SCRIPT, AD_LINK_SELECTOR):
+        link = card["href"] or ""
+        size_match = re.search(r"(\d+(?:,\d+)?)\s*m²", card["teaser"] or "")
+        cards.append({
+            "url": f"https://www.willhaben.at{link}" if link.startswith("/") else link,
+            "title": card["title"] or None,
+            "price": parse_price_text(card["price"]) if card["price"] else None,
+            "size": parse_size_text(size_match.group(1)) if size_match else None,
+        })
+    print(f"🔍 Found {len(cards)} ad cards on this page.")
+    return cards
+
 def next_page_url(url, page_number):
     parsed_url = urlparse(url)
     query_params = parse_qs(parsed_url.query)
@@ -57,51 +112,196 @@ def next_page_url(url, page_number):
     new_url = urlunparse((parsed_url.scheme, parsed_url.netloc, parsed_url.path, parsed_url.params, new_query, parsed_url.fragment))
     return new_url
 
-def scrape_all_pages(search_url, stop_on_seen=False):
+def create_driver():
+    return new_driver("willhaben")
+
+def has_price_and_size(ad_data):
+    return ad_data is not None and ad_data.get("Price (€)") is not None and ad_data.get("Size (m²)") is not None
+
+def ad_to_row(ad_data):
+    """Flatten a scraped ad dict into the argument order of insert_ad/queue_ad."""
+    location = ad_data["Location"]
+    return (
+        ad_data["URL"],
+        ad_data["Title"],
+        ad_data["Price (€)"],
+        ad_data["Size (m²)"],
+        ad_data["Price per m² (€)"],
+        location["ZIP Code"],
+        location["City"],
+        location["Region"],
+        ad_data["Price Information"],
+        ad_data["Energy Certificate"],
+        ad_data["Attributes"]
+    )
+
+def accept_ad(ad_data):
+    """Normalize a scraped ad before it is stored; bad ads go to quarantine and come back as None."""
+    if ad_data is None:
+        return None
+    clean, reason = normalize_ad(ad_data)
+    if clean is None:
+        quarantine_ad(ad_data, urlparse(ad_data.get("URL") or "").netloc, reason)
+    return clean
+
+def save_ad(ad_data):
+    """Insert a scraped ad, quarantining ads without a usable price or size."""
+    ad_data = accept_ad(ad_data)
+    if ad_data is None:
+        return
+    queue_ad(*ad_to_row(ad_data))
+    get_seen_index().add(ad_data["URL"])
+
+def new_ads_on_page(ad_urls, stop_on_seen):
+    """Check a whole page of ad URLs against the seen index at once.
+
+    Returns the URLs still to scrape and whether pagination should stop.
+    """
+    seen_index = get_seen_index()
+    stop = False
+    if stop_on_seen:
+        seen_at = seen_index.first_seen(ad_urls)
+        if seen_at is not None:
+            print(f"⚠️ Already seen ad encountered in DB: {ad_urls[seen_at]}")
+            print("⏹ Stopping further scraping as per user preference.")
+            ad_urls, stop = ad_urls[:seen_at], True
+    new_urls = seen_index.filter_new(ad_urls)
+    if len(new_urls) < len(ad_urls):
+        print(f"⏩ Skipping {len(ad_urls) - len(new_urls)} ads already in DB")
+    return new_urls, stop
+
+def scrape_all_pages(search_url, stop_on_seen=False, use_http=False, workers=1, max_requests_per_second=None):
+    if workers > 1:
+        return scrape_all_pages_parallel(search_url, stop_on_seen, use_http, workers, max_requests_per_second)
+    if max_requests_per_second is not None:
+        configure_host(search_url, max_requests_per_second)
     create_table()
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    driver = pool.acquire("willhaben")
     page = 1
     try:
         while True:
             print(f"📄 Scraping Page {page}...")
             page_url = next_page_url(search_url, page)
+            throttle(page_url)
             driver.get(page_url)
-            accept_cookies(driver)
+            accept_cookies_once(driver, accept_cookies)
             ad_urls = get_all_ad_urls(driver)
             if not ad_urls:
                 print("🚫 No more ads found. Stopping pagination.")
                 break
-            for i, ad_url in enumerate(ad_urls):
-                # Check the database instead of a local seen set
-                if stop_on_seen and url_exists_in_db(ad_url):
-                    print(f"⚠️ Already seen ad encountered in DB: {ad_url}")
-                    print("⏹ Stopping further scraping as per user preference.")
-                    return
-                print(f"📄 Scraping ad {i + 1}/{len(ad_urls)}: {ad_url}")
-                ad_data = scrape_willhaben_details(driver, ad_url)
-                if ad_data is None or ad_data.get("Price (€)") is None or ad_data.get("Size (m²)") is None:
+            new_urls, stop = new_ads_on_page(ad_urls, stop_on_seen)
+            for i, ad_url in enumerate(new_urls):
+                print(f"📄 Scraping ad {i + 1}/{len(new_urls)}: {ad_url}")
+                if use_http:
+                    ad_data = scrape_willhaben_details_http(ad_url, driver)
+                else:
+                    ad_data = scrape_willhaben_details(driver, ad_url)
+                if ad_data is None:
                     print(f"⚠️ Skipping ad (missing price/size): {ad_url}")
                     continue
-                location = ad_data["Location"]
-                insert_ad(
-                    ad_data["URL"],
-                    ad_data["Title"],
-                    ad_data["Price (€)"],
-                    ad_data["Size (m²)"],
-                    ad_data["Price per m² (€)"],
-                    location["ZIP Code"],
-                    location["City"],
-                    location["Region"],
-                    ad_data["Price Information"],
-                    ad_data["Energy Certificate"],
-                    ad_data["Attributes"]
-                )
+                save_ad(ad_data)
+            if stop:
+                return
+            page += 1
+    finally:
+        pool.release(driver, "willhaben")
+
+QUEUE_PUT_TIMEOUT = 5  # Seconds between checks that a detail worker is still running
+
+def detail_worker(worker_id, ad_queue, write_queue, use_http):
+    """Scrape ad URLs from the shared queue with this worker's own headless browser."""
+    driver = None
+    try:
+        driver = pool.acquire("willhaben")  # Inside the try so a browser that fails to start is reported
+        while True:
+            ad_url = ad_queue.get()
+            if ad_url is None:
+                break
+            print(f"🧵 Worker {worker_id} scraping: {ad_url}")
+            try:
+                if use_http:
+                    ad_data = scrape_willhaben_details_http(ad_url, driver)
+                else:
+                    ad_data = scrape_willhaben_details(driver, ad_url)
+            except Exception as e:
+                print(f"❌ Worker {worker_id} failed on {ad_url}: {e}")
+                continue
+            if ad_data is not None:
+                write_queue.put(ad_data)
+    finally:
+        if driver is not None:
+            pool.release(driver, "willhaben")
+
+def put_while_alive(item_queue, item, threads):
+    """Put an item on a bounded queue, failing instead of blocking forever once no thread is left to take it."""
+    while True:
+        if not any(thread.is_alive() for thread in threads):
+            raise RuntimeError("All detail workers have stopped; see their errors above")
+        try:
+            item_queue.put(item, timeout=QUEUE_PUT_TIMEOUT)
+            return
+        except queue.Full:
+            continue
+
+def ad_writer(write_queue, errors):
+    """Single writer that feeds every scraped ad into the database; an exception stops it and lands in `errors`."""
+    try:
+        while True:
+            ad_data = write_queue.get()
+            if ad_data is None:
+                break
+            save_ad(ad_data)
+    except Exception as e:
+        print(f"❌ Database writer stopped: {e}")
+        errors.append(e)
+
+def scrape_all_pages_parallel(search_url, stop_on_seen=False, use_http=False, workers=4, max_requests_per_second=None):
+    """Scrape listing pages with one browser while a pool of headless browsers scrapes the ads."""
+    create_table()
+    if max_requests_per_second is not None:
+        configure_host(search_url, max_requests_per_second)
+    ad_queue = queue.Queue(maxsize=workers * 4)
+    write_queue = queue.Queue()
+    writer_errors = []
+
+    worker_threads = [
+        threading.Thread(target=detail_worker, args=(i + 1, ad_queue, write_queue, use_http), daemon=True)
+        for i in range(workers)
+    ]
+    writer_thread = threading.Thread(target=ad_writer, args=(write_queue, writer_errors), daemon=True)
+    for thread in worker_threads:
+        thread.start()
+    writer_thread.start()
+
+    driver = pool.acquire("willhaben")
+    page = 1
+    try:
+        while True:
+            print(f"📄 Scraping Page {page}...")
+            page_url = next_page_url(search_url, page)
+            throttle(page_url)
+            driver.get(page_url)
+            accept_cookies_once(driver, accept_cookies)
+            ad_urls = get_all_ad_urls(driver)
+            if not ad_urls:
+                print("🚫 No more ads found. Stopping pagination.")
+                break
+            new_urls, stop = new_ads_on_page(ad_urls, stop_on_seen)
+            for ad_url in new_urls:
+                put_while_alive(ad_queue, ad_url, worker_threads)
+            if stop:
+                break
             page += 1
     finally:
-        driver.quit()
+        pool.release(driver, "willhaben")
+        try:
+            for _ in worker_threads:
+                put_while_alive(ad_queue, None, worker_threads)
+        except RuntimeError:
+            pass  # No worker left to stop
+        for thread in worker_threads:
+            thread.join()
+        write_queue.put(None)
+        writer_thread.join()
+    if writer_errors:
+        raise writer_errors[0]  # The ads queued after it were not saved
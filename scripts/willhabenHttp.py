@@ -0,0 +1,211 @@
+import sys
+import json
+import requests
+from html.parser import HTMLParser
+from requests.adapters import HTTPAdapter
+from throttle import throttle
+from seenIndex import get_seen_index
+from pageArchive import archive_page
+from willhabenScraper import (
+    scrape_willhaben_details, parse_location_text,
+    parse_price_text, parse_size_text, build_ad_data
+)
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+REQUEST_TIMEOUT = 15
+
+# HTML elements that never get a closing tag
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+# Elements whose end tag may be omitted when a sibling of the same kind starts
+SELF_CLOSING_SIBLINGS = {"p", "li", "dt", "dd", "tr", "td", "th", "option"}
+# Elements that break text like innerText does; text inside any other element runs on ("72,5 m<sup>2</sup>")
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "figcaption", "figure", "footer",
+    "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p", "pre", "section",
+    "table", "tbody", "td", "tfoot", "th", "thead", "tr", "ul",
+}
+
+def create_session(pool_size=10):
+    """Create a keep-alive HTTP session with a connection pool for willhaben.at."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=2)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "User-Agent": USER_AGENT,
+        "Accept-Language": "de-AT,de;q=0.9,en;q=0.8",
+    })
+    return session
+
+session = create_session()
+
+class TestIdNode:
+    """An element carrying a data-testid attribute, with its text and nested test-id elements."""
+
+    def __init__(self, testid):
+        self.testid = testid
+        self.parts = []
+        self.children = []
+
+    @property
+    def text(self):
+        return " ".join("".join(self.parts).split())
+
+    def iter(self):
+        for child in self.children:
+            yield child
+            yield from child.iter()
+
+    def find(self, testid):
+        """Return the first nested node whose test id matches exactly."""
+        return next((node for node in self.iter() if node.testid == testid), None)
+
+    def find_all(self, testid=None, prefix=None):
+        """Return all nested nodes matching an exact test id or a test id prefix."""
+        return [
+            node for node in self.iter()
+            if (testid is not None and node.testid == testid)
+            or (prefix is not None and node.testid.startswith(prefix))
+        ]
+
+class TestIdParser(HTMLParser):
+    """Build a tree of the data-testid elements in a page, ignoring everything else."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = TestIdNode(None)
+        self.stack = []  # (tag, TestIdNode or None) for every open element
+        self.skip_depth = 0
+
+    def open_nodes(self):
+        return [node for _, node in self.stack if node is not None]
+
+    def break_text(self):
+        for node in self.open_nodes():
+            node.parts.append(" ")
+
+    def handle_starttag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self.break_text()
+        if tag in VOID_TAGS:
+            return
+        if tag in SELF_CLOSING_SIBLINGS and self.stack and self.stack[-1][0] == tag:
+            self.stack.pop()
+        if tag in ("script", "style"):
+            self.skip_depth += 1
+        testid = dict(attrs).get("data-testid")
+        node = None
+        if testid:
+            node = TestIdNode(testid)
+            parents = self.open_nodes()
+            (parents[-1] if parents else self.root).children.append(node)
+        self.stack.append((tag, node))
+
+    def handle_endtag(self, tag):
+        if tag in BLOCK_TAGS:
+            self.break_text()
+        # Pop up to the matching open tag so unclosed children don't leak
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                for open_tag, _ in self.stack[i:]:
+                    if open_tag in ("script", "style"):
+                        self.skip_depth -= 1
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        for node in self.open_nodes():
+            node.parts.append(data)  # Whitespace-only data still separates inline elements
+
+def parse_testids(html):
+    parser = TestIdParser()
+    parser.feed(html)
+    parser.close()
+    return parser.root
+
+def parse_attributes(root):
+    """Collect attribute-item title/value pairs, like scrape_attributes does."""
+    attributes_dict = {}
+    for item in root.find_all("attribute-item"):
+        title = item.find("attribute-title")
+        if title is None:
+            continue
+        value_texts = [value.text for value in item.find_all("attribute-value") if value.text]
+        attributes_dict[title.text] = ", ".join(value_texts) if value_texts else "Ja"  # Assume "Ja" if no value given
+    return attributes_dict
+
+def parse_size(root):
+    for item in root.find_all("attribute-item"):
+        title = item.find("attribute-title")
+        value = item.find("attribute-value")
+        if title is not None and value is not None and "Wohnfläche" in title.text:
+            size = parse_size_text(value.text)
+            if size is not None:
+                return size
+    return None
+
+def parse_labelled_box(root, box_testid, label_prefix, value_prefix):
+    """Zip label/value pairs inside a box, like the energy and price information scrapers."""
+    box = root.find(box_testid)
+    if box is None:
+        return {}
+    labels = box.find_all(prefix=label_prefix)
+    values = box.find_all(prefix=value_prefix)
+    return {label.text: value.text for label, value in zip(labels, values) if label.text and value.text}
+
+def parse_willhaben_html(html, url):
+    """Parse a Willhaben ad page into the same dict shape as scrape_willhaben_details."""
+    root = parse_testids(html)
+
+    title_node = root.find("ad-detail-header")
+    price_node = root.find("contact-box-price-box-price-value-0")
+    location_node = root.find("object-location-address")
+
+    title = title_node.text if title_node is not None else "Title not found"
+    price = parse_price_text(price_node.text) if price_node is not None else None
+    size = parse_size(root)
+    attributes = parse_attributes(root)
+    energy_certificate = parse_labelled_box(root, "energy-pass-box", "energy-pass-attribute-label", "energy-pass-attribute-value")
+    price_information = parse_labelled_box(root, "price-information-box", "price-information-formatted-attribute-label", "price-information-formatted-attribute-value")
+    location = parse_location_text(location_node.text) if location_node is not None else None
+
+    return build_ad_data(url, title, price, size, location, price_information, energy_certificate, attributes)
+
+def fetch_ad_html(url):
+    """Download an ad page over the pooled session, returning None on failure."""
+    throttle(url)
+    try:
+        response = session.get(url, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 200:
+            archive_page(url, response.text, "willhaben")
+            return response.text
+        print(f"⚠️ HTTP {response.status_code} for {url}")
+    except requests.RequestException as e:
+        print(f"⚠️ HTTP request failed for {url}: {e}")
+    return None
+
+def scrape_willhaben_details_http(url, driver=None, skip_known=True):
+    """Scrape a Willhaben ad over plain HTTP, falling back to Selenium when a driver is given."""
+    if skip_known and url in get_seen_index():
+        print(f"⚠️ Skipping (Already in DB): {url}")
+        return None
+
+    html = fetch_ad_html(url)
+    if html is not None:
+        ad_data = parse_willhaben_html(html, url)
+        if ad_data["Price (€)"] is not None and ad_data["Size (m²)"] is not None:
+            return ad_data
+
+    if driver is None:
+        return None
+
+    print(f"🔁 Falling back to Selenium: {url}")
+    return scrape_willhaben_details(driver, url, skip_known=skip_known)
+
+if __name__ == "__main__":
+    # Parse saved ad pages offline: python willhabenHttp.py page1.html [page2.html ...]
+    for path in sys.argv[1:]:
+        with open(path, "r", encoding="utf-8") as f:
+            print(json.dumps(parse_willhaben_html(f.read(), path), indent=4, ensure_ascii=False))
@@ -1,21 +1,15 @@
 import re
+import json
 import time
-import sqlite3
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-
-DB_NAME = "../data/scraped_ads.db"
-
-def url_exists_in_db(url):
-    """Check if a URL already exists in the database."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("SELECT 1 FROM ads WHERE url = ?", (url,))
-    exists = cursor.fetchone() is not None
-    conn.close()
-    return exists
+from throttle import throttle
+from seenIndex import get_seen_index
+from pageArchive import archive_page
+from config import ARCHIVE_PAGES
+from browserSession import accept_cookies_once
+from normalize import parse_euro, parse_area
 
 def accept_cookies(driver):
     try:
@@ -42,8 +36,7 @@ def scrape_price(driver):
         price_text = WebDriverWait(driver, 5).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, "[data-testid='contact-box-price-box-price-value-0']"))
         ).text
-        price = int(re.sub(r"[^\d]", "", price_text))
-        return price
+        return parse_price_text(price_text)
     except:
         return None
 
@@ -57,11 +50,9 @@ def scrape_size(driver):
 
                 if "Wohnfläche" in title_text:
                     value_element = attribute.find_element(By.CSS_SELECTOR, "[data-testid='attribute-value']")
-                    size_text = value_element.text.strip()
-
-                    size_text = re.sub(r"[^\d,]", "", size_text).replace(",", ".")
-                    size = float(size_text)
-                    return size
+                    size = parse_size_text(value_element.text.strip())
+                    if size is not None:
+                        return size
             except:
                 continue
         return None
@@ -122,44 +113,123 @@ def scrape_price_information(driver):
 
     return price_info
 
+def parse_location_text(location_text):
+    """Split an address line like '1100 Wien, Favoriten' into ZIP code, city and region."""
+    # Regular expression to detect ZIP codes (assumes Austrian 4-digit format)
+    zip_match = re.search(r"\b\d{4}\b", location_text)
+    zip_code = zip_match.group(0) if zip_match else None
+
+    # Extract city and region dynamically
+    location_parts = location_text.split(", ")
+    city = None
+    region = None
+
+    for part in location_parts:
+        if zip_code and part.startswith(zip_code):
+            city = part[len(zip_code):].strip()
+        elif not part.isdigit():  # If not a number, assume it's a region
+            region = part.strip()
+
+    return {
+        "ZIP Code": zip_code,
+        "City": city if city else None,
+        "Region": region if region else None
+    }
+
 def scrape_location(driver):
     try:
         location_element = driver.find_element(By.CSS_SELECTOR, "[data-testid='object-location-address']")
-        location_text = location_element.text.strip()
-
-        # Regular expression to detect ZIP codes (assumes Austrian 4-digit format)
-        zip_match = re.search(r"\b\d{4}\b", location_text)
-        zip_code = zip_match.group(0) if zip_match else None
-
-        # Extract city and region dynamically
-        location_parts = location_text.split(", ")
-        city = None
-        region = None
-
-        for part in location_parts:
-            if zip_code and part.startswith(zip_code):
-                city = part[len(zip_code):].strip()
-            elif not part.isdigit():  # If not a number, assume it's a region
-                region = part.strip()
-
-        return {
-            "ZIP Code": zip_code,
-            "City": city if city else None,
-            "Region": region if region else None
-        }
+        return parse_location_text(location_element.text.strip())
     except:
         return {"ZIP Code": None, "City": None, "Region": None}
 
-def scrape_willhaben_details(driver, url):
+def parse_price_text(price_text):
+    """Turn a price string like '€ 249.000' into an integer."""
+    return parse_euro(price_text)
+
+def parse_size_text(size_text):
+    """Turn a size string like '72,5 m²' into a float."""
+    return parse_area(size_text)
+
+def build_ad_data(url, title, price, size, location, price_information, energy_certificate, attributes):
+    """Assemble the ad dict returned by every detail engine."""
+    price_per_m2 = round(price / size, 2) if price and size else None
+
+    return {
+        "URL": url,
+        "Title": title,
+        "Price (€)": price,
+        "Size (m²)": size,
+        "Price per m² (€)": price_per_m2,
+        "Location": location if location else {"ZIP Code": None, "City": None, "Region": None},
+        "Price Information": price_information if price_information else {},
+        "Energy Certificate": energy_certificate if energy_certificate else {},
+        "Attributes": attributes if attributes else {}
+    }
+
+# Collects every field of an ad page in the browser so one WebDriver call returns all of them
+EXTRACT_SCRIPT = """
+const text = (el) => el ? el.innerText.trim() : null;
+const one = (root, id) => root.querySelector(`[data-testid='${id}']`);
+const pairs = (boxId, labelPrefix, valuePrefix) => {
+    const box = one(document, boxId);
+    if (!box) return [];
+    const labels = [...box.querySelectorAll(`[data-testid^='${labelPrefix}']`)].map(text);
+    const values = [...box.querySelectorAll(`[data-testid^='${valuePrefix}']`)].map(text);
+    return labels.map((label, i) => [label, values[i]]).filter(([label, value]) => label && value);
+};
+return JSON.stringify({
+    title: text(one(document, 'ad-detail-header')),
+    price: text(one(document, 'contact-box-price-box-price-value-0')),
+    attributes: [...document.querySelectorAll("[data-testid='attribute-item']")].map((item) => [
+        text(one(item, 'attribute-title')),
+        [...item.querySelectorAll("[data-testid='attribute-value']")].map(text).filter(Boolean)
+    ]).filter(([title]) => title !== null),
+    energy: pairs('energy-pass-box', 'energy-pass-attribute-label', 'energy-pass-attribute-value'),
+    priceInfo: pairs('price-information-box', 'price-information-formatted-attribute-label', 'price-information-formatted-attribute-value'),
+    location: text(one(document, 'object-location-address'))
+});
+"""
+
+def extract_all_fields(driver, url):
+    """Read every field of the loaded ad page with a single injected script."""
+    WebDriverWait(driver, 5).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, "[data-testid='ad-detail-header']"))
+    )
+    fields = json.loads(driver.execute_script(EXTRACT_SCRIPT))
+
+    attributes = {}
+    size = None
+    for title_text, value_texts in fields["attributes"]:
+        attributes[title_text] = ", ".join(value_texts) if value_texts else "Ja"  # Assume "Ja" if no value given
+        if size is None and "Wohnfläche" in title_text and value_texts:
+            size = parse_size_text(value_texts[0])
+
+    title = fields["title"] or "Title not found"
+    price = parse_price_text(fields["price"]) if fields["price"] else None
+    location = parse_location_text(fields["location"]) if fields["location"] else None
+
+    return build_ad_data(url, title, price, size, location, dict(fields["priceInfo"]), dict(fields["energy"]), attributes)
+
+def scrape_willhaben_details(driver, url, single_pass=True, skip_known=True):
     """Scrape the details of a Willhaben listing only if it's not already in the database."""
 
     # Check if the ad already exists in the database
-    if url_exists_in_db(url):
+    if skip_known and url in get_seen_index():
         print(f"⚠️ Skipping (Already in DB): {url}")
         return None  # Return None to indicate no scraping needed
 
+    throttle(url)
     driver.get(url)
-    accept_cookies(driver)
+    accept_cookies_once(driver, accept_cookies)
+    if ARCHIVE_PAGES:
+        archive_page(url, driver.page_source, "willhaben")
+
+    if single_pass:
+        try:
+            return extract_all_fields(driver, url)
+        except Exception as e:
+            print(f"⚠️ Single-pass extraction failed, scraping field by field: {e}")
 
     title = scrape_title(driver)
     price = scrape_price(driver)
@@ -169,16 +239,4 @@ def scrape_willhaben_details(driver, url):
     price_information = scrape_price_information(driver)
     location = scrape_location(driver)
 
-    price_per_m2 = round(price / size, 2) if price and size else None
-
-    return {
-        "URL": url,
-        "Title": title,
-        "Price (€)": price,
-        "Size (m²)": size,
-        "Price per m² (€)": price_per_m2,
-        "Location": location if location else {"ZIP Code": None, "City": None, "Region": None},
-        "Price Information": price_information if price_information else {},
-        "Energy Certificate": energy_certificate if energy_certificate else {},
-        "Attributes": attributes if attributes else {}
-    }
+    return build_ad_data(url, title, price, size, location, price_information, energy_certificate, attributes)
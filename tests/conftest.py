@@ -0,0 +1,52 @@
+import os
+import sys
+import pytest
+
+# The scripts import each other as top-level modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../scripts")))
+
+import maps
+import database
+import jobQueue
+import seenIndex
+from standInServer import StandInServer
+from throttle import configure_host
+
+@pytest.fixture
+def stand_in():
+    """Start local stand-ins for the Google APIs: stand_in(respond, path) -> StandInServer.
+
+    The servers are unthrottled so tests do not wait on the politeness budget,
+    and shut down when the test ends.
+    """
+    servers = []
+
+    def start(respond, path="/"):
+        server = StandInServer(respond, path)
+        servers.append(server)
+        configure_host(server.url, 0)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+@pytest.fixture
+def travel_dbs(tmp_path, monkeypatch):
+    """Point the travel-time scripts at scratch copies of their databases."""
+    monkeypatch.setattr(maps, "DB_FILE", str(tmp_path / "oebb_travel_times.db"))
+    monkeypatch.setattr(maps, "STATIONS_GEO_DB", str(tmp_path / "oebb_stations_geo.db"))
+    monkeypatch.setattr(jobQueue, "JOBS_DB", str(tmp_path / "jobs.db"))
+    return tmp_path
+
+@pytest.fixture
+def ads_db(tmp_path, monkeypatch):
+    """A scratch scraped_ads.db with the current schema behind database.py and the seen index."""
+    path = str(tmp_path / "scraped_ads.db")
+    monkeypatch.setattr(database, "DB_NAME", path)
+    monkeypatch.setattr(database, "ad_writer", None)
+    monkeypatch.setattr(seenIndex, "shared_index", None)
+    database.create_table()
+    yield path
+    if database.ad_writer is not None:
+        database.ad_writer.close()
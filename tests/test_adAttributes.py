@@ -0,0 +1,38 @@
+import json
+import sqlite3
+import pytest
+from adAttributes import typed_attributes
+from migrations import migrate, ADS_MIGRATIONS, reparse_balcony
+
+def balcony(attributes):
+    return typed_attributes({}, {}, attributes)[2]
+
+@pytest.mark.parametrize("attributes, expected", [
+    ({"Freifläche": "Balkon, Loggia"}, 1),
+    ({"Außenfläche": "Loggia"}, 1),
+    ({"Aussenfläche": "Terrasse, Balkon"}, 1),
+    ({"Balkon": "Ja"}, 1),
+    ({"Loggia": "5 m²"}, 1),
+    ({"Freifläche": "Garten, Terrasse"}, 0),
+    ({"Zimmer": "3"}, 0),
+    ({}, None),
+])
+def test_balcony(attributes, expected):
+    assert balcony(attributes) == expected
+
+def test_typed_attributes_from_json():
+    attributes = json.dumps({"Zimmer": "3", "Stockwerk(e)": "2. Stock", "Freifläche": "Balkon, Loggia"})
+    price_info = json.dumps({"Betriebskosten": "€ 210,50"})
+    energy = json.dumps({"HWB": "54,3 kWh/m2a", "HWB-Klasse": "B"})
+    assert typed_attributes(price_info, energy, attributes) == (3, 2, 1, 210.5, 54.3, "B")
+
+def test_migration_backfills_balcony():
+    conn = sqlite3.connect(":memory:")
+    migrate(conn)
+    conn.execute("INSERT INTO ads (url, attributes) VALUES (?, ?)", ("https://example.invalid/1", json.dumps({"Freifläche": "Balkon"})))
+    # As stored before Freifläche values counted
+    conn.execute("UPDATE ads SET balcony = 0")
+    conn.execute(f"PRAGMA user_version = {ADS_MIGRATIONS.index(reparse_balcony)}")
+    conn.commit()
+    migrate(conn)
+    assert conn.execute("SELECT balcony FROM ads").fetchone()[0] == 1
@@ -0,0 +1,43 @@
+import os
+import sys
+import subprocess
+import database
+from seenIndex import get_seen_index
+
+SCRIPTS = os.path.abspath(os.path.join(os.path.dirname(__file__), "../scripts"))
+
+def ad_row(n, **attributes):
+    return (
+        f"https://example.invalid/{n}", f"Wohnung {n}", 200000 + n, 50.0 + n, 4000 + n, "2500", "Baden", "Niederösterreich",
+        {"Betriebskosten": "€ 150"}, {}, {"Zimmer": "2", **attributes},
+    )
+
+def test_import_opens_no_database():
+    # A fresh interpreter, so no other test has created the writer or a connection yet
+    output = subprocess.run(
+        [sys.executable, "-c", "import database, storage; print(database.ad_writer, storage.connections, storage.writers)"],
+        cwd=SCRIPTS, capture_output=True, text=True, check=True,
+    ).stdout
+    assert output.strip() == "None {} []"
+
+def test_insert_ads_skips_known_urls(ads_db):
+    assert database.insert_ads([ad_row(1), ad_row(2, Freifläche="Balkon")]) == 2
+    assert database.insert_ads([ad_row(2), ad_row(3)]) == 1
+    assert set(database.get_ads_by_url([f"https://example.invalid/{n}" for n in range(5)])) == {
+        f"https://example.invalid/{n}" for n in (1, 2, 3)
+    }
+
+def test_queued_ads_reach_the_scratch_database(ads_db):
+    database.queue_ad(*ad_row(7))
+    writer = database.get_ad_writer()
+    assert writer.db_path == os.path.abspath(ads_db)
+    assert writer.flush() == 1
+    ad_id, price, size, title = database.get_ads_by_url(["https://example.invalid/7"])["https://example.invalid/7"]
+    assert (price, size, title) == (200007, 57.0, "Wohnung 7")
+
+def test_seen_index_loads_the_scratch_database(ads_db):
+    database.insert_ads([ad_row(1)])
+    index = get_seen_index()
+    assert index.db_name == ads_db
+    assert "https://example.invalid/1" in index
+    assert index.filter_new(["https://example.invalid/1", "https://example.invalid/2"]) == ["https://example.invalid/2"]
@@ -0,0 +1,69 @@
+import pytest
+import geocodeService
+from benchGeocode import fake_location, GEOCODE_PATH
+
+ADDRESSES = ["2500, Baden, Niederösterreich", "1010, Wien, Wien", "8010, Graz, Steiermark"]
+
+def answer(address):
+    lat, lng = fake_location(address)
+    return 200, {"status": "OK", "results": [{"geometry": {"location": {"lat": lat, "lng": lng}}}]}
+
+@pytest.fixture
+def geocoder(stand_in, tmp_path, monkeypatch):
+    """Point geocodeService at a scratch cache and a stand-in server answering with `respond`."""
+    monkeypatch.setattr(geocodeService, "CACHE_DB", str(tmp_path / "geocode_cache.db"))
+    monkeypatch.setattr(geocodeService, "BACKOFF_BASE", 0.001)
+
+    def start(respond):
+        server = stand_in(respond, GEOCODE_PATH)
+        monkeypatch.setattr(geocodeService, "GEOCODE_URL", server.url)
+        return server
+
+    return start
+
+def test_geocode_many_returns_server_coordinates(geocoder):
+    geocoder(lambda query: answer(query["address"][0]))
+    assert geocodeService.geocode_many(ADDRESSES) == {address: fake_location(address) for address in ADDRESSES}
+
+def test_second_run_is_served_from_cache(geocoder):
+    server = geocoder(lambda query: answer(query["address"][0]))
+    first = geocodeService.geocode_many(ADDRESSES)
+    calls = geocodeService.api_call_count
+    assert len(server.queries) == len(ADDRESSES)
+
+    # Spelling variants normalize to the cached keys
+    again = geocodeService.geocode_many(ADDRESSES + ["  2500 ,  BADEN, Niederösterreich"])
+    assert len(server.queries) == len(ADDRESSES)
+    assert geocodeService.api_call_count == calls
+    assert {address: again[address] for address in ADDRESSES} == first
+
+def test_zero_results_are_cached(geocoder):
+    server = geocoder(lambda query: (200, {"status": "ZERO_RESULTS", "results": []}))
+    assert geocodeService.geocode("Nirgendwo") is None
+    assert geocodeService.geocode("Nirgendwo") is None
+    assert len(server.queries) == 1
+    assert geocodeService.has_no_result("Nirgendwo")
+
+def test_quota_and_server_errors_are_retried(geocoder):
+    # Every address first hits the quota, then a 503, then succeeds
+    failures = {}
+
+    def respond(query):
+        address = query["address"][0]
+        failures[address] = failures.get(address, 0) + 1
+        if failures[address] == 1:
+            return 200, {"status": "OVER_QUERY_LIMIT", "results": []}
+        if failures[address] == 2:
+            return 503, None
+        return answer(address)
+
+    server = geocoder(respond)
+    assert geocodeService.geocode_many(ADDRESSES) == {address: fake_location(address) for address in ADDRESSES}
+    assert len(server.queries) == 3 * len(ADDRESSES)
+
+def test_retry_failures_are_not_cached(geocoder, monkeypatch):
+    monkeypatch.setattr(geocodeService, "MAX_RETRIES", 1)
+    server = geocoder(lambda query: (503, None))
+    assert geocodeService.geocode(ADDRESSES[0]) is None
+    assert geocodeService.geocode(ADDRESSES[0]) is None
+    assert len(server.queries) == 4
@@ -0,0 +1,71 @@
+import random
+from datetime import datetime
+import pytest
+import maps
+import gtfsRouter
+from storage import transaction
+from benchGtfs import UNLIMITED_ROUNDS, write_feed, seed_stations, connection_scan
+
+LINES = 40
+STATIONS = 30
+SCANNED = 3
+
+@pytest.fixture(scope="module")
+def routed(tmp_path_factory):
+    """Route a synthetic feed once for the module: (saved travel times, network, stations)."""
+    scratch = tmp_path_factory.mktemp("gtfs")
+    rng = random.Random(0)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(gtfsRouter, "GTFS_DIR", str(scratch / "gtfs"))
+        monkeypatch.setattr(gtfsRouter, "NETWORK_FILE", str(scratch / "network.npz"))
+        monkeypatch.setattr(maps, "DB_FILE", str(scratch / "travel_times.db"))
+        monkeypatch.setattr(maps, "STATIONS_GEO_DB", str(scratch / "stations_geo.db"))
+        _, served = write_feed(str(scratch / "gtfs" / "test"), LINES, rng)
+        seed_stations(maps.STATIONS_GEO_DB, STATIONS, served, rng)
+        gtfsRouter.compute_travel_times()
+        with transaction(maps.DB_FILE) as conn:
+            saved = {
+                (station, destination): minutes for station, destination, minutes in
+                conn.execute("SELECT station, destination, shortest_travel_time FROM travel_times")
+            }
+        yield saved, gtfsRouter.load_network(datetime.today()), maps.load_stations()
+
+def search_window():
+    return gtfsRouter.clock_seconds(maps.START_TIME), gtfsRouter.clock_seconds(maps.END_TIME)
+
+def test_backward_search_matches_forward_searches(routed):
+    saved, network, stations = routed
+    router = gtfsRouter.Router(network)
+    names = list(maps.DESTINATIONS)
+    targets = [router.nearby_stops(*maps.DESTINATIONS[name]) for name in names]
+    assert any(minutes is not None for minutes in saved.values())
+    for station, lat, lon in stations:
+        sources = router.nearby_stops(lat, lon)
+        profiles = router.profile(sources, targets, *search_window()) if sources else [[] for _ in names]
+        for name, journeys in zip(names, profiles):
+            found = gtfsRouter.shortest_journey(journeys)
+            assert saved.get((station, name)) == (found[0] if found else None), (station, name)
+
+def test_unlimited_search_matches_connection_scan(routed):
+    # A connection scan does not count vehicles, so compare against a search without the round limit
+    _, network, stations = routed
+    router = gtfsRouter.Router(network)
+    unlimited = gtfsRouter.Router(network, rounds=UNLIMITED_ROUNDS)
+    targets = [router.nearby_stops(*coordinates) for coordinates in maps.DESTINATIONS.values()]
+    checked = 0
+    for station, lat, lon in stations:
+        sources = router.nearby_stops(lat, lon)
+        if not sources:
+            continue
+        found = [gtfsRouter.shortest_journey(journeys) for journeys in unlimited.profile(sources, targets, *search_window())]
+        reference = [None] * len(targets)
+        for departure in router.departures_at(sources, *search_window()):
+            for i, arrival in enumerate(connection_scan(network, sources, targets, departure)):
+                if arrival - departure <= gtfsRouter.MAX_JOURNEY:
+                    minutes = int(arrival - departure) // 60
+                    reference[i] = minutes if reference[i] is None else min(reference[i], minutes)
+        assert [shortest[0] if shortest else None for shortest in found] == reference, station
+        checked += 1
+        if checked == SCANNED:
+            break
+    assert checked == SCANNED
@@ -0,0 +1,38 @@
+import pytest
+import maps
+from benchDepartures import FakeDirections
+
+PAIRS = 200
+DESTINATION = (47.5, 16.5)
+
+@pytest.fixture
+def origins(monkeypatch):
+    """Stations whose Directions answers come from synthetic timetables."""
+    origins = [(48.0 + i / 1000, 16.0) for i in range(PAIRS)]
+    monkeypatch.setattr(maps, "gmaps", FakeDirections([(f"{lat},{lon}", f"{DESTINATION[0]},{DESTINATION[1]}") for lat, lon in origins]))
+    return origins
+
+def every_slot(latitude, longitude):
+    """Shortest trip from asking the API at every departure slot."""
+    found = []
+    for slot in maps.departure_times():
+        trip = maps.get_trip(f"{latitude},{longitude}", DESTINATION, slot)
+        if trip is not None:
+            found.append((trip[0], slot))
+    if not found:
+        return None, None
+    minutes, slot = min(found)
+    return minutes, slot.strftime("%H:%M")
+
+def test_search_is_exact_with_fewer_calls(origins):
+    expected = [every_slot(lat, lon) for lat, lon in origins]
+    calls_before = maps.api_call_count
+    assert [maps.shortest_travel_time(lat, lon, DESTINATION) for lat, lon in origins] == expected
+    assert maps.api_call_count - calls_before < PAIRS * len(list(maps.departure_times()))
+
+def test_directions_profiles_are_marked_sampled(origins):
+    lat, lon = origins[0]
+    slots, trips = maps.sample_trips(lat, lon, DESTINATION)
+    profile = maps.profile_of(trips)
+    assert profile.sample_minutes == maps.INTERVAL_MINUTES
+    assert profile.summary()["per_hour"] is None
@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+import pytest
+import remax
+
+class FakeDriver:
+    def __init__(self, error):
+        self.error = error
+
+    def get(self, url):
+        if self.error:
+            raise self.error
+
+class FakeSession:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def fakes(ads_db, monkeypatch):
+    """Give run_remax_scraper a fake browser and session; records the profiles released."""
+    fakes = {"released": [], "session": FakeSession(), "error": None}
+
+    @contextmanager
+    def browser(profile):
+        try:
+            yield FakeDriver(fakes["error"])
+        finally:
+            fakes["released"].append(profile)
+
+    monkeypatch.setattr(remax, "browser", browser)
+    monkeypatch.setattr(remax, "create_session", lambda workers: fakes["session"])
+    return fakes
+
+def test_error_on_first_page_returns_browser_and_closes_session(fakes):
+    fakes["error"] = RuntimeError("page did not load")
+    remax.run_remax_scraper("https://www.remax.at/de/immobilien/immobilien-suchen?x=1")
+    assert fakes["released"] == ["remax"]
+    assert fakes["session"].closed
+
+def test_ctrl_c_while_waiting_for_filters_returns_browser(fakes, monkeypatch):
+    def interrupt(prompt):
+        raise KeyboardInterrupt
+    monkeypatch.setattr("builtins.input", interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        remax.run_remax_scraper()
+    assert fakes["released"] == ["remax-visible"]
+    assert fakes["session"].closed
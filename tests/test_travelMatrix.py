@@ -0,0 +1,91 @@
+import time
+import pytest
+import maps
+import travelMatrix
+from storage import transaction
+from throttle import TokenBucket
+from benchMatrix import MATRIX_PATH, matrix_answer, seed_stations, expected_travel_times
+
+STATIONS = 60
+
+@pytest.fixture
+def matrix(stand_in, travel_dbs, monkeypatch):
+    """Seed scratch stations and point travelMatrix at a stand-in Distance Matrix API answering with `respond`."""
+    monkeypatch.setattr(travelMatrix, "BACKOFF_BASE", 0.001)
+    monkeypatch.setattr(travelMatrix, "elements", TokenBucket(0, travelMatrix.MAX_ELEMENTS))  # rate 0: no element quota
+    seed_stations(maps.STATIONS_GEO_DB, STATIONS)
+
+    def start(respond=matrix_answer):
+        server = stand_in(respond, MATRIX_PATH)
+        monkeypatch.setattr(travelMatrix, "DISTANCE_MATRIX_URL", server.url)
+        return server
+
+    return start
+
+def saved_travel_times():
+    with transaction(maps.DB_FILE) as conn:
+        return {
+            (station, destination): (minutes, departure) for station, destination, minutes, departure in
+            conn.execute("SELECT station, destination, shortest_travel_time, departure_time FROM travel_times")
+        }
+
+def request_sizes(server):
+    return [(len(query["origins"][0].split("|")), len(query["destinations"][0].split("|"))) for query in server.queries]
+
+@pytest.mark.parametrize("origins, destinations, size", [(100, 3, 25), (100, 7, 14), (30, 100, 1), (5, 3, 5), (10, 150, 1)])
+def test_chunks_stay_within_request_limits(origins, destinations, size):
+    chunks = travelMatrix.chunk_origins(list(range(origins)), destinations)
+    assert [origin for chunk in chunks for origin in chunk] == list(range(origins))
+    assert max(len(chunk) for chunk in chunks) == size
+    assert all(len(chunk) <= travelMatrix.MAX_ORIGINS for chunk in chunks)
+
+def test_compute_matches_every_slot(matrix):
+    server = matrix()
+    travelMatrix.compute_travel_times(workers=4)
+
+    assert saved_travel_times() == expected_travel_times(maps.load_stations())
+    chunks = len(travelMatrix.chunk_origins(list(range(STATIONS)), len(maps.DESTINATIONS)))
+    assert len(server.queries) == chunks * len(list(maps.departure_times()))
+    assert all(
+        origins <= travelMatrix.MAX_ORIGINS and origins * destinations <= travelMatrix.MAX_ELEMENTS
+        for origins, destinations in request_sizes(server)
+    )
+
+def test_quota_and_server_errors_are_retried(matrix):
+    # Every request first hits the quota, then a 503, then succeeds
+    attempts = {}
+
+    def respond(query):
+        key = (query["origins"][0], query["departure_time"][0])
+        attempts[key] = attempts.get(key, 0) + 1
+        if attempts[key] == 1:
+            return 200, {"status": "OVER_QUERY_LIMIT", "rows": []}
+        if attempts[key] == 2:
+            return 503, None
+        return matrix_answer(query)
+
+    server = matrix(respond)
+    travelMatrix.compute_travel_times(workers=4)
+    assert saved_travel_times() == expected_travel_times(maps.load_stations())
+    assert len(server.queries) == 3 * len(attempts)
+
+def test_element_quota_throttles_requests(matrix, monkeypatch):
+    rate = 5000
+
+    class CountingBucket(TokenBucket):
+        taken = 0
+
+        def acquire(self, tokens=1):
+            super().acquire(tokens)
+            CountingBucket.taken += tokens
+
+    monkeypatch.setattr(travelMatrix, "elements", CountingBucket(rate, travelMatrix.MAX_ELEMENTS))
+    server = matrix()
+    start = time.perf_counter()
+    travelMatrix.compute_travel_times(workers=4)
+    elapsed = time.perf_counter() - start
+
+    requested = sum(origins * destinations for origins, destinations in request_sizes(server))
+    assert CountingBucket.taken == requested
+    # Only the first burst is free; the rest arrives at the element rate
+    assert elapsed >= (requested - travelMatrix.MAX_ELEMENTS) / rate
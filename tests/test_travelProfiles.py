@@ -0,0 +1,63 @@
+import math
+import random
+import maps
+from config import PROFILE_SLOT_MINUTES
+from travelProfiles import Profile, clock, clock_minutes
+from benchProfiles import build_journeys, brute_force
+
+def reference_summary(journeys, slots):
+    """What Profile.summary should report, from scanning the journeys for every slot."""
+    times = [brute_force(journeys, slot) for slot in slots]
+    reachable = [(minutes, slot) for minutes, slot in zip(times, slots) if minutes is not None]
+    ranked = sorted(math.inf if minutes is None else minutes for minutes in times)
+
+    def nearest_rank(q):
+        minutes = ranked[max(0, math.ceil(q * len(ranked)) - 1)]
+        return None if minutes == math.inf else minutes
+
+    caught = {min(arrival for departure, arrival in journeys if departure >= slot) for minutes, slot in reachable}
+    best = min(reachable) if reachable else None
+    return {
+        "best": best[0] if best else None,
+        "best_departure": clock(best[1]) if best else None,
+        "median": nearest_rank(0.5),
+        "p90": nearest_rank(0.9),
+        "per_hour": round(len(caught) * 60 / (len(slots) * PROFILE_SLOT_MINUTES), 1),
+    }
+
+def test_summary_matches_brute_force():
+    rng = random.Random(0)
+    slots = range(clock_minutes(maps.START_TIME), clock_minutes(maps.END_TIME) + 1, PROFILE_SLOT_MINUTES)
+    for _ in range(300):
+        journeys = build_journeys(rng)
+        profile = Profile.from_journeys(journeys, maps.START_TIME, maps.END_TIME, PROFILE_SLOT_MINUTES)
+        assert profile.summary() == reference_summary(journeys, slots)
+
+def test_window_limits_the_slots():
+    profile = Profile.from_journeys([(600, 640), (720, 750)], "09:00", "13:00", 30)
+    assert profile.travel_times("10:00", "12:00") == [40, 120, 90, 60, 30]
+    assert profile.travel_times("12:10") == [None, None]
+    assert profile.best("10:10") == (30, "12:00")
+    assert profile.median("12:30") is None
+
+def test_sampled_profiles_hide_frequency():
+    journeys = [(600, 640), (630, 670)]
+    assert Profile.from_journeys(journeys, "09:00", "13:00", 30).summary()["per_hour"] == 0.4
+    sampled = Profile.from_journeys(journeys, "09:00", "13:00", 30, sample_minutes=30).summary()
+    assert sampled["per_hour"] is None
+    # The wait from 09:00 counts, unlike the 40-minute trip itself
+    assert (sampled["best"], sampled["best_departure"]) == (40, "10:00")
+
+def test_profiles_survive_the_database(travel_dbs):
+    rng = random.Random(1)
+    profiles = {
+        (f"station{i}", name): Profile.from_journeys(
+            build_journeys(rng), maps.START_TIME, maps.END_TIME, PROFILE_SLOT_MINUTES, sample_minutes=rng.choice((None, 30))
+        )
+        for i in range(20) for name in maps.DESTINATIONS
+    }
+    maps.init_db()
+    maps.save_travel_profiles(profiles)
+    loaded = maps.load_travel_profiles()
+    assert {key: (p.first_slot, p.slot_minutes, list(p.arrivals), p.sample_minutes) for key, p in loaded.items()} == \
+        {key: (p.first_slot, p.slot_minutes, list(p.arrivals), p.sample_minutes) for key, p in profiles.items()}
@@ -0,0 +1,48 @@
+import sqlite3
+import pytest
+import willhaben
+
+SEARCH_URL = "https://www.willhaben.at/iad/immobilien/eigentumswohnung/niederoesterreich"
+
+class FakeDriver:
+    def get(self, url):
+        self.url = url
+
+class FakePool:
+    def __init__(self):
+        self.out = 0
+
+    def acquire(self, profile):
+        self.out += 1
+        return FakeDriver()
+
+    def release(self, driver, profile):
+        self.out -= 1
+
+@pytest.fixture
+def listing(ads_db, monkeypatch):
+    """One listing page of three ads behind fake browsers; returns the fake pool."""
+    fake_pool = FakePool()
+    pages = iter([[f"{SEARCH_URL}/ad-{n}" for n in range(3)]])
+    monkeypatch.setattr(willhaben, "pool", fake_pool)
+    monkeypatch.setattr(willhaben, "throttle", lambda url: None)
+    monkeypatch.setattr(willhaben, "accept_cookies_once", lambda driver, accept: None)
+    monkeypatch.setattr(willhaben, "get_all_ad_urls", lambda driver: next(pages, []))
+    monkeypatch.setattr(willhaben, "scrape_willhaben_details", lambda driver, url: {"URL": url})
+    return fake_pool
+
+def test_writer_errors_are_raised_after_the_join(listing, monkeypatch):
+    def save_ad(ad_data):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(willhaben, "save_ad", save_ad)
+
+    with pytest.raises(sqlite3.OperationalError, match="database is locked"):
+        willhaben.scrape_all_pages_parallel(SEARCH_URL, workers=2)
+    assert listing.out == 0
+
+def test_every_ad_reaches_the_writer(listing, monkeypatch):
+    saved = []
+    monkeypatch.setattr(willhaben, "save_ad", lambda ad_data: saved.append(ad_data["URL"]))
+    willhaben.scrape_all_pages_parallel(SEARCH_URL, workers=2)
+    assert sorted(saved) == [f"{SEARCH_URL}/ad-{n}" for n in range(3)]
+    assert listing.out == 0
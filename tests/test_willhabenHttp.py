@@ -0,0 +1,51 @@
+import os
+import pytest
+import willhabenHttp
+from willhabenHttp import parse_testids, parse_willhaben_html, scrape_willhaben_details_http
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+URL = "https://www.willhaben.at/iad/immobilien/d/eigentumswohnung/niederoesterreich/baden/sonnige-3-zimmer-wohnung-123456789/"
+
+# What scrape_willhaben_details returns for the same page in a browser
+EXPECTED = {
+    "URL": URL,
+    "Title": "Sonnige 3-Zimmer-Wohnung mit Balkon & Fernwärme",
+    "Price (€)": 249000,
+    "Size (m²)": 72.5,
+    "Price per m² (€)": 3434.48,
+    "Location": {"ZIP Code": "2500", "City": "Baden", "Region": "Niederösterreich"},
+    "Price Information": {"Kaufpreis": "€ 249.000", "Betriebskosten": "€ 210,50"},
+    "Energy Certificate": {"HWB": "54,3 kWh/m2a", "fGEE": "0,85"},
+    "Attributes": {
+        "Wohnfläche": "72,5 m2",
+        "Zimmer": "3",
+        "Freifläche": "Balkon, Loggia",
+        "Lift": "Ja",
+        "Heizung": "Fernwärme",
+    },
+}
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+def test_parse_matches_selenium_shape():
+    assert parse_willhaben_html(read_fixture("willhaben_detail.html"), URL) == EXPECTED
+
+def test_scrape_over_http_uses_parsed_page(monkeypatch):
+    monkeypatch.setattr(willhabenHttp, "fetch_ad_html", lambda url: read_fixture("willhaben_detail.html"))
+    assert scrape_willhaben_details_http(URL, skip_known=False) == EXPECTED
+
+def test_scrape_without_price_or_size_and_no_driver_returns_none(monkeypatch):
+    monkeypatch.setattr(willhabenHttp, "fetch_ad_html", lambda url: "<html><body></body></html>")
+    assert scrape_willhaben_details_http(URL, skip_known=False) is None
+
+@pytest.mark.parametrize("html, text", [
+    ("<div data-testid='x'>72,5 m<sup>2</sup></div>", "72,5 m2"),
+    ("<div data-testid='x'><span>€</span> <span>249.000</span></div>", "€ 249.000"),
+    ("<div data-testid='x'><p>Balkon</p><p>Loggia</p></div>", "Balkon Loggia"),
+    ("<div data-testid='x'>Erdgeschoss<br>Altbau</div>", "Erdgeschoss Altbau"),
+    ("<div data-testid='x'>Titel<script>var a = 1;</script></div>", "Titel"),
+])
+def test_text_joins_inline_fragments_like_inner_text(html, text):
+    assert parse_testids(html).find("x").text == text
@@ -24,14 +24,21 @@ document.addEventListener("DOMContentLoaded", async function () {
     let stationNameMapping = {};
 
     for (let extractedStation in stationData) {
-        let { original_name, latitude, longitude, travel_times } = stationData[extractedStation];
+        let { original_name, latitude, longitude, travel_times, profiles = {} } = stationData[extractedStation];
         let normalizedOriginal = normalizeName(original_name);
         let normalizedExtracted = normalizeName(extractedStation);
         stationNameMapping[normalizedOriginal] = extractedStation;
 
         let popupContent = `<b>${extractedStation}</b><br>`;
         for (let dest in travel_times) {
-            popupContent += `${dest}: ${travel_times[dest]} perc<br>`;
+            popupContent += `${dest}: ${travel_times[dest]} perc`;
+            let profile = profiles[dest];
+            if (profile && profile.median !== null) {
+                // per_hour is null for profiles sampled from the Directions API
+                let frequency = profile.per_hour !== null ? `, ${profile.per_hour}/óra` : "";
+                popupContent += ` (medián ${profile.median} perc${frequency})`;
+            }
+            popupContent += `<br>`;
         }
 
         let marker = L.circleMarker([latitude, longitude], {